@@ -0,0 +1,19 @@
+module ApplicationCable
+  class Connection < ActionCable::Connection::Base
+    identified_by :current_user
+
+    def connect
+      self.current_user = find_verified_user
+    end
+
+    private
+
+    # Browsers cannot set headers on a WebSocket handshake, so the JWT may also come as ?token=
+    def find_verified_user
+      auth_header = request.headers["Authorization"]
+      token = auth_header&.start_with?("Bearer ") ? auth_header.split(" ").last : request.params[:token]
+      user = token && AuthCache.authenticate(token)
+      user || reject_unauthorized_connection
+    end
+  end
+end
@@ -0,0 +1,10 @@
+# Push counterpart of the /api/*/updates polling endpoints.
+#
+# Every subscriber receives changes to their own conversations and new messages in them;
+# experts additionally receive expert queue changes. Payloads are built by UpdatesBroadcaster.
+class UpdatesChannel < ApplicationCable::Channel
+  def subscribed
+    stream_from UpdatesBroadcaster.user_stream(current_user.id)
+    stream_from UpdatesBroadcaster::EXPERT_QUEUE_STREAM if AuthCache.expert_profile_id(current_user.id)
+  end
+end
@@ -1,33 +1,45 @@
 module Api
   class UpdatesController < ApplicationController
+    include UpdateCursors
+
     # All actions require JWT authentication via Authenticatable concern
     # JWT token should be provided in Authorization header: "Bearer <token>"
     # The @current_user is set by Authenticatable#authenticate_user! which uses JwtService.decode
 
+    # Pass the X-Updates-Cursor header of the previous response as `cursor` (and its ETag as
+    # If-None-Match) to receive only what changed since; see UpdateCursors.
+
+    # GET /api/updates
+    # All three deltas in one round trip: one authentication, one expert check and one
+    # conversation scope shared by every section. expertQueue is only present for experts.
+    def index
+      sections = { conversations: conversations_section, messages: messages_section }
+      sections.merge!(expert_queue_sections) if expert?
+      return if updates_not_modified?(sections.transform_values { |section| section[:position] })
+
+      body = {
+        conversations: render_conversations(sections[:conversations]),
+        messages: render_messages(sections[:messages])
+      }
+      body[:expertQueue] = render_expert_queue(sections) if expert?
+
+      render json: RecordSerializer.json_object(body)
+    end
+
     # GET /api/conversations/updates
     def conversations
-      since = params[:since] ? Time.parse(params[:since]) : 1.hour.ago
-      
-      conversations = Conversation.for_user(@current_user)
-        .where("updated_at > ?", since)
-        .includes(:initiator, :assigned_expert)
-        .order(updated_at: :desc)
-      
-      render json: conversations.map { |c| conversation_response(c) }
+      section = conversations_section
+      return if updates_not_modified?(conversations: section[:position])
+
+      render json: render_conversations(section)
     end
     
     # GET /api/messages/updates
     def messages
-      since = params[:since] ? Time.parse(params[:since]) : 1.hour.ago
-      
-      # Get messages from user's conversations
-      conversation_ids = Conversation.for_user(@current_user).pluck(:id)
-      messages = Message.where(conversation_id: conversation_ids)
-        .where("created_at > ?", since)
-        .includes(:sender, :conversation)
-        .order(created_at: :asc)
-      
-      render json: messages.map { |m| message_response(m) }
+      section = messages_section
+      return if updates_not_modified?(messages: section[:position])
+
+      render json: render_messages(section)
     end
     
     # GET /api/expert-queue/updates
@@ -35,62 +47,79 @@ module Api
       ensure_expert
       return if performed? # Exit early if ensure_expert rendered a response
       
-      since = params[:since] ? Time.parse(params[:since]) : 1.hour.ago
-      
-      waiting = Conversation.waiting
-        .where("updated_at > ?", since)
-        .includes(:initiator)
-        .order(created_at: :desc)
-        .map { |c| conversation_response(c) }
-      
-      assigned = Conversation.assigned_to(@current_user)
-        .where("updated_at > ?", since)
-        .includes(:initiator, :assigned_expert)
-        .order(updated_at: :desc)
-        .map { |c| conversation_response(c) }
-      
-      render json: {
-        waitingConversations: waiting,
-        assignedConversations: assigned
-      }
+      sections = expert_queue_sections
+      return if updates_not_modified?(sections.transform_values { |section| section[:position] })
+
+      render json: render_expert_queue(sections)
     end
     
     private
     
     def ensure_expert
-      unless @current_user&.expert_profile
+      unless expert?
         render json: { error: "Expert profile required" }, status: :forbidden
       end
     end
-    
-    def conversation_response(conversation)
-      {
-        id: conversation.id.to_s,
-        title: conversation.title,
-        status: conversation.status,
-        questionerId: conversation.initiator_id.to_s,
-        questionerUsername: conversation.initiator.username,
-        assignedExpertId: conversation.assigned_expert_id&.to_s,
-        assignedExpertUsername: conversation.assigned_expert&.username,
-        createdAt: conversation.created_at.iso8601,
-        updatedAt: conversation.updated_at.iso8601,
-        lastMessageAt: conversation.last_message_at&.iso8601,
-        unreadCount: conversation.unread_count_for(@current_user)
-      }
+
+    def expert?
+      return @expert if defined?(@expert)
+
+      @expert = @current_user.present? && AuthCache.expert_profile_id(@current_user.id).present?
     end
-    
-    def message_response(message)
+
+    def user_conversations
+      @user_conversations ||= Conversation.for_user(@current_user)
+    end
+
+    def conversations_section
+      update_section(:conversations, user_conversations, :updated_at)
+    end
+
+    def messages_section
+      # Subquery on the shared scope rather than plucking every conversation id
+      update_section(:messages, Message.where(conversation_id: user_conversations.select(:id)), :created_at)
+    end
+
+    def expert_queue_sections
       {
-        id: message.id.to_s,
-        conversationId: message.conversation_id.to_s,
-        senderId: message.sender_id.to_s,
-        senderUsername: message.sender.username,
-        senderRole: message.sender_role,
-        content: message.content,
-        timestamp: message.created_at.iso8601,
-        isRead: message.is_read
+        waiting: update_section(:waiting, Conversation.waiting, :updated_at),
+        assigned: update_section(:assigned, Conversation.assigned_to(@current_user), :updated_at)
       }
     end
+
+    # Sections render as JSON strings (RecordSerializer); those whose cursor did not
+    # move render as empty without loading any records
+    def render_conversations(section)
+      return "[]" if section_unchanged?(:conversations, section)
+
+      conversation_serializer.json(section[:delta].order(updated_at: :desc))
+    end
+
+    def render_messages(section)
+      return "[]" if section_unchanged?(:messages, section)
+
+      MessageSerializer.new.json(section[:delta].order(created_at: :asc))
+    end
+
+    def render_expert_queue(sections)
+      waiting = if section_unchanged?(:waiting, sections[:waiting])
+        "[]"
+      else
+        conversation_serializer.json(sections[:waiting][:delta].order(created_at: :desc))
+      end
+
+      assigned = if section_unchanged?(:assigned, sections[:assigned])
+        "[]"
+      else
+        conversation_serializer.json(sections[:assigned][:delta].order(updated_at: :desc))
+      end
+
+      RecordSerializer.json_object(waitingConversations: waiting, assignedConversations: assigned)
+    end
+
+    def conversation_serializer
+      @conversation_serializer ||= ConversationSerializer.new(view: :list, viewer: @current_user)
+    end
   end
 end
 
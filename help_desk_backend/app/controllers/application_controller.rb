@@ -2,16 +2,26 @@ class ApplicationController < ActionController::API
   include ActionController::Cookies
   include Authenticatable
 
+  # Header the Locust harness sends on every request (LOCUST_REQUEST_HEADER in locustfile.py).
+  # Keyed on a header rather than the user agent so either harness HTTP client is recognised.
+  LOCUST_REQUEST_HEADER = ENV.fetch("LOCUST_REQUEST_HEADER", "X-Locust-Request")
+
+  # Number of SQL statements the request issued, authentication included; the harness records it per endpoint
+  QUERY_COUNT_HEADER = "X-DB-Queries"
+
+  prepend_around_action :report_query_count
   before_action :detect_locust_request
 
   private
 
+  def report_query_count
+    before = QueryCounter.count
+    yield
+  ensure
+    response.headers[QUERY_COUNT_HEADER] = (QueryCounter.count - before).to_s
+  end
+
   def detect_locust_request
-    ua = request.user_agent.to_s
-    if ua.include?("python-requests")
-      Current.might_be_locust_request = true
-    else
-      Current.might_be_locust_request = false
-    end
+    Current.might_be_locust_request = request.headers[LOCUST_REQUEST_HEADER].present?
   end
 end
@@ -18,6 +18,9 @@ class AuthenticationController < ApplicationController
         render json: { errors: user.errors.full_messages }, status: :unprocessable_entity
       end
 
+    rescue ActiveRecord::RecordNotUnique
+      # a concurrent registration took the username between the validation and the INSERT
+      render json: { errors: ["Username has already been taken"] }, status: :unprocessable_entity
     end
 
     # POST /auth/login
@@ -26,7 +29,9 @@ class AuthenticationController < ApplicationController
       user = User.find_by(username: user_params[:username])
 
       if user && user.authenticate(user_params[:password])
-        user.update!(last_active_at: Time.current)
+        # Buffered and written in bulk instead of an UPDATE per login
+        user.last_active_at = Time.current
+        PresenceTracker.touch(user.id, user.last_active_at)
         token = JwtService.encode(user)
         render json: {
           user: user_response(user),
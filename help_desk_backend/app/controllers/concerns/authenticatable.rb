@@ -9,18 +9,21 @@ module Authenticatable
 
   def authenticate_user!
     @current_user = current_user
-    return if @current_user
+    if @current_user
+      # Authenticated API activity counts as presence; written out in bulk by PresenceTracker
+      PresenceTracker.touch(@current_user.id)
+      return
+    end
 
     render json: { error: "Unauthorized" }, status: :unauthorized
   end
 
   def current_user
-    # Try JWT token from Authorization header
+    # Try JWT token from Authorization header (verified payload and user come from AuthCache)
     auth_header = request.headers["Authorization"]
     if auth_header&.start_with?("Bearer ")
       token = auth_header.split(" ").last
-      decoded = JwtService.decode(token)
-      return User.find_by(id: decoded[:user_id]) if decoded
+      return AuthCache.authenticate(token)
     end
 
     nil
@@ -0,0 +1,35 @@
+# Keyset (seek) pagination over a (timestamp, id) order.
+#
+# A cursor is the opaque position of a row (see RowPositions). Pages continue strictly
+# before or after that position, so a page costs one index range scan however deep it
+# is, and rows inserted meanwhile do not shift later pages the way OFFSET does.
+module KeysetPagination
+  extend ActiveSupport::Concern
+  include RowPositions
+
+  private
+
+  # `limit` param clamped to 1..max, or `default` when absent.
+  def page_limit(default:, max:)
+    return default if params[:limit].blank?
+
+    params[:limit].to_i.clamp(1, max)
+  end
+
+  # Rows of `relation` after (ascending) or before (descending) the cursor position.
+  def keyset_after(relation, column, cursor)
+    rows_beyond(relation, column, ">", decode_position(cursor))
+  end
+
+  def keyset_before(relation, column, cursor)
+    rows_beyond(relation, column, "<", decode_position(cursor))
+  end
+
+  def encode_position(record, column)
+    encode_cursor_value(row_position(record.public_send(column), record.id))
+  end
+
+  def decode_position(cursor)
+    validate_position!(decode_cursor_value(cursor))
+  end
+end
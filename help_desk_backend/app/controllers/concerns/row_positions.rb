@@ -0,0 +1,46 @@
+# (timestamp, id) row positions and the opaque cursors that carry them, shared by
+# KeysetPagination and UpdateCursors.
+#
+# A position is a row's timestamp in microseconds and its id. Cursors are base64url JSON of
+# a position (or of a hash of them); anything that does not decode to that answers 400.
+module RowPositions
+  extend ActiveSupport::Concern
+
+  class InvalidCursor < StandardError; end
+
+  included do
+    rescue_from InvalidCursor do
+      render json: { error: "Invalid cursor" }, status: :bad_request
+    end
+  end
+
+  private
+
+  def row_position(time, id)
+    [(time.to_r * 1_000_000).to_i, id]
+  end
+
+  # Rows of `relation` strictly after (">") or before ("<") `position` in (column, id) order.
+  def rows_beyond(relation, column, operator, (micros, id))
+    qualified = "#{relation.table_name}.#{column}"
+    time = Time.zone.at(Rational(micros, 1_000_000))
+    relation.where("#{qualified} #{operator} :time OR (#{qualified} = :time AND #{relation.table_name}.id #{operator} :id)",
+                   time: time, id: id)
+  end
+
+  def encode_cursor_value(value)
+    Base64.urlsafe_encode64(value.to_json, padding: false)
+  end
+
+  def decode_cursor_value(cursor)
+    JSON.parse(Base64.urlsafe_decode64(cursor.to_s))
+  rescue ArgumentError, JSON::ParserError
+    raise InvalidCursor
+  end
+
+  def validate_position!(position)
+    raise InvalidCursor unless position.is_a?(Array) && position.size == 2 && position.all?(Integer)
+
+    position
+  end
+end
@@ -0,0 +1,75 @@
+# Opaque delta-polling cursors for the /api/*/updates endpoints.
+#
+# A cursor records, for each section of a response, the (timestamp, id) position of the
+# newest row the client has been sent. The next poll passes it back as `cursor` and only
+# rows strictly after that position are loaded. The new cursor is returned in the
+# X-Updates-Cursor header and doubles as the ETag, so when nothing changed the poll costs
+# one indexed lookup per section and answers 304 (with If-None-Match) or an empty delta
+# without loading or serializing any records.
+#
+# Requests without a cursor keep the old behaviour: rows after `since`, or the last hour.
+module UpdateCursors
+  extend ActiveSupport::Concern
+  include RowPositions
+
+  CURSOR_HEADER = "X-Updates-Cursor"
+  DEFAULT_WINDOW = 1.hour
+
+  private
+
+  # The delta of `relation` for `section` and the position to hand back for it.
+  def update_section(section, relation, column)
+    delta = updates_after(relation, section, column)
+    { delta: delta, position: next_position(section, delta, relation, column) }
+  end
+
+  # Rows of `relation` the client has not seen yet for `section`.
+  def updates_after(relation, section, column)
+    position = request_cursor[section]
+
+    if position
+      rows_beyond(relation, column, ">", position)
+    else
+      since = params[:since] ? Time.zone.parse(params[:since]) : DEFAULT_WINDOW.ago
+      relation.where("#{relation.table_name}.#{column} > ?", since)
+    end
+  end
+
+  # Position to hand back for `section`: the newest row in the delta, else where the client
+  # already was, else the newest row overall ([0, 0] when there are none, so every future row is new).
+  def next_position(section, delta, relation, column)
+    newest_position(delta, column) || request_cursor[section] || newest_position(relation, column) || [0, 0]
+  end
+
+  def newest_position(relation, column)
+    time, id = relation.reorder(column => :desc, id: :desc).pick(column, :id)
+    row_position(time, id) if time
+  end
+
+  # True when `section` did not move past the client's cursor, so its delta is empty.
+  def section_unchanged?(name, section)
+    request_cursor[name] == section[:position]
+  end
+
+  # Publishes the new cursor and its ETag; renders 304 and returns true when the client is current.
+  def updates_not_modified?(positions)
+    cursor = encode_cursor(positions)
+    response.headers[CURSOR_HEADER] = cursor
+    !stale?(etag: cursor)
+  end
+
+  def request_cursor
+    @request_cursor ||= params[:cursor].present? ? decode_cursor(params[:cursor]) : {}
+  end
+
+  def encode_cursor(positions)
+    encode_cursor_value(positions)
+  end
+
+  def decode_cursor(cursor)
+    positions = decode_cursor_value(cursor)
+    raise RowPositions::InvalidCursor unless positions.is_a?(Hash)
+
+    positions.to_h { |section, position| [section.to_sym, validate_position!(position)] }
+  end
+end
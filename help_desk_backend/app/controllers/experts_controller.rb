@@ -1,4 +1,8 @@
 class ExpertsController < ApplicationController
+  include KeysetPagination
+
+  QUEUE_PAGE_SIZE = 50
+  MAX_QUEUE_PAGE_SIZE = 200
 
   # RUBY NOTES for Katie and Che:
   # @expert_profile.update(expert_profile_params) tries to set those values on the expert profile and save them to the database
@@ -8,79 +12,59 @@ class ExpertsController < ApplicationController
   before_action :authenticate_expert
 
   # GET /expert/queue: get the expert queue (waiting and assigned conversations)
+  # Waiting conversations are paginated oldest first: `limit` (default 50) per page, and
+  # `cursor` set to the previous page's nextCursor for the next one.
   def queue
-    cache_key = [
-      "expert_queue_waiting",
-      Conversation.where(assigned_expert_id: nil, status: "waiting").maximum(:updated_at)
-    ].compact.join("/")
-
-    waiting_conversations = Rails.cache.fetch(cache_key, expires_in: 10.seconds) do
-      # Only runs on cache MISS
-      Conversation
-        .where(assigned_expert_id: nil, status: "waiting")
-        .includes(:initiator)
-        .to_a
-        .map { |c| serialize_conversation(c) }
-    end
-
-    # Always fetch assigned conversations fresh (not cached)
-    assigned = Conversation
-                .where(assigned_expert_id: @expert_profile.user_id)
-                .includes(:initiator, :assigned_expert)
-                .to_a
-
-    render json: {
-      waitingConversations: waiting_conversations,
-      assignedConversations: assigned.map { |c| serialize_conversation(c) }
-    }
+    limit = page_limit(default: QUEUE_PAGE_SIZE, max: MAX_QUEUE_PAGE_SIZE)
+    version = ExpertQueue.version
+
+    # First pages come from the snapshot of the current queue version (see ExpertQueue)
+    waiting_page = if params[:cursor].present?
+                     waiting_queue_page(limit)
+                   else
+                     ExpertQueue.snapshot(version, limit) { waiting_queue_page(limit) }
+                   end
+
+    # Always fetch assigned conversations fresh (their fragments are cached per updated_at)
+    assigned = Conversation.where(assigned_expert_id: @current_user.id)
+
+    render json: RecordSerializer.json_object(
+      waitingConversations: waiting_page[:conversations],
+      nextCursor: waiting_page[:next_cursor].to_json,
+      queueVersion: version.to_json,
+      assignedConversations: conversation_serializer.json(assigned)
+    )
   end
 
 
-  private
-
-  def serialize_conversation(convo)
-    {
-      id: convo.id.to_s,
-      title: convo.title,
-      status: convo.status,
-      questionerId: convo.initiator_id.to_s,
-      questionerUsername: convo.initiator.username,
-      assignedExpertId: convo.assigned_expert_id&.to_s,
-      assignedExpertUsername: convo.assigned_expert&.username,
-      createdAt: convo.created_at.iso8601,
-      updatedAt: convo.updated_at.iso8601,
-      lastMessageAt: convo.last_message_at&.iso8601
-    }
-  end
-
   # POST /expert/conversations/:conversation_id/claim: claim a conversation as an expert.
+  # The assignment is one conditional UPDATE (Conversation.claim), so when experts race for
+  # the same conversation one gets 200 and the others 409.
   def claim
 
-    # get the conversation given the conversation_id
-    conversation = Conversation.find(params[:conversation_id])
+    conversation_id = params[:conversation_id]
 
-    # check if conversation already has an expert assigned
-    if conversation.assigned_expert.present?
-      render json: { error: "Conversation is already assigned to an expert" },
-             status: :unprocessable_entity
-      return
-    end
+    claimed = Conversation.transaction do
+      next false unless Conversation.claim(conversation_id, @current_user)
 
-    #user = User.find(params[:expert_profile.user_id])
+      # make Expert Assignment object to store this assignment
+      ExpertAssignment.create!(
+        conversation_id: conversation_id,
+        expert_id: @expert_profile_id,
+        status: "active",
+        assigned_at: Time.current
+      )
+      true
+    end
 
-    # update expert's conversation_id to the id of the conversation being claimed
-    conversation.update!(
-      assigned_expert: @expert_profile.user,
-      status: "active"
-    )
+    unless claimed
+      # distinguish a lost race (or an already assigned conversation) from a bad id
+      raise ActiveRecord::RecordNotFound unless Conversation.exists?(conversation_id)
 
-    # make Expert Assignment object to store this assignment
-    ExpertAssignment.create!(
-      conversation: conversation,
-      expert_id: @expert_profile.id,
-      status: "active",
-      assigned_at: Time.current
-    )
+      render json: { error: "Conversation is already assigned to an expert" },
+             status: :conflict
+      return
+    end
 
     render json: { success: true }
 
@@ -93,7 +77,7 @@ class ExpertsController < ApplicationController
     conversation = Conversation.find(params[:conversation_id])
 
     # check if conversation is assigned to the current expert
-    unless conversation.assigned_expert.id == @expert_profile.user_id
+    unless conversation.assigned_expert.id == @current_user.id
       render json: { error: "Current expert is not assigned to this conversation" },
         status: :forbidden
       return
@@ -103,7 +87,7 @@ class ExpertsController < ApplicationController
     conversation.update!(assigned_expert: nil, status: "waiting")
 
     # update the expert assignment to mark it resolved
-    assignment = ExpertAssignment.where(conversation: conversation, expert_id: @expert_profile).order(assigned_at: :desc).first
+    assignment = ExpertAssignment.where(conversation: conversation, expert_id: @expert_profile_id).order(assigned_at: :desc).first
 
     if assignment
       assignment.update!(status: "resolved", resolved_at: Time.current)
@@ -119,7 +103,7 @@ class ExpertsController < ApplicationController
   # end
 
   def show
-    profile = @expert_profile
+    profile = expert_profile
     render json: {
       id: profile.id,
       bio: profile.bio,
@@ -137,15 +121,15 @@ class ExpertsController < ApplicationController
     #   render json: { errors: @expert_profile.errors.full_messages }, status: :unprocessable_entity
     # end
 
-    if @expert_profile.update(expert_profile_params)
+    if expert_profile.update(expert_profile_params)
       render json: {
-        id: @expert_profile.id,
-        bio: @expert_profile.bio,
-        knowledgeBaseLinks: @expert_profile.knowledge_base_links.presence,
-        faq: @expert_profile.faq.presence || []
+        id: expert_profile.id,
+        bio: expert_profile.bio,
+        knowledgeBaseLinks: expert_profile.knowledge_base_links.presence,
+        faq: expert_profile.faq.presence || []
       }
     else
-      render json: { errors: @expert_profile.errors.full_messages }, status: :unprocessable_entity
+      render json: { errors: expert_profile.errors.full_messages }, status: :unprocessable_entity
     end
 
   end
@@ -153,7 +137,7 @@ class ExpertsController < ApplicationController
   # GET /expert/assignments/history: get the expert's assignment history.
   def history
     assignments = ExpertAssignment
-                  .where(expert_id: @expert_profile.id)
+                  .where(expert_id: @expert_profile_id)
                   .order(assigned_at: :desc)
 
     render json: assignments.map { |a| format_assignment(a) }
@@ -161,26 +145,44 @@ class ExpertsController < ApplicationController
 
   private
 
-  # authenticates expert with JWT token
-  def authenticate_expert
+  def conversation_serializer
+    @conversation_serializer ||= ConversationSerializer.new(view: :list)
+  end
+
+  def waiting_queue_page(limit)
+    relation = ExpertQueue.waiting.order(:created_at, :id)
+    relation = keyset_after(relation, :created_at, params[:cursor]) if params[:cursor].present?
+    # one extra row tells whether there is a next page
+    rows = relation.limit(limit + 1).to_a
+    page = rows.first(limit)
 
-    token = request.headers["Authorization"]&.split(" ")&.last
+    {
+      conversations: conversation_serializer.json(page),
+      next_cursor: rows.size > limit ? encode_position(page.last, :created_at) : nil
+    }
+  end
 
-    payload = JwtService.decode(token).with_indifferent_access
-    @current_user = User.find_by(id: payload[:user_id])
+  # authenticates expert: @current_user was already set from the JWT by authenticate_user!,
+  # and AuthCache knows whether they have an expert profile
+  def authenticate_expert
 
     if @current_user.nil?
       return render json: { error: "Current user = nil" }, status: :forbidden
     end
 
-    @expert_profile = ExpertProfile.find_by(user_id: @current_user.id)
+    @expert_profile_id = AuthCache.expert_profile_id(@current_user.id)
 
-    if @expert_profile.nil?
+    if @expert_profile_id.nil?
       return render json: { error: "Not authorized as expert" }, status: :forbidden
     end
 
   end
 
+  # the full profile, only loaded by the actions that read or change it
+  def expert_profile
+    @expert_profile ||= ExpertProfile.find(@expert_profile_id)
+  end
+
   def expert_profile_params
     params.require(:expert_profile).permit(
       :bio,
@@ -1,9 +1,45 @@
 class HealthController < ApplicationController
 
-  skip_before_action :authenticate_user!, only: [:show]
+  skip_before_action :authenticate_user!, only: [:show, :caches, :metrics]
+  before_action :require_diagnostics_access, only: [:caches, :metrics]
+
+  # Header the load test harness sends with DIAGNOSTICS_TOKEN (loadtest/backend_stats.py)
+  DIAGNOSTICS_HEADER = "X-Diagnostics-Token"
+
+  # Outside development and test, /health/caches and /health/metrics are only served to
+  # requests carrying this token, and they are not served at all when it is unset
+  def self.diagnostics_token
+    ENV["DIAGNOSTICS_TOKEN"].presence
+  end
 
   # GET /health
   def show
     render json: { status: "ok", timestamp: Time.now.utc.iso8601 }
   end
-end
\ No newline at end of file
+
+  # GET /health/caches
+  # Hit/miss counters of this process's caches, scraped by the load test harness
+  def caches
+    render json: { llm: LlmCache.stats, auth: AuthCache.stats, fragments: FragmentCache.stats }
+  end
+
+  # GET /health/metrics
+  # Per-action cost histograms of this process (RequestCostCollector): wall time, SQL
+  # statements and time, cache hits, LLM time, allocations and the remaining Ruby time.
+  # The load test harness scrapes it at every step and diffs the bucket counts.
+  def metrics
+    render json: RequestCostCollector.stats
+  end
+
+  private
+
+  def require_diagnostics_access
+    return if Rails.env.local?
+
+    token = self.class.diagnostics_token
+    supplied = request.headers[DIAGNOSTICS_HEADER].to_s
+    return if token && ActiveSupport::SecurityUtils.secure_compare(supplied, token)
+
+    render json: { error: "Not found" }, status: :not_found
+  end
+end
@@ -1,9 +1,21 @@
 class MessagesController < ApplicationController
+  include KeysetPagination
+
+  MESSAGE_PAGE_SIZE = 50
+  MAX_MESSAGE_PAGE_SIZE = 200
+  # Cursors for the neighbouring pages of GET /conversations/:conversation_id/messages
+  BEFORE_CURSOR_HEADER = "X-Messages-Before"
+  AFTER_CURSOR_HEADER = "X-Messages-After"
+
   # All actions require JWT authentication via Authenticatable concern
   # JWT token should be provided in Authorization header: "Bearer <token>"
   # The @current_user is set by Authenticatable#authenticate_user! which uses JwtService.decode
 
   # GET /conversations/:conversation_id/messages
+  # Returns one page of messages, oldest first: the latest `limit` (default 50), or with
+  # `before` / `after` the page just before or after that cursor. The X-Messages-Before
+  # header (set only while older messages exist) and X-Messages-After carry the cursors
+  # for scrolling back and for fetching newer messages.
   def index
     conversation = Conversation.find_by(id: params[:conversation_id])
 
@@ -16,14 +28,34 @@ class MessagesController < ApplicationController
       return render json: { error: "(b) Conversation not found" }, status: :not_found
     end
 
+    limit = page_limit(default: MESSAGE_PAGE_SIZE, max: MAX_MESSAGE_PAGE_SIZE)
     messages = conversation.messages
-      .includes(:sender)
-      .order(created_at: :asc)
 
-    render json: messages.map { |m| message_response(m) }
+    if params[:after].present?
+      page = keyset_after(messages, :created_at, params[:after])
+        .order(created_at: :asc, id: :asc)
+        .limit(limit)
+        .to_a
+      older = page.any?
+    else
+      messages = keyset_before(messages, :created_at, params[:before]) if params[:before].present?
+      # newest first so the window is an index range from the tail; one extra row tells whether older ones exist
+      rows = messages.order(created_at: :desc, id: :desc).limit(limit + 1).to_a
+      older = rows.size > limit
+      page = rows.first(limit).reverse
+    end
+
+    response.headers[BEFORE_CURSOR_HEADER] = encode_position(page.first, :created_at) if older
+    after = page.any? ? encode_position(page.last, :created_at) : params[:after]
+    response.headers[AFTER_CURSOR_HEADER] = after if after.present?
+
+    render json: MessageSerializer.new.json(page)
   end
 
   # POST /messages
+  # One conversation SELECT, then the INSERT and the conversation bump (Message
+  # after_create) in the save transaction. The access check and the role compare ids,
+  # so neither participant is loaded.
   def create
     conversation = Conversation.find_by(id: params[:conversation_id])
 
@@ -31,18 +63,12 @@ class MessagesController < ApplicationController
       return render json: { error: "(1) Conversation not found" }, status: :not_found
     end
 
-    # Check if user has access to this conversation
-    unless conversation.initiator == @current_user || conversation.assigned_expert == @current_user
+    # Check if user has access to this conversation, and determine the sender's role
+    current_role = MessageWriter.role_for(conversation, @current_user)
+    unless current_role
       return render json: { error: "(2) Conversation not found" }, status: :not_found
     end
 
-    # Update conversation status if it was waiting and an expert is assigned
-    if conversation.status == "waiting" && conversation.assigned_expert
-      conversation.update(status: "active")
-    end
-    # Determine the sender's role based on the conversation
-    current_role = conversation.initiator == @current_user ? "initiator" : "expert"
-
     message = Message.new(
       conversation: conversation,
       sender: @current_user,
@@ -50,10 +76,19 @@ class MessagesController < ApplicationController
       content: params[:content],
       is_read: false
     )
+    messages_before = conversation.messages_count
 
-    if message.save
+    saved = Message.transaction do
+      # Update conversation status if it was waiting and an expert is assigned
+      if conversation.status == "waiting" && conversation.assigned_expert_id
+        conversation.update!(status: "active")
+      end
+      message.save or raise ActiveRecord::Rollback
+    end
+
+    if saved
       # If message is from initiator and expert is assigned, try auto-response
-      if current_role == "initiator" && conversation.assigned_expert
+      if current_role == "initiator" && conversation.assigned_expert_id
         auto_response_service = AutoResponseService.new(conversation, message.content)
         auto_response = auto_response_service.generate_response
 
@@ -61,7 +96,7 @@ class MessagesController < ApplicationController
           # Create automatic response from expert
           auto_message = Message.create(
             conversation: conversation,
-            sender: conversation.assigned_expert,
+            sender_id: conversation.assigned_expert_id,
             sender_role: "expert",
             content: auto_response,
             is_read: false
@@ -69,17 +104,39 @@ class MessagesController < ApplicationController
         end
       end
 
-      # Trigger summary generation after 3+ messages
-      if conversation.messages.count >= 3 && conversation.summary.blank?
-        GenerateSummaryJob.perform_later_or_now(conversation.id)
-      end
+      # Schedules a (debounced) summary refresh; the counter was read before this message
+      GenerateSummaryJob.request(conversation, messages_before + 1)
 
-      render json: message_response(message), status: :created
+      render json: MessageSerializer.new.json_one(message), status: :created
     else
       render json: { errors: message.errors.full_messages }, status: :unprocessable_entity
     end
   end
 
+  # POST /messages/batch
+  # Body: { messages: [{ conversationId, content }, ...] }, at most
+  # MessageWriter::MAX_BATCH_SIZE entries. Entries the user cannot post to are skipped
+  # and listed in `errors` by index; the rest are written together (see MessageWriter).
+  def batch
+    entries = params[:messages]
+    unless entries.is_a?(Array) && entries.any?
+      return render json: { error: "messages must be a non-empty array" }, status: :bad_request
+    end
+    if entries.size > MessageWriter::MAX_BATCH_SIZE
+      return render json: { error: "At most #{MessageWriter::MAX_BATCH_SIZE} messages per batch" },
+                    status: :payload_too_large
+    end
+
+    entries = entries.map do |entry|
+      entry = entry.respond_to?(:permit) ? entry.permit(:conversationId, :conversation_id, :content) : {}
+      { conversation_id: entry[:conversationId] || entry[:conversation_id], content: entry[:content] }
+    end
+    result = MessageWriter.new(@current_user).write_batch(entries)
+
+    render json: { created: result.created, errors: result.errors },
+           status: result.created.positive? ? :created : :unprocessable_entity
+  end
+
   # PUT /messages/:id/read
   def mark_read
     message = Message.find_by(id: params[:id])
@@ -103,20 +160,5 @@ class MessagesController < ApplicationController
     render json: { success: true }
   end
 
-  private
-
-  def message_response(message)
-    {
-      id: message.id.to_s,
-      conversationId: message.conversation_id.to_s,
-      senderId: message.sender_id.to_s,
-      senderUsernameWithId: "#{message.sender.username}##{message.sender.id}",
-      senderRole: message.sender_role,
-      content: message.content,
-      timestamp: message.created_at.iso8601,
-      isRead: message.is_read
-    }
-  end
-
 end
 
@@ -1,17 +1,20 @@
 # frozen_string_literal: true
 
 class AutoAssignExpertJob < ApplicationJob
-  queue_as :default
+  queue_as :assignments
 
-  # Set to true for synchronous execution (blocks request but works without background workers)
-  # Set to false for async execution (requires solid_queue worker running)
-  SYNCHRONOUS_MODE = true
+  # Set AUTO_ASSIGN_SYNCHRONOUS=true for synchronous execution (blocks POST /conversations for
+  # the whole LLM call but works without background workers). By default the job runs on
+  # solid_queue and clients poll GET /conversations/:id or listen on UpdatesChannel.
+  SYNCHRONOUS_MODE = ENV.fetch("AUTO_ASSIGN_SYNCHRONOUS", "false") == "true"
 
   # Automatically assigns a conversation to the most suitable expert
   # This job is triggered when a new conversation is created
   #
   # @param conversation_id [Integer] The ID of the conversation to assign
-  def perform(conversation_id)
+  # @param locust_request [Boolean] Whether the request that created it came from the load test harness,
+  #   which Current does not carry into the job
+  def perform(conversation_id, locust_request: false)
     conversation = Conversation.find_by(id: conversation_id)
     
     unless conversation
@@ -26,8 +29,9 @@ class AutoAssignExpertJob < ApplicationJob
     end
 
     # Perform auto-assignment
-    service = AutoExpertAssignmentService.new(conversation)
-    result = service.assign
+    result = Current.set(might_be_locust_request: locust_request) do
+      AutoExpertAssignmentService.new(conversation).assign
+    end
 
     # Log the result
     if result[:success]
@@ -39,15 +43,17 @@ class AutoAssignExpertJob < ApplicationJob
     # Log error but don't fail the job - the conversation is still valid
     Rails.logger.error("AutoAssignExpertJob error for conversation #{conversation_id}: #{e.message}")
     Rails.logger.error(e.backtrace.join("\n"))
+  ensure
+    # Lets clients tell "still assigning" from "no expert found"; touch also pushes the change to subscribers
+    conversation.touch(:auto_assignment_finished_at) if conversation&.persisted? && conversation.auto_assignment_finished_at.nil?
   end
 
   # Convenience method to handle sync/async execution
-  def self.perform_later_or_now(conversation_id)
+  def self.perform_later_or_now(conversation_id, locust_request: false)
     if SYNCHRONOUS_MODE
-      perform_now(conversation_id)
+      perform_now(conversation_id, locust_request: locust_request)
     else
-      perform_later(conversation_id)
+      perform_later(conversation_id, locust_request: locust_request)
     end
   end
 end
-
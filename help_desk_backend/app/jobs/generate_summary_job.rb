@@ -1,31 +1,88 @@
 class GenerateSummaryJob < ApplicationJob
-  queue_as :default
+  queue_as :summaries
 
-  # Set to true for synchronous execution (blocks request but works without background workers)
-  # Set to false for async execution (requires solid_queue worker running)
-  SYNCHRONOUS_MODE = true
+  # Set SUMMARY_SYNCHRONOUS=true to generate the first summary inline on the message write
+  # that needs it (blocks POST /messages for the LLM call but works without background
+  # workers; later messages do not refresh it). By default summaries are generated and
+  # kept current on solid_queue. Reads never generate one: they serve whatever summary is
+  # stored and only schedule the missing ones (.request_missing).
+  SYNCHRONOUS_MODE = ENV.fetch("SUMMARY_SYNCHRONOUS", "false") == "true"
+
+  # Conversations get a summary once they have this many messages, on writes and reads alike
+  MIN_MESSAGES = 1
+  # A summary is generated once no message has arrived for DEBOUNCE, but no later than
+  # MAX_DELAY after the first message it has to cover
+  DEBOUNCE = ENV.fetch("SUMMARY_DEBOUNCE_SECONDS", 10).to_f.seconds
+  MAX_DELAY = ENV.fetch("SUMMARY_MAX_DELAY_SECONDS", 60).to_f.seconds
+  # A request older than this is assumed lost (its job failed) and may be taken again
+  REQUEST_TIMEOUT = MAX_DELAY + 5.minutes
+  # Summaries generated at once across all workers; the rest wait their turn in the queue
+  CONCURRENCY = ENV.fetch("SUMMARY_JOB_CONCURRENCY", 2).to_i
+
+  limits_concurrency to: CONCURRENCY, key: "summaries", duration: 5.minutes
+
+  # Called on every message write with the conversation's message count after it. The
+  # first write claims the conversation's request with a conditional UPDATE and schedules
+  # the job; writes while it is pending only move last_message_at, which the job waits on.
+  def self.request(conversation, messages_count)
+    return if messages_count < MIN_MESSAGES
+    if SYNCHRONOUS_MODE
+      perform_now(conversation.id) if conversation.summary.blank?
+      return
+    end
+
+    schedule(conversation)
+  end
+
+  # Called by listings: schedules a summary for each listed conversation that has messages
+  # but none yet (written before summaries moved here, or whose job was lost). Never inline.
+  def self.request_missing(conversations)
+    conversations.each do |conversation|
+      schedule(conversation) if conversation.summary.blank? && conversation.messages_count >= MIN_MESSAGES
+    end
+  end
+
+  def self.schedule(conversation)
+    now = Time.current
+    # Already claimed as far as this copy knows: skip the UPDATE
+    return if conversation.summary_requested_at && conversation.summary_requested_at >= now - REQUEST_TIMEOUT
+
+    claimed = Conversation.where(id: conversation.id)
+                          .where("summary_requested_at IS NULL OR summary_requested_at < ?", now - REQUEST_TIMEOUT)
+                          .update_all(summary_requested_at: now) == 1
+    set(wait: DEBOUNCE).perform_later(conversation.id) if claimed
+  end
+  private_class_method :schedule
 
   def perform(conversation_id)
     conversation = Conversation.find_by(id: conversation_id)
     return unless conversation
 
-    # Only generate if there are messages and no summary yet
-    return if conversation.messages.count == 0
-    return if conversation.summary.present?
+    # Messages are still arriving: wait for them to settle, up to MAX_DELAY from the request
+    if (run_at = debounced_until(conversation))
+      self.class.set(wait_until: run_at).perform_later(conversation_id)
+      return
+    end
+
+    # Released before generating, so messages written meanwhile request the next summary
+    Conversation.where(id: conversation_id).update_all(summary_requested_at: nil)
+    return if conversation.messages_count.zero?
+    return if conversation.summary.present? && conversation.summary_last_message_at &&
+              conversation.summary_last_message_at >= conversation.last_message_at
 
-    summary_service = ConversationSummaryService.new(conversation)
-    summary_service.update_summary
+    ConversationSummaryService.new(conversation).update_summary
   rescue => e
     Rails.logger.error("Failed to generate summary for conversation #{conversation_id}: #{e.message}")
   end
 
-  # Convenience method to handle sync/async execution
-  def self.perform_later_or_now(conversation_id)
-    if SYNCHRONOUS_MODE
-      perform_now(conversation_id)
-    else
-      perform_later(conversation_id)
-    end
+  private
+
+  def debounced_until(conversation)
+    return unless conversation.summary_requested_at && conversation.last_message_at
+
+    settled_at = conversation.last_message_at + DEBOUNCE
+    deadline = conversation.summary_requested_at + MAX_DELAY
+    run_at = [settled_at, deadline].min
+    run_at if run_at > Time.current
   end
 end
-
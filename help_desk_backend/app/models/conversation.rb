@@ -6,24 +6,66 @@ class Conversation < ApplicationRecord
   validates :title, presence: true
   validates :status, inclusion: { in: %w[waiting active resolved] }
 
+  after_commit :broadcast_changed, on: [:create, :update]
+  after_commit :expert_queue_changed, if: :expert_queue_transition?
+
+  # MySQL serves `initiator_id = ? OR assigned_expert_id = ?` with a full scan or an
+  # index merge at best, so the user's conversations are the UNION ALL of one index range
+  # per role ([initiator_id, updated_at] and [assigned_expert_id, updated_at]), exposed as
+  # a derived table named `conversations` so the scope chains like any other.
   scope :for_user, ->(user) {
-    where("initiator_id = ? OR assigned_expert_id = ?", user.id, user.id)
+    from(sanitize_sql_array([<<~SQL.squish, user.id, user.id, user.id]))
+      (SELECT * FROM conversations WHERE initiator_id = ?
+       UNION ALL
+       SELECT * FROM conversations WHERE assigned_expert_id = ? AND initiator_id <> ?) AS conversations
+    SQL
   }
 
   scope :waiting, -> { where(status: "waiting") }
   
   scope :assigned_to, ->(expert) { where(assigned_expert_id: expert.id) }
 
+  # Assigns the conversation to `expert` with a single conditional UPDATE, so of several
+  # experts claiming at once exactly one wins. Returns false when it was already assigned
+  # (or does not exist). Callbacks are skipped, so the queue snapshot and broadcast are
+  # triggered here once the surrounding transaction commits.
+  def self.claim(id, expert)
+    claimed = where(id: id, assigned_expert_id: nil)
+                .update_all(assigned_expert_id: expert.id, status: "active", updated_at: Time.current) == 1
+    if claimed
+      ActiveRecord.after_all_transactions_commit do
+        ExpertQueue.changed!
+        UpdatesBroadcaster.conversation_changed(find(id), left_queue: true)
+      end
+    end
+    claimed
+  end
+
+  # Read from the counters Message maintains, so listings need no query per conversation
   def unread_count_for(user)
     return 0 unless user
     
-    if user == initiator
-      messages.where.not(sender_id: user.id).where(is_read: false).count
-    elsif user == assigned_expert
-      messages.where.not(sender_id: user.id).where(is_read: false).count
+    if user.id == initiator_id
+      initiator_unread_count
+    elsif user.id == assigned_expert_id
+      expert_unread_count
     else
       0
     end
   end
-end
 
+  private
+
+  def broadcast_changed
+    UpdatesBroadcaster.conversation_changed(self)
+  end
+
+  def expert_queue_transition?
+    destroyed? || (previously_new_record? && status == "waiting") ||
+      saved_change_to_status? || saved_change_to_assigned_expert_id?
+  end
+
+  def expert_queue_changed
+    ExpertQueue.changed!
+  end
+end
@@ -5,4 +5,26 @@ class ExpertProfile < ApplicationRecord
     # user_id should be not null and unique
     validates :user_id, presence: true, uniqueness: true
 
+    # keep this process's assignment shortlist index current
+    after_commit :index_for_assignment, on: [:create, :update]
+    after_commit :remove_from_assignment_index, on: :destroy
+
+    # AuthCache remembers whether a user has an expert profile
+    after_commit :invalidate_auth_cache
+
+    private
+
+    def index_for_assignment
+        ExpertCandidateIndex.index_profile(self)
+    end
+
+    def remove_from_assignment_index
+        ExpertCandidateIndex.remove(id)
+    end
+
+    def invalidate_auth_cache
+        AuthCache.invalidate_user(user_id)
+        AuthCache.invalidate_user(user_id_before_last_save) if user_id_before_last_save
+    end
+
 end
@@ -8,6 +8,8 @@ class Message < ApplicationRecord
   
   before_validation :set_sender_role, if: -> { sender_role.blank? && sender.present? && conversation.present? }
   after_create :update_conversation_last_message
+  after_update :update_conversation_unread_count, if: :saved_change_to_is_read?
+  after_create_commit :broadcast_created
   
   def set_sender_role
     return if sender_role.present?
@@ -32,7 +34,25 @@ class Message < ApplicationRecord
   
   private
   
+  # One UPDATE for last_message_at and the conversation's message counters
   def update_conversation_last_message
-    conversation.update_column(:last_message_at, created_at)
+    counter = unread_counter_column
+    Conversation.where(id: conversation_id).update_all([
+      "last_message_at = ?, messages_count = messages_count + 1, #{counter} = #{counter} + ?",
+      created_at, is_read ? 0 : 1
+    ])
+  end
+
+  def update_conversation_unread_count
+    Conversation.update_counters(conversation_id, unread_counter_column => is_read ? -1 : 1)
+  end
+
+  # A message is unread for the other participant: expert messages count for the initiator and vice versa
+  def unread_counter_column
+    sender_role == "expert" ? "initiator_unread_count" : "expert_unread_count"
+  end
+
+  def broadcast_created
+    UpdatesBroadcaster.message_created(self)
   end
 end
\ No newline at end of file
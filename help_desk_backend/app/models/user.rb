@@ -7,4 +7,13 @@ class User < ApplicationRecord
 
     # password should be not null, and should be long-ish? API specification lists "Password is too short" error message
     validates :password, presence: true, length: { minimum: 6 }, if: :password_digest_changed?
+
+    # cached identities (AuthCache) must not outlive a change to the user
+    after_commit :invalidate_auth_cache, on: [:update, :destroy]
+
+    private
+
+    def invalidate_auth_cache
+        AuthCache.invalidate_user(id)
+    end
 end
@@ -0,0 +1,141 @@
+# frozen_string_literal: true
+
+require "digest"
+
+class AuthCache
+  # Per-process cache for the authentication hot path.
+  #
+  # - Verified JWT payloads, keyed by the SHA-256 of the token and kept until the
+  #   token's own exp, so a client polling with the same token skips signature
+  #   verification. Tokens that fail verification are not cached.
+  # - Identities, keyed by user id: the user's database row and the id of their
+  #   expert profile (or nil), so authenticating costs no queries on a hit. Each
+  #   request gets its own User instance built from the cached row.
+  #
+  # User and ExpertProfile commits in this process drop the identity immediately;
+  # changes made by other processes are picked up within AUTH_CACHE_IDENTITY_TTL.
+  # Both maps are bounded LRUs of AUTH_CACHE_ENTRIES entries. Counters are per
+  # process and served by GET /health/caches.
+  #
+  # Usage:
+  #
+  #   AuthCache.authenticate(token)          # => User or nil
+  #   AuthCache.expert_profile_id(user.id)   # => Integer or nil
+
+  ENABLED = ENV.fetch("AUTH_CACHE_ENABLED", "true") == "true"
+  ENTRIES = ENV.fetch("AUTH_CACHE_ENTRIES", 10_000).to_i
+  IDENTITY_TTL = ENV.fetch("AUTH_CACHE_IDENTITY_TTL", 30).to_i.seconds
+
+  Identity = Struct.new(:user_attributes, :expert_profile_id)
+
+  class << self
+    delegate :authenticate, :payload, :user, :expert_profile_id, :invalidate_user, :clear, :stats, to: :instance
+
+    def instance
+      @instance ||= new
+    end
+  end
+
+  def initialize(entries: ENTRIES, identity_ttl: IDENTITY_TTL, enabled: ENABLED)
+    @tokens = LruCache.new(max_entries: entries)
+    @identities = LruCache.new(max_entries: entries)
+    @identity_ttl = identity_ttl
+    @enabled = enabled
+    @counters = Hash.new(0)
+    @mutex = Mutex.new
+  end
+
+  # The user a bearer token belongs to, or nil when the token is invalid, expired or its user is gone.
+  def authenticate(token)
+    decoded = payload(token)
+    decoded && user(decoded[:user_id])
+  end
+
+  # The verified JWT payload of `token`, or nil.
+  def payload(token)
+    return nil if token.blank?
+    return JwtService.decode(token) unless @enabled
+
+    key = Digest::SHA256.hexdigest(token)
+    if (decoded = @tokens.read(key))
+      count(:token_hits)
+      return decoded
+    end
+
+    count(:token_misses)
+    decoded = JwtService.decode(token)
+    return nil unless decoded
+
+    ttl = decoded[:exp] ? decoded[:exp].to_i - Time.now.to_i : nil
+    @tokens.write(key, decoded.freeze, expires_in: ttl) if ttl.nil? || ttl.positive?
+    decoded
+  end
+
+  def user(user_id)
+    return User.find_by(id: user_id) unless @enabled
+
+    identity = identity_for(user_id)
+    identity && User.instantiate(identity.user_attributes.dup)
+  end
+
+  def expert_profile_id(user_id)
+    return ExpertProfile.where(user_id: user_id).pick(:id) unless @enabled
+
+    identity_for(user_id)&.expert_profile_id
+  end
+
+  def invalidate_user(user_id)
+    @identities.delete(user_id.to_i)
+  end
+
+  def clear
+    @tokens.clear
+    @identities.clear
+  end
+
+  def stats
+    counters = @mutex.synchronize { @counters.dup }
+    {
+      pid: Process.pid,
+      enabled: @enabled,
+      tokenEntries: @tokens.size,
+      tokenHits: counters[:token_hits],
+      tokenMisses: counters[:token_misses],
+      identityEntries: @identities.size,
+      identityHits: counters[:identity_hits],
+      identityMisses: counters[:identity_misses],
+      hitRate: hit_rate(counters[:token_hits] + counters[:identity_hits],
+                        counters[:token_misses] + counters[:identity_misses])
+    }
+  end
+
+  private
+
+  def identity_for(user_id)
+    return nil if user_id.blank?
+
+    user_id = user_id.to_i
+    if (identity = @identities.read(user_id))
+      count(:identity_hits)
+      return identity
+    end
+
+    count(:identity_misses)
+    user = User.find_by(id: user_id)
+    return nil unless user
+
+    identity = Identity.new(user.attributes_before_type_cast.freeze,
+                            ExpertProfile.where(user_id: user_id).pick(:id)).freeze
+    @identities.write(user_id, identity, expires_in: @identity_ttl)
+    identity
+  end
+
+  def hit_rate(hits, misses)
+    lookups = hits + misses
+    lookups.zero? ? 0.0 : hits.fdiv(lookups).round(4)
+  end
+
+  def count(counter)
+    @mutex.synchronize { @counters[counter] += 1 }
+  end
+end
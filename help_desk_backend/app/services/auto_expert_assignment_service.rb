@@ -3,9 +3,15 @@
 class AutoExpertAssignmentService
   # Automatically assigns a conversation to the most suitable expert
   # Uses LLM to analyze conversation content and expert profiles to find the best match
-  
-  def initialize(conversation)
+  # Only the top EXPERT_SHORTLIST_SIZE experts from ExpertCandidateIndex go into the prompt
+  # (0 sends every expert)
+
+  SHORTLIST_SIZE = ENV.fetch("EXPERT_SHORTLIST_SIZE", 20).to_i
+
+  def initialize(conversation, shortlist_size: SHORTLIST_SIZE, candidate_index: ExpertCandidateIndex.instance)
     @conversation = conversation
+    @shortlist_size = shortlist_size
+    @candidate_index = candidate_index
     @bedrock_client = BedrockClient.new(
       model_id: ENV["BEDROCK_MODEL_ID"] || "anthropic.claude-3-5-haiku-20241022-v1:0",
       region: ENV["AWS_REGION"] || "us-west-2"
@@ -19,8 +25,8 @@ class AutoExpertAssignmentService
   #   - If error occurs: { success: false, reason: "error", error: error_message }
   def assign
     begin
-      # 1. Get all available experts
-      experts = ExpertProfile.includes(:user).all
+      # 1. Get the candidate experts
+      experts = candidate_experts
       
       return { success: false, reason: "no_experts_available" } if experts.empty?
 
@@ -77,8 +83,27 @@ class AutoExpertAssignmentService
     end
   end
 
+  # Expert profiles to offer the LLM: the best BM25 matches for the conversation text
+  def candidate_experts
+    return ExpertProfile.includes(:user).to_a if @shortlist_size <= 0
+
+    ids = @candidate_index.shortlist(conversation_text, limit: @shortlist_size)
+    experts = ExpertProfile.includes(:user).where(id: ids).index_by(&:id)
+    # Profiles deleted elsewhere since this process indexed them
+    (ids - experts.keys).each { |id| @candidate_index.remove(id) }
+    ids.filter_map { |id| experts[id] }
+  end
+
   private
 
+  def conversation_messages
+    @conversation_messages ||= @conversation.messages.order(created_at: :asc).limit(10).to_a
+  end
+
+  def conversation_text
+    [@conversation.title, *conversation_messages.map(&:content)].join("\n")
+  end
+
   def build_system_prompt
     <<~PROMPT
       You are an intelligent conversation assignment assistant. Your task is to select the most suitable expert from the available expert list based on the user's question/conversation content.
@@ -104,11 +129,10 @@ class AutoExpertAssignmentService
     conversation_info = <<~INFO
       Conversation Title: #{@conversation.title}
       Conversation Status: #{@conversation.status}
-      Created At: #{@conversation.created_at}
     INFO
 
     # Add conversation message content
-    messages = @conversation.messages.order(created_at: :asc).limit(10)
+    messages = conversation_messages
     if messages.any?
       conversation_info += "\nConversation Messages:\n"
       messages.each do |msg|
@@ -39,8 +39,33 @@ class BedrockClient
   #   raw_response: <Aws::BedrockRuntime::Types::ConverseResponse>
   # }
   #
+  # Responses are served from LlmCache when the same prompts were seen before; cached
+  # responses have raw_response: nil. Faked calls (see #should_fake_llm_call?) are cached
+  # under keys of their own, so a canned response is never served to a real request with
+  # the same prompts. Each call is instrumented as "call.bedrock_client" (see
+  # RequestCostCollector).
+  #
   def call(system_prompt:, user_prompt:, max_tokens: 1024, temperature: 0.7)
-    if should_fake_llm_call?
+    ActiveSupport::Notifications.instrument("call.bedrock_client", model_id: @model_id) do
+      faked = should_fake_llm_call?
+      LlmCache.fetch(
+        model_id: @model_id,
+        system_prompt: system_prompt,
+        user_prompt: user_prompt,
+        max_tokens: max_tokens,
+        temperature: temperature,
+        faked: faked
+      ) do
+        call_model(system_prompt: system_prompt, user_prompt: user_prompt, max_tokens: max_tokens,
+                   temperature: temperature, faked: faked)
+      end
+    end
+  end
+
+  private
+
+  def call_model(system_prompt:, user_prompt:, max_tokens:, temperature:, faked:)
+    if faked
       sleep(rand(0.8..3.5)) # Simulate a delay
       return {
         output_text: "This is a fake response from the LLM.",
@@ -80,8 +105,6 @@ class BedrockClient
     raise "Bedrock LLM call failed: #{e.message}"
   end
 
-  private
-
   def should_fake_llm_call?
     !(ENV["ALLOW_BEDROCK_CALL"] == "true") || Current.might_be_locust_request
   end
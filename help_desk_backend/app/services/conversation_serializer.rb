@@ -0,0 +1,57 @@
+# frozen_string_literal: true
+
+class ConversationSerializer < RecordSerializer
+  # Conversation JSON (see RecordSerializer).
+  #
+  # - :list, for polls and the expert queue: ids, title, status, participants' usernames
+  #   and timestamps.
+  # - :detail, for /conversations: :list plus the "username#id" forms, assignmentPending,
+  #   the summary and summaryLastMessageAt, the last message it covers (the summary is
+  #   behind while lastMessageAt is later).
+  #
+  # With a viewer, unreadCount is added from the viewer's counter column.
+  #
+  #   ConversationSerializer.new(view: :list, viewer: current_user).json(conversations)
+
+  VERSION = 2
+  NAMESPACE = "conversations"
+  VIEWS = %i[list detail].freeze
+  PRELOAD = %i[initiator assigned_expert].freeze
+
+  private
+
+  # Message writes bump last_message_at without touching updated_at
+  def cache_key(conversation)
+    "#{super}-#{conversation.last_message_at&.to_fs(:usec)}"
+  end
+
+  def fields(conversation)
+    initiator = conversation.initiator
+    expert = conversation.assigned_expert
+    fields = {
+      id: conversation.id.to_s,
+      title: conversation.title,
+      status: conversation.status,
+      questionerId: conversation.initiator_id.to_s,
+      questionerUsername: initiator.username,
+      assignedExpertId: conversation.assigned_expert_id&.to_s,
+      assignedExpertUsername: expert&.username,
+      createdAt: conversation.created_at.iso8601,
+      updatedAt: conversation.updated_at.iso8601,
+      lastMessageAt: conversation.last_message_at&.iso8601
+    }
+    return fields unless @view == :detail
+
+    fields.merge(
+      questionerUsernameWithId: "#{initiator.username}##{initiator.id}",
+      assignedExpertUsernameWithId: expert ? "#{expert.username}##{expert.id}" : nil,
+      assignmentPending: conversation.assigned_expert_id.nil? && conversation.auto_assignment_finished_at.nil?,
+      summary: conversation.summary,
+      summaryLastMessageAt: conversation.summary_last_message_at&.iso8601
+    )
+  end
+
+  def viewer_fields(conversation)
+    { unreadCount: conversation.unread_count_for(@viewer) }
+  end
+end
@@ -8,9 +8,9 @@ class ConversationSummaryService
     @bedrock_client = BedrockClient.new(model_id: MODEL_ID)
   end
 
-  # Generate a summary of the conversation
+  # Generate a summary of the conversation from its latest 20 messages
   def generate_summary
-    messages = @conversation.messages.order(created_at: :asc).limit(20)
+    messages = @conversation.messages.order(created_at: :desc).limit(20).to_a.reverse
 
     return nil if messages.empty?
 
@@ -45,15 +45,18 @@ class ConversationSummaryService
       response[:output_text].strip
     rescue => e
       Rails.logger.error("Conversation summary LLM call failed: #{e.message}")
-      # Fallback: use the first message as summary
+      # Keep an existing summary (it is refreshed after the next message); otherwise fall back to the first message
+      return nil if @conversation.summary.present?
+
       messages.first&.content&.truncate(100) || "No summary available"
     end
   end
 
-  # Update the conversation's summary field
+  # Update the conversation's summary field, recording the last message it covers
   def update_summary
+    covered = @conversation.last_message_at
     summary = generate_summary
-    @conversation.update(summary: summary) if summary
+    @conversation.update(summary: summary, summary_last_message_at: covered) if summary
     summary
   end
 end
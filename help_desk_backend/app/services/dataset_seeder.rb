@@ -0,0 +1,267 @@
+# frozen_string_literal: true
+
+class DatasetSeeder
+  # Bulk synthetic dataset for data-size scaling runs (bin/rails dataset:seed).
+  #
+  # Generates users, experts with bios, FAQs and knowledge base links, conversations
+  # and messages, and writes them with batched insert_all: no validations, callbacks or
+  # per-row bcrypt. Every account shares one password digest computed up front. Ids are
+  # assigned here, counting up from the tables' current maximum, so nothing else should
+  # write to the tables while it runs.
+  #
+  # The data is skewed the way a help desk is. A few users open most conversations and
+  # a few experts handle most of them (power law over user and expert ranks). Message
+  # counts per conversation are heavy-tailed around the requested mean. Recent
+  # conversations are more likely to still be waiting or active. Every conversation
+  # gets a summary covering its messages, so reading them does not queue LLM work.
+  # Counter columns (messages_count, unread counts, last_message_at) match the
+  # messages, as they would after the normal write path.
+  #
+  # With `export_path`, credentials for every expert and the first `export_users`
+  # users (the heaviest ones) are written in the loadtest/token_pool.py format, so
+  # TOKEN_POOL=<export_path> runs the personas against the seeded accounts.
+  #
+  # Usage:
+  #
+  #   DatasetSeeder.new(users: 100_000, experts: 500, conversations: 200_000, messages: 1_000_000).run
+  #   # => { users: 100000, experts: 500, conversations: 200000, messages: 1000187, ... }
+
+  BATCH_SIZE = 5_000
+  USERNAME_PREFIX = "seed"
+  DEFAULT_PASSWORD = "password"
+
+  # Larger exponents concentrate conversations on fewer initiators and experts
+  INITIATOR_SKEW = 2.5
+  EXPERT_SKEW = 2.0
+  # Pareto shape of messages per conversation; lower is heavier-tailed (must be > 1)
+  MESSAGE_TAIL = 1.5
+  MAX_MESSAGES_FACTOR = 50
+
+  TOPICS = {
+    "billing" => %w[invoice refund charge subscription payment card receipt plan upgrade],
+    "login" => %w[password reset account locked two-factor email session sso token],
+    "database" => %w[mysql query index timeout migration replica deadlock backup connection],
+    "deployment" => %w[deploy docker kubernetes rollback pipeline build container release logs],
+    "networking" => %w[dns latency firewall vpn proxy certificate tls timeout packet],
+    "mobile" => %w[ios android crash notification update install battery sync app],
+    "api" => %w[endpoint rate-limit webhook json pagination authentication error status sdk],
+    "performance" => %w[slow cpu memory cache profiling load throughput latency queue]
+  }.freeze
+  OPENERS = ["Hi, I need help with", "Quick question about", "We are seeing problems with",
+             "Can someone explain", "Since yesterday our", "Is it expected that the"].freeze
+  REPLIES = ["Thanks, that helped.", "Could you share the exact error message?", "I tried that already.",
+             "Let me check and get back to you.", "That should be fixed now, can you retry?",
+             "Here are the logs from this morning.", "Which version are you running?"].freeze
+
+  def initialize(users:, experts:, conversations:, messages:, days: 90, seed: 1, password: DEFAULT_PASSWORD,
+                 batch_size: BATCH_SIZE, export_path: nil, export_users: 10_000, log: nil)
+    raise ArgumentError, "experts must be positive" unless experts.positive?
+    raise ArgumentError, "users must be positive" unless users.positive?
+
+    @users = users
+    @experts = experts
+    @conversations = conversations
+    @messages = messages
+    @days = days
+    @random = Random.new(seed)
+    @password = password
+    @batch_size = batch_size
+    @export_path = export_path
+    @export_users = export_users
+    @log = log
+    @now = Time.current.change(usec: 0)
+    @counts = Hash.new(0)
+  end
+
+  def run
+    started = Process.clock_gettime(Process::CLOCK_MONOTONIC)
+    @digest = BCrypt::Password.create(@password)
+    @first_user_id = User.maximum(:id).to_i + 1
+    @first_conversation_id = Conversation.maximum(:id).to_i + 1
+    @first_profile_id = ExpertProfile.maximum(:id).to_i + 1
+
+    seed_users
+    seed_expert_profiles
+    seed_conversations
+    export_credentials if @export_path
+    ExpertQueue.changed!
+
+    @counts.merge(seconds: (Process.clock_gettime(Process::CLOCK_MONOTONIC) - started).round(1))
+  end
+
+  private
+
+  # Experts are user accounts too; they come first so expert rank n is user id first_user_id + n
+  def expert_user_id(rank)
+    @first_user_id + rank
+  end
+
+  def user_id(rank)
+    @first_user_id + @experts + rank
+  end
+
+  def username(rank, expert)
+    expert ? "#{USERNAME_PREFIX}_expert_#{rank}" : "#{USERNAME_PREFIX}_user_#{rank}"
+  end
+
+  def seed_users
+    (0...(@experts + @users)).each_slice(@batch_size) do |ranks|
+      insert(User, ranks.map do |n|
+        expert = n < @experts
+        created = random_time(@days * 1.5)
+        { id: @first_user_id + n, username: username(expert ? n : n - @experts, expert), password_digest: @digest,
+          last_active_at: random_time(@days), created_at: created, updated_at: created }
+      end)
+    end
+    @counts[:experts] = @experts
+    @counts[:users] = @users
+  end
+
+  def seed_expert_profiles
+    (0...@experts).each_slice(@batch_size) do |ranks|
+      insert(ExpertProfile, ranks.map do |n|
+        topics = TOPICS.keys.sample(@random.rand(1..3), random: @random)
+        created = random_time(@days * 1.5)
+        { id: @first_profile_id + n, user_id: expert_user_id(n), bio: bio(topics),
+          faq: topics.map { |topic| { question: "How do I fix #{topic} #{word(topic)} issues?", answer: sentence(topic) } },
+          knowledge_base_links: topics.map { |topic| "https://kb.example.com/#{topic}/#{word(topic)}" },
+          created_at: created, updated_at: created }
+      end)
+    end
+  end
+
+  def seed_conversations
+    conversations = []
+    messages = []
+    assignments = []
+    remaining = @messages
+
+    @conversations.times do |n|
+      # Drawn around what is left per conversation, so the total lands close to @messages
+      left = @conversations - n
+      count = left == 1 ? [remaining, 1].max : message_count(remaining.fdiv(left))
+      remaining -= count
+
+      build_conversation(@first_conversation_id + n, count, conversations, messages, assignments)
+      flush(conversations, messages, assignments) if conversations.size >= @batch_size || messages.size >= @batch_size
+    end
+    flush(conversations, messages, assignments)
+  end
+
+  # Conversations go in before the messages that reference them
+  def flush(conversations, messages, assignments)
+    insert(Conversation, conversations)
+    insert(ExpertAssignment, assignments)
+    messages.each_slice(@batch_size) { |rows| insert(Message, rows) }
+    [conversations, messages, assignments].each(&:clear)
+  end
+
+  def build_conversation(id, count, conversations, messages, assignments)
+    topic = TOPICS.keys.sample(random: @random)
+    initiator = user_id(skewed_rank(@users, INITIATOR_SKEW))
+    age = @random.rand
+    created = @now - (age * @days).days
+    status = conversation_status(age)
+    expert_rank = skewed_rank(@experts, EXPERT_SKEW) unless status == "waiting"
+    expert = expert_rank && expert_user_id(expert_rank)
+
+    # Messages spread over part of the time between creation and now
+    span = [(@now - created) * @random.rand, 60].max
+    at = created
+    unread = { "initiator" => 0, "expert" => 0 }
+    trailing_unread = status == "resolved" ? 0 : @random.rand(0..3)
+    count.times do |i|
+      role = if expert.nil? || i.zero? then "initiator"
+             elsif i.odd? then @random.rand < 0.8 ? "expert" : "initiator"
+             else @random.rand < 0.8 ? "initiator" : "expert"
+             end
+      at += span / count
+      read = i < count - trailing_unread
+      unread[role] += 1 unless read
+      messages << { conversation_id: id, sender_id: role == "expert" ? expert : initiator, sender_role: role,
+                    content: i.zero? ? opener(topic) : reply(topic), is_read: read, created_at: at, updated_at: at }
+    end
+
+    conversations << {
+      id: id, title: "#{topic.capitalize}: #{word(topic)} #{word(topic)}", status: status,
+      initiator_id: initiator, assigned_expert_id: expert, messages_count: count, last_message_at: at,
+      initiator_unread_count: unread["expert"], expert_unread_count: unread["initiator"],
+      summary: "The user asked about #{topic} (#{word(topic)}, #{word(topic)}); #{count} messages so far.",
+      summary_last_message_at: at,
+      auto_assignment_finished_at: expert && created, created_at: created, updated_at: at
+    }
+    if expert
+      assignments << { conversation_id: id, expert_id: @first_profile_id + expert_rank, assigned_at: created,
+                       status: status == "resolved" ? "Resolved" : "Active",
+                       resolved_at: status == "resolved" ? at : nil, created_at: created, updated_at: at }
+    end
+    @counts[:conversations] += 1
+    @counts[:messages] += count
+  end
+
+  def export_credentials
+    exported = 0
+    File.open(@export_path, "w") do |file|
+      ranks = (0...@experts).map { |n| [n, true] } + (0...[@export_users, @users].min).map { |n| [n, false] }
+      ranks.each do |rank, expert|
+        id = expert ? expert_user_id(rank) : user_id(rank)
+        token = JwtService.encode(User.new(id: id))
+        file.puts({ username: username(rank, expert), password: @password, user_id: id, token: token,
+                    exp: JwtService.decode(token)[:exp], is_expert: expert }.to_json)
+        exported += 1
+      end
+    end
+    @counts[:exported] = exported
+  end
+
+  def insert(model, rows)
+    return if rows.empty?
+
+    model.insert_all!(rows)
+    @log&.call("#{model.table_name}: #{rows.size} rows")
+  end
+
+  # Rank in 0...size, with low ranks far more likely the larger `skew` is
+  def skewed_rank(size, skew)
+    (size * @random.rand**skew).to_i.clamp(0, size - 1)
+  end
+
+  # Pareto sample scaled to `mean`, capped so one conversation cannot take the whole budget
+  def message_count(mean)
+    sample = (1 - @random.rand)**(-1 / MESSAGE_TAIL) * (MESSAGE_TAIL - 1) / MESSAGE_TAIL
+    (mean * sample).round.clamp(1, [(mean * MAX_MESSAGES_FACTOR).ceil, 1].max)
+  end
+
+  # `age` is 0 for the newest conversation and 1 for the oldest
+  def conversation_status(age)
+    roll = @random.rand
+    if roll < 0.3 * (1 - age) then "waiting"
+    elsif roll < 0.2 + 0.5 * (1 - age) then "active"
+    else "resolved"
+    end
+  end
+
+  def random_time(days)
+    @now - (@random.rand * days).days
+  end
+
+  def word(topic)
+    TOPICS[topic].sample(random: @random)
+  end
+
+  def sentence(topic)
+    "Check the #{word(topic)} settings, then the #{word(topic)} and #{word(topic)} before retrying."
+  end
+
+  def opener(topic)
+    "#{OPENERS.sample(random: @random)} #{topic} #{word(topic)}: the #{word(topic)} fails after the #{word(topic)}."
+  end
+
+  def reply(topic)
+    @random.rand < 0.5 ? REPLIES.sample(random: @random) : sentence(topic)
+  end
+
+  def bio(topics)
+    "Support engineer focused on #{topics.join(', ')}. #{topics.map { |topic| word(topic) }.join(', ')} specialist."
+  end
+end
@@ -0,0 +1,93 @@
+# frozen_string_literal: true
+
+class ExpertCandidateIndex
+  # Per-process BM25 index over expert profiles (bio, FAQ and knowledge base links),
+  # used to shortlist experts for AutoExpertAssignmentService so the assignment
+  # prompt holds the top few candidates instead of every expert.
+  #
+  # The index is built from the table on first use. Profiles saved in this process
+  # are re-indexed from ExpertProfile's after_commit callback; changes made by other
+  # processes are picked up by re-reading profiles updated since the last sync, at
+  # most every EXPERT_INDEX_SYNC_INTERVAL seconds. Profiles deleted by another process
+  # linger until a caller that loads the shortlist finds them missing and calls remove.
+  #
+  # Usage:
+  #
+  #   ExpertCandidateIndex.shortlist("Database connection problem", limit: 20) # => [expert_profile_id, ...]
+
+  SYNC_INTERVAL = ENV.fetch("EXPERT_INDEX_SYNC_INTERVAL", 5).to_f
+  BATCH_SIZE = 1000
+  # Re-read a little before the high-water mark to catch rows committed late with an older timestamp
+  SYNC_OVERLAP = 2.seconds
+
+  class << self
+    delegate :shortlist, :index_profile, :remove, to: :instance
+
+    def instance
+      @instance ||= new
+    end
+
+    def document_for(profile)
+      [profile.bio, flatten_text(profile.faq), flatten_text(profile.knowledge_base_links)].compact.join("\n")
+    end
+
+    # FAQ and link columns are free-form JSON: collect every string in them
+    def flatten_text(value)
+      case value
+      when Hash then value.flat_map { |key, item| [key.to_s, flatten_text(item)] }.compact.join(" ")
+      when Array then value.map { |item| flatten_text(item) }.compact.join(" ")
+      when nil then nil
+      else value.to_s
+      end
+    end
+  end
+
+  def initialize(sync_interval: SYNC_INTERVAL)
+    @index = Bm25Index.new
+    @sync_interval = sync_interval
+    @synced_through = nil
+    @synced_at = nil
+    @sync_mutex = Mutex.new
+  end
+
+  # Ids of up to `limit` expert profiles, best match for `text` first. When fewer than
+  # `limit` profiles match, the rest are filled with unmatched profiles in id order so
+  # the model still gets a bounded list to choose from (or decline).
+  def shortlist(text, limit:)
+    sync
+    ids = @index.search(text, limit: limit).map(&:first)
+    return ids if ids.size >= limit
+
+    ids + (@index.ids.sort - ids).first(limit - ids.size)
+  end
+
+  def index_profile(profile)
+    @index.upsert(profile.id, self.class.document_for(profile))
+  end
+
+  def remove(id)
+    @index.delete(id)
+  end
+
+  def size
+    sync
+    @index.size
+  end
+
+  # Brings the index up to date with the table: everything on first use, then only
+  # profiles updated since the previous sync.
+  def sync(force: false)
+    @sync_mutex.synchronize do
+      now = Process.clock_gettime(Process::CLOCK_MONOTONIC)
+      return if !force && @synced_at && now - @synced_at < @sync_interval
+
+      scope = ExpertProfile.select(:id, :bio, :faq, :knowledge_base_links, :updated_at)
+      scope = scope.where("updated_at >= ?", @synced_through - SYNC_OVERLAP) if @synced_through
+      scope.find_each(batch_size: BATCH_SIZE) do |profile|
+        index_profile(profile)
+        @synced_through = profile.updated_at if @synced_through.nil? || profile.updated_at > @synced_through
+      end
+      @synced_at = now
+    end
+  end
+end
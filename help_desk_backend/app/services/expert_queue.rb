@@ -0,0 +1,52 @@
+# frozen_string_literal: true
+
+class ExpertQueue
+  # The waiting queue experts claim from (unassigned conversations in "waiting"), oldest first,
+  # and a snapshot of its first pages.
+  #
+  # Instead of deriving a cache key from the table on every request, the queue has a
+  # version token in Rails.cache that Conversation replaces whenever a conversation
+  # enters or leaves the queue (created waiting, status or assignee changed, claimed,
+  # destroyed). First pages are kept per process under that version, so a queue poll
+  # costs one cache read while the queue is unchanged. Deeper pages (with a cursor)
+  # always come from the database. Entries also expire after SNAPSHOT_TTL, which bounds
+  # how stale non-transition fields such as lastMessageAt can be.
+  #
+  # Usage:
+  #
+  #   version = ExpertQueue.version
+  #   ExpertQueue.snapshot(version, limit) { build_first_page(limit) }
+  #   ExpertQueue.changed!
+
+  VERSION_KEY = "expert_queue/version"
+  SNAPSHOT_TTL = 30.seconds
+  SNAPSHOT_ENTRIES = 64
+
+  class << self
+    def waiting
+      Conversation.where(assigned_expert_id: nil, status: "waiting")
+    end
+
+    def version
+      Rails.cache.fetch(VERSION_KEY) { SecureRandom.hex(8) }
+    end
+
+    def changed!
+      Rails.cache.write(VERSION_KEY, SecureRandom.hex(8))
+    end
+
+    def snapshot(version, *key)
+      cache_key = [version, *key]
+      page = snapshots.read(cache_key)
+      return page if page
+
+      snapshots.write(cache_key, yield.freeze, expires_in: SNAPSHOT_TTL)
+    end
+
+    private
+
+    def snapshots
+      @snapshots ||= LruCache.new(max_entries: SNAPSHOT_ENTRIES)
+    end
+  end
+end
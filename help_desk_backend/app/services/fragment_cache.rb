@@ -0,0 +1,98 @@
+# frozen_string_literal: true
+
+class FragmentCache
+  # Encoded JSON fragments of single records, for RecordSerializer.
+  #
+  # Keys embed the record's cache version (its updated_at, see RecordSerializer#cache_key),
+  # so a changed record is looked up under a new key and its old fragment just ages
+  # out; nothing is ever invalidated. A listing makes one pass over its keys: a
+  # per-process LruCache first, then a single Rails.cache.read_multi for what that
+  # missed, and the caller's block builds whatever is still missing, which is written
+  # back to both with one write_multi. Counters are per process and served by
+  # GET /health/caches.
+  #
+  # Usage:
+  #
+  #   FragmentCache.fetch_multi(keys) { |missing_keys| { key => json, ... } } # => [json, ...] in key order
+
+  ENABLED = ENV.fetch("FRAGMENT_CACHE_ENABLED", "true") == "true"
+  L1_ENTRIES = ENV.fetch("FRAGMENT_CACHE_L1_ENTRIES", 50_000).to_i
+  # Set to false to keep fragments in process only (Rails.cache is solid_cache, a table, in production)
+  SHARED = ENV.fetch("FRAGMENT_CACHE_SHARED", "true") == "true"
+  TTL = ENV.fetch("FRAGMENT_CACHE_TTL", 1.hour.to_i).to_i.seconds
+
+  class << self
+    delegate :fetch_multi, :stats, :clear, to: :instance
+
+    def instance
+      @instance ||= new
+    end
+  end
+
+  def initialize(store: SHARED ? Rails.cache : nil, l1_entries: L1_ENTRIES, ttl: TTL, enabled: ENABLED)
+    @store = store
+    @l1 = LruCache.new(max_entries: l1_entries)
+    @ttl = ttl
+    @enabled = enabled
+    @counters = Hash.new(0)
+    @mutex = Mutex.new
+  end
+
+  def fetch_multi(keys)
+    return yield(keys).values_at(*keys) unless @enabled
+
+    found = {}
+    keys.each do |key|
+      fragment = @l1.read(key)
+      found[key] = fragment if fragment
+    end
+    count(:l1_hits, found.size)
+
+    missing = keys.reject { |key| found.key?(key) }
+    if missing.any? && @store
+      shared = @store.read_multi(*missing)
+      shared.each { |key, fragment| @l1.write(key, fragment, expires_in: @ttl) }
+      found.merge!(shared)
+      count(:l2_hits, shared.size)
+      missing = missing.reject { |key| shared.key?(key) }
+    end
+
+    if missing.any?
+      built = yield(missing)
+      @store&.write_multi(built, expires_in: @ttl)
+      built.each { |key, fragment| @l1.write(key, fragment, expires_in: @ttl) }
+      found.merge!(built)
+      count(:misses, built.size)
+    end
+
+    found.values_at(*keys)
+  end
+
+  def stats
+    counters = @mutex.synchronize { @counters.dup }
+    hits = counters[:l1_hits] + counters[:l2_hits]
+    lookups = hits + counters[:misses]
+
+    {
+      pid: Process.pid,
+      enabled: @enabled,
+      l1Entries: @l1.size,
+      l1Evictions: @l1.evictions,
+      l1Hits: counters[:l1_hits],
+      l2Hits: counters[:l2_hits],
+      misses: counters[:misses],
+      hitRate: lookups.zero? ? 0.0 : hits.fdiv(lookups).round(4)
+    }
+  end
+
+  def clear
+    @l1.clear
+    @mutex.synchronize { @counters.clear }
+  end
+
+  private
+
+  def count(counter, by = 1)
+    @mutex.synchronize { @counters[counter] += by }
+  end
+end
@@ -0,0 +1,148 @@
+# frozen_string_literal: true
+
+require "digest"
+
+class LlmCache
+  # Content-addressed cache for LLM calls made through BedrockClient#call.
+  #
+  # Keys are a SHA-256 digest of the model, the generation settings and the
+  # whitespace-normalized prompts. The prompts embed everything an answer depends
+  # on (the expert FAQ for auto-responses, expert bios for assignment, the message
+  # history for summaries), so editing an FAQ or bio produces a new key rather
+  # than a stale hit. Canned responses of faked calls (load test traffic, see
+  # BedrockClient#should_fake_llm_call?) are kept under FAKE_KEY_PREFIX, apart from
+  # real answers.
+  #
+  # Lookups go through a per-process LruCache, then Rails.cache (solid_cache in
+  # production, bounded by its max_size); entries expire after LLM_CACHE_TTL
+  # seconds in both. Concurrent misses for one key within a process share a
+  # single model call. Counters are per process and served by GET /health/caches.
+  #
+  # Usage:
+  #
+  #   LlmCache.fetch(model_id:, system_prompt:, user_prompt:, max_tokens:, temperature:, faked: false) do
+  #     # the uncached call, returning { output_text: ... }
+  #   end
+
+  KEY_PREFIX = "llm/v1"
+  FAKE_KEY_PREFIX = "llm/v1/fake"
+  ENABLED = ENV.fetch("LLM_CACHE_ENABLED", "true") == "true"
+  TTL = ENV.fetch("LLM_CACHE_TTL", 1.day.to_i).to_i.seconds
+  L1_ENTRIES = ENV.fetch("LLM_CACHE_L1_ENTRIES", 1000).to_i
+
+  class << self
+    delegate :fetch, :stats, to: :instance
+
+    def instance
+      @instance ||= new
+    end
+
+    def key_for(model_id:, system_prompt:, user_prompt:, max_tokens:, temperature:, faked: false)
+      material = [model_id, max_tokens, temperature, normalize(system_prompt), normalize(user_prompt)].join("\u0000")
+      "#{faked ? FAKE_KEY_PREFIX : KEY_PREFIX}/#{Digest::SHA256.hexdigest(material)}"
+    end
+
+    def normalize(prompt)
+      prompt.to_s.strip.gsub(/\s+/, " ")
+    end
+  end
+
+  def initialize(store: Rails.cache, l1_entries: L1_ENTRIES, ttl: TTL, enabled: ENABLED)
+    @store = store
+    @l1 = LruCache.new(max_entries: l1_entries)
+    @ttl = ttl
+    @enabled = enabled
+    @flights = {}
+    @counters = Hash.new(0)
+    @mutex = Mutex.new
+  end
+
+  # Returns the cached response for these call parameters, or yields to make the call and caches it.
+  # Errors raised by the block are not cached and reach every caller waiting on the same key.
+  def fetch(model_id:, system_prompt:, user_prompt:, max_tokens:, temperature:, faked: false)
+    return yield unless @enabled
+
+    key = self.class.key_for(model_id: model_id, system_prompt: system_prompt, user_prompt: user_prompt,
+                             max_tokens: max_tokens, temperature: temperature, faked: faked)
+
+    if (entry = @l1.read(key))
+      return hit(:l1_hits, entry)
+    end
+
+    if (entry = @store.read(key))
+      @l1.write(key, entry, expires_in: @ttl)
+      return hit(:l2_hits, entry)
+    end
+
+    flight, leader = join_flight(key)
+    return hit(:coalesced, flight.value!) unless leader
+
+    begin
+      # Another thread may have filled the cache between our miss and taking the lead
+      if (entry = @l1.read(key))
+        flight.fulfill(entry)
+        return hit(:l1_hits, entry)
+      end
+
+      started = Process.clock_gettime(Process::CLOCK_MONOTONIC)
+      response = yield
+      latency_ms = ((Process.clock_gettime(Process::CLOCK_MONOTONIC) - started) * 1000).round
+      entry = { output_text: response[:output_text], latency_ms: latency_ms }
+
+      @store.write(key, entry, expires_in: @ttl)
+      @l1.write(key, entry, expires_in: @ttl)
+      count(:misses)
+      count(:llm_ms, latency_ms)
+      flight.fulfill(entry)
+      response
+    rescue StandardError => e
+      flight.reject(e)
+      raise
+    ensure
+      @mutex.synchronize { @flights.delete(key) }
+    end
+  end
+
+  def stats
+    counters = @mutex.synchronize { @counters.dup }
+    hits = counters[:l1_hits] + counters[:l2_hits] + counters[:coalesced]
+    lookups = hits + counters[:misses]
+
+    {
+      pid: Process.pid,
+      enabled: @enabled,
+      l1Entries: @l1.size,
+      l1Evictions: @l1.evictions,
+      l1Hits: counters[:l1_hits],
+      l2Hits: counters[:l2_hits],
+      coalesced: counters[:coalesced],
+      misses: counters[:misses],
+      hitRate: lookups.zero? ? 0.0 : hits.fdiv(lookups).round(4),
+      llmMs: counters[:llm_ms],
+      savedMs: counters[:saved_ms]
+    }
+  end
+
+  private
+
+  def join_flight(key)
+    @mutex.synchronize do
+      if (flight = @flights[key])
+        [flight, false]
+      else
+        [@flights[key] = Concurrent::Promises.resolvable_future, true]
+      end
+    end
+  end
+
+  # A hit saves the latency the original call took
+  def hit(counter, entry)
+    count(counter)
+    count(:saved_ms, entry[:latency_ms].to_i)
+    { output_text: entry[:output_text], raw_response: nil }
+  end
+
+  def count(counter, amount = 1)
+    @mutex.synchronize { @counters[counter] += amount }
+  end
+end
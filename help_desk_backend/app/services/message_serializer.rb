@@ -0,0 +1,27 @@
+# frozen_string_literal: true
+
+class MessageSerializer < RecordSerializer
+  # Message JSON (see RecordSerializer), the same for history pages, polls and POST /messages.
+  #
+  #   MessageSerializer.new.json(messages)
+
+  NAMESPACE = "messages"
+  PRELOAD = %i[sender].freeze
+
+  private
+
+  def fields(message)
+    sender = message.sender
+    {
+      id: message.id.to_s,
+      conversationId: message.conversation_id.to_s,
+      senderId: message.sender_id.to_s,
+      senderUsername: sender.username,
+      senderUsernameWithId: "#{sender.username}##{sender.id}",
+      senderRole: message.sender_role,
+      content: message.content,
+      timestamp: message.created_at.iso8601,
+      isRead: message.is_read
+    }
+  end
+end
@@ -0,0 +1,91 @@
+# frozen_string_literal: true
+
+class MessageWriter
+  # Batched message ingest behind POST /messages/batch.
+  #
+  # Accepted messages are written with one INSERT (insert_all) and one UPDATE per
+  # affected conversation (last_message_at, messages_count, the unread counter
+  # Message#update_conversation_last_message maintains for single writes, and the
+  # waiting -> active switch MessagesController#create makes), all in one
+  # transaction. Entries that fail the access check or have no content are reported
+  # back by index and skipped; they do not fail the batch.
+  #
+  # Usage:
+  #
+  #   result = MessageWriter.new(user).write_batch([{ conversation_id: 1, content: "Hi" }, ...])
+  #   result.created # => 1
+  #   result.errors  # => [{ index: 3, error: "Conversation not found" }]
+
+  MAX_BATCH_SIZE = 100
+
+  Result = Struct.new(:created, :errors, keyword_init: true)
+
+  # "initiator" or "expert" for a participant of `conversation`, nil for anyone else
+  def self.role_for(conversation, user)
+    if conversation.initiator_id == user.id
+      "initiator"
+    elsif conversation.assigned_expert_id == user.id
+      "expert"
+    end
+  end
+
+  def initialize(user)
+    @user = user
+  end
+
+  def write_batch(entries)
+    conversations = Conversation.where(id: entries.map { |entry| entry[:conversation_id] }.compact.uniq).index_by(&:id)
+    errors = []
+    rows = []
+
+    entries.each_with_index do |entry, index|
+      conversation = conversations[entry[:conversation_id].to_i]
+      role = conversation && self.class.role_for(conversation, @user)
+      if role.nil?
+        errors << { index: index, error: "Conversation not found" }
+      elsif entry[:content].blank?
+        errors << { index: index, error: "Content can't be blank" }
+      else
+        rows << { conversation_id: conversation.id, sender_id: @user.id, sender_role: role,
+                  content: entry[:content], is_read: false }
+      end
+    end
+    return Result.new(created: 0, errors: errors) if rows.empty?
+
+    now = Time.current
+    rows.each { |row| row[:created_at] = row[:updated_at] = now }
+    by_conversation = rows.group_by { |row| row[:conversation_id] }
+    Message.transaction do
+      Message.insert_all!(rows)
+      by_conversation.each do |conversation_id, written|
+        counter = written.first[:sender_role] == "expert" ? "initiator_unread_count" : "expert_unread_count"
+        Conversation.where(id: conversation_id).update_all([
+          "last_message_at = ?, messages_count = messages_count + ?, #{counter} = #{counter} + ?, " \
+          "status = CASE WHEN status = 'waiting' AND assigned_expert_id IS NOT NULL THEN 'active' ELSE status END",
+          now, written.size, written.size
+        ])
+      end
+    end
+
+    after_write(conversations, by_conversation.transform_values(&:size), now)
+    Result.new(created: rows.size, errors: errors)
+  end
+
+  private
+
+  # What the Message callbacks and MessagesController#create do for single writes.
+  # `written` is { conversation_id => messages written to it }.
+  def after_write(conversations, written, written_at)
+    written.each do |conversation_id, count|
+      conversation = conversations[conversation_id]
+      GenerateSummaryJob.request(conversation, conversation.messages_count + count)
+    end
+
+    return unless UpdatesBroadcaster::ENABLED
+
+    # insert_all returns no ids on MySQL, so read the new rows back for the pushes
+    Message.where(conversation_id: written.keys, sender_id: @user.id, created_at: written_at)
+           .includes(:conversation)
+           .find_each { |message| UpdatesBroadcaster.message_created(message) }
+  end
+end
@@ -0,0 +1,101 @@
+# frozen_string_literal: true
+
+class PresenceTracker
+  # Write-coalesced users.last_active_at.
+  #
+  # Logins and authenticated requests call touch, which only records the latest
+  # activity time per user in an in-process buffer. Every PRESENCE_FLUSH_INTERVAL
+  # seconds a timer thread writes the buffer out with one UPDATE per
+  # BATCH_SIZE users, so a user polling every few seconds costs one row write per
+  # interval instead of one per request. Updates only move last_active_at forward,
+  # since buffers of several processes flush in any order.
+  #
+  # The bulk write is an UPDATE ... CASE rather than an upsert: an upsert would
+  # re-insert users deleted since they were touched.
+  #
+  # PRESENCE_FLUSH_INTERVAL=0 writes every touch through immediately (the default
+  # in tests). Up to one interval of activity is lost if a process is killed.
+  #
+  # Usage:
+  #
+  #   PresenceTracker.touch(user.id)
+
+  FLUSH_INTERVAL = ENV.fetch("PRESENCE_FLUSH_INTERVAL", Rails.env.test? ? 0 : 5).to_f
+  BATCH_SIZE = 1000
+
+  class << self
+    delegate :touch, :flush, :pending_count, to: :instance
+
+    # One tracker per process; a forked Puma worker starts its own flush timer
+    def instance
+      @instance = nil if @instance && @instance.pid != Process.pid
+      @instance ||= new.tap(&:start)
+    end
+  end
+
+  attr_reader :pid
+
+  def initialize(flush_interval: FLUSH_INTERVAL)
+    @flush_interval = flush_interval
+    @pending = {}
+    @mutex = Mutex.new
+    @pid = Process.pid
+  end
+
+  def touch(user_id, at = Time.current)
+    return write({ user_id => at }) unless buffered?
+
+    @mutex.synchronize do
+      current = @pending[user_id]
+      @pending[user_id] = at if current.nil? || at > current
+    end
+  end
+
+  # Writes out the buffered touches; returns how many users were updated.
+  def flush
+    pending = @mutex.synchronize do
+      taken = @pending
+      @pending = {}
+      taken
+    end
+    return 0 if pending.empty?
+
+    write(pending)
+    pending.size
+  rescue StandardError => e
+    Rails.logger.error("PresenceTracker flush failed: #{e.message}")
+    # Keep the touches for the next flush, unless newer ones arrived meanwhile
+    @mutex.synchronize { @pending.merge!(pending) { |_id, newer, older| [newer, older].max } }
+    0
+  end
+
+  def pending_count
+    @mutex.synchronize { @pending.size }
+  end
+
+  def start
+    return self unless buffered?
+
+    @timer = Concurrent::TimerTask.new(execution_interval: @flush_interval) do
+      Rails.application.executor.wrap { flush }
+    end
+    @timer.execute
+    at_exit { flush }
+    self
+  end
+
+  private
+
+  def buffered?
+    @flush_interval.positive?
+  end
+
+  def write(pending)
+    pending.each_slice(BATCH_SIZE) do |batch|
+      times = batch.map { |user_id, at| User.sanitize_sql_array(["WHEN ? THEN ?", user_id, at]) }.join(" ")
+      User.where(id: batch.map(&:first)).update_all(
+        "last_active_at = GREATEST(COALESCE(last_active_at, '1970-01-01'), CASE id #{times} END)"
+      )
+    end
+  end
+end
@@ -0,0 +1,91 @@
+# frozen_string_literal: true
+
+class RecordSerializer
+  # Base of the JSON serializers shared by every controller (ConversationSerializer,
+  # MessageSerializer).
+  #
+  # A record's JSON object for a view is encoded once with JSON.generate and kept in
+  # FragmentCache under the view and the record's cache_key_with_version (id and
+  # updated_at). Listings fetch all their fragments in one multi-get and join them into
+  # the array as strings, so a warm listing neither walks associations nor formats
+  # timestamps. Associations (PRELOAD) are only loaded for the records whose fragment
+  # is missing, so callers need not `includes` them. Fields that depend on who is asking
+  # (#viewer_fields) are never cached; they are spliced into each fragment on the way out.
+  #
+  # Subclasses define NAMESPACE, VIEWS, PRELOAD and #fields; bump VERSION when a
+  # view's fields change so old fragments are not served.
+  #
+  # Usage:
+  #
+  #   ConversationSerializer.new(view: :detail, viewer: @current_user).json(conversations) # => "[{...},...]"
+  #   render json: RecordSerializer.json_object(conversations: serializer.json(list), cursor: cursor.to_json)
+
+  VERSION = 1
+  NAMESPACE = "records"
+  VIEWS = %i[default].freeze
+  PRELOAD = [].freeze
+
+  # A JSON object from members that are already encoded JSON
+  def self.json_object(members)
+    "{#{members.map { |name, json| "#{JSON.generate(name.to_s)}:#{json}" }.join(',')}}"
+  end
+
+  def initialize(view: self.class::VIEWS.first, viewer: nil, cache: FragmentCache.instance)
+    raise ArgumentError, "unknown view #{view.inspect}" unless self.class::VIEWS.include?(view)
+
+    @view = view
+    @viewer = viewer
+    @cache = cache
+  end
+
+  # JSON array of `records`, in order
+  def json(records)
+    "[#{fragments(records.to_a).join(',')}]"
+  end
+
+  def json_one(record)
+    fragments([record]).first
+  end
+
+  private
+
+  def fragments(records)
+    keys = records.map { |record| cache_key(record) }
+    by_key = keys.zip(records).to_h
+
+    cached = @cache.fetch_multi(keys) do |missing|
+      misses = by_key.values_at(*missing)
+      preload(misses)
+      missing.zip(misses).to_h { |key, record| [key, JSON.generate(fields(record))] }
+    end
+    return cached unless @viewer
+
+    cached.each_with_index.map { |fragment, index| with_viewer_fields(fragment, viewer_fields(records[index])) }
+  end
+
+  def cache_key(record)
+    "#{self.class::NAMESPACE}/v#{self.class::VERSION}/#{@view}/#{record.cache_key_with_version}"
+  end
+
+  def preload(records)
+    return if self.class::PRELOAD.empty? || records.empty?
+
+    ActiveRecord::Associations::Preloader.new(records: records, associations: self.class::PRELOAD).call
+  end
+
+  # Cacheable fields of `record` for @view
+  def fields(record)
+    raise NotImplementedError
+  end
+
+  # Fields for @viewer, added to the cached ones
+  def viewer_fields(_record)
+    {}
+  end
+
+  def with_viewer_fields(fragment, extra)
+    return fragment if extra.empty?
+
+    "#{fragment.delete_suffix('}')},#{JSON.generate(extra).delete_prefix('{')}"
+  end
+end
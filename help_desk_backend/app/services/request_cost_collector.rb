@@ -0,0 +1,114 @@
+# frozen_string_literal: true
+
+class RequestCostCollector
+  # Per-action cost histograms, fed by ActiveSupport::Notifications.
+  #
+  # Every controller action and job is a unit of work. While one runs, its thread
+  # accumulates the SQL statements it issues (counted like QueryCounter) and their
+  # time, its Rails.cache hits and misses, and the time it spends in BedrockClient#call.
+  # When it finishes, those totals plus its wall time, its allocations and the Ruby
+  # time left over (wall time minus SQL and LLM time) are recorded into LogHistograms
+  # per "Controller#action" or job class. The histograms are per process and served
+  # by GET /health/metrics, which the load test harness scrapes at every step.
+  #
+  # Units nest: a job performed inline by a request is recorded on its own and its
+  # totals also count towards the request. config/initializers/request_costs.rb
+  # subscribes the collector. Allocations come from the notification event and are
+  # process-wide counts, so they overlap under concurrency.
+  #
+  # It is on by default in development and test, and elsewhere when DIAGNOSTICS_TOKEN
+  # is set, which is also what lets GET /health/metrics serve it (HealthController).
+  # REQUEST_COSTS_ENABLED overrides either way.
+  #
+  # Usage:
+  #
+  #   RequestCostCollector.stats[:actions]["MessagesController#create"][:sqlQueries][:p95]
+
+  ENABLED = ENV.fetch("REQUEST_COSTS_ENABLED", (Rails.env.local? || ENV["DIAGNOSTICS_TOKEN"].present?).to_s) == "true"
+  STATE_KEY = :request_cost_collector_units
+
+  # Per-unit totals, camelCase like the JSON they end up in
+  METRICS = %i[durationMs sqlQueries sqlMs cacheHits cacheMisses bedrockCalls bedrockMs allocations rubyMs].freeze
+
+  class << self
+    delegate :start_unit, :finish_unit, :record_sql, :record_cache_read, :record_bedrock_call, :stats, :clear,
+             to: :instance
+
+    def instance
+      @instance ||= new
+    end
+  end
+
+  def initialize
+    @actions = {}
+    @started_at = Time.current
+    @mutex = Mutex.new
+  end
+
+  def start_unit
+    (ActiveSupport::IsolatedExecutionState[STATE_KEY] ||= []).push(Hash.new(0))
+  end
+
+  # Records the innermost unit of work the current thread started; `event` is its notification event.
+  def finish_unit(name, event)
+    units = ActiveSupport::IsolatedExecutionState[STATE_KEY]
+    unit = units&.pop
+    return unless unit
+
+    if (parent = units.last)
+      unit.each { |metric, value| parent[metric] += value }
+    end
+    return unless name
+
+    unit[:durationMs] = event.duration
+    unit[:allocations] = event.allocations
+    unit[:rubyMs] = [event.duration - unit[:sqlMs] - unit[:bedrockMs], 0].max
+
+    @mutex.synchronize do
+      histograms = @actions[name] ||= METRICS.index_with { LogHistogram.new }
+      METRICS.each { |metric| histograms[metric].record(unit[metric]) }
+    end
+  end
+
+  def record_sql(event)
+    unit = current_unit or return
+    return unless QueryCounter.counted?(event.payload)
+
+    unit[:sqlQueries] += 1
+    unit[:sqlMs] += event.duration
+  end
+
+  def record_cache_read(hits, misses)
+    unit = current_unit or return
+    unit[:cacheHits] += hits
+    unit[:cacheMisses] += misses
+  end
+
+  def record_bedrock_call(event)
+    unit = current_unit or return
+    unit[:bedrockCalls] += 1
+    unit[:bedrockMs] += event.duration
+  end
+
+  def stats
+    actions = @mutex.synchronize do
+      @actions.transform_values { |histograms| histograms.transform_values(&:to_h) }
+    end
+
+    {
+      pid: Process.pid,
+      startedAt: @started_at.iso8601,
+      actions: actions.transform_values { |histograms| { requests: histograms[:durationMs][:count], **histograms } }
+    }
+  end
+
+  def clear
+    @mutex.synchronize { @actions.clear }
+  end
+
+  private
+
+  def current_unit
+    ActiveSupport::IsolatedExecutionState[STATE_KEY]&.last
+  end
+end
@@ -0,0 +1,73 @@
+# Publishes conversation, message and expert queue changes to UpdatesChannel subscribers.
+#
+# Called from model after_commit callbacks, so subscribers never see rolled back changes.
+# Payloads mirror the JSON of Api::UpdatesController and carry `sentAt` (microsecond ISO 8601)
+# so clients can measure delivery latency.
+class UpdatesBroadcaster
+  EXPERT_QUEUE_STREAM = "updates:expert_queue"
+
+  # Set BROADCAST_UPDATES=false to compare against polling without the broadcast cost
+  ENABLED = ENV.fetch("BROADCAST_UPDATES", "true") == "true"
+
+  def self.user_stream(user_id)
+    "updates:user:#{user_id}"
+  end
+
+  # `left_queue` is for changes saved without callbacks (Conversation.claim), where
+  # saved_change_to_status? cannot tell that the conversation left the waiting queue
+  def self.conversation_changed(conversation, left_queue: false)
+    return unless ENABLED
+
+    payload = envelope("conversation", conversation_payload(conversation))
+    participant_ids(conversation).each do |user_id|
+      ActionCable.server.broadcast(user_stream(user_id), payload)
+    end
+
+    # The queue only changes when a conversation enters or leaves the waiting state
+    if conversation.status == "waiting" || left_queue || conversation.saved_change_to_status?
+      ActionCable.server.broadcast(EXPERT_QUEUE_STREAM, envelope("expertQueue", conversation_payload(conversation)))
+    end
+  end
+
+  def self.message_created(message)
+    return unless ENABLED
+
+    payload = envelope("message", message_payload(message))
+    participant_ids(message.conversation).each do |user_id|
+      ActionCable.server.broadcast(user_stream(user_id), payload)
+    end
+  end
+
+  def self.participant_ids(conversation)
+    [conversation.initiator_id, conversation.assigned_expert_id].compact.uniq
+  end
+
+  def self.envelope(type, data)
+    { type: type, data: data, sentAt: Time.current.utc.iso8601(6) }
+  end
+
+  def self.conversation_payload(conversation)
+    {
+      id: conversation.id.to_s,
+      title: conversation.title,
+      status: conversation.status,
+      questionerId: conversation.initiator_id.to_s,
+      assignedExpertId: conversation.assigned_expert_id&.to_s,
+      createdAt: conversation.created_at.iso8601,
+      updatedAt: conversation.updated_at.iso8601,
+      lastMessageAt: conversation.last_message_at&.iso8601
+    }
+  end
+
+  def self.message_payload(message)
+    {
+      id: message.id.to_s,
+      conversationId: message.conversation_id.to_s,
+      senderId: message.sender_id.to_s,
+      senderRole: message.sender_role,
+      content: message.content,
+      timestamp: message.created_at.iso8601,
+      isRead: message.is_read
+    }
+  end
+end
@@ -47,6 +47,13 @@ module HelpDeskBackend
       end
     end
 
+    # Action Cable (UpdatesChannel) serves the front-end; same-origin clients such as the
+    # Locust harness are accepted through allow_same_origin_as_host.
+    config.action_cable.allowed_request_origins = [
+      'http://localhost:5173',
+      'http://127.0.0.1:5173',
+    ]
+
     config.api_only = true
   end
 end
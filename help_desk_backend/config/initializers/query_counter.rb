@@ -0,0 +1,4 @@
+# Feed QueryCounter, which ApplicationController reports per request in the X-DB-Queries header
+ActiveSupport::Notifications.subscribe("sql.active_record") do |*, payload|
+  QueryCounter.record(payload)
+end
@@ -0,0 +1,34 @@
+# Feed RequestCostCollector, served by GET /health/metrics. Blocks look the collector up
+# on every event, so they keep working across code reloads.
+Rails.application.config.after_initialize do
+  next unless RequestCostCollector::ENABLED
+
+  ActiveSupport::Notifications.subscribe("start_processing.action_controller") do
+    RequestCostCollector.start_unit
+  end
+  ActiveSupport::Notifications.subscribe("process_action.action_controller") do |event|
+    RequestCostCollector.finish_unit("#{event.payload[:controller]}##{event.payload[:action]}", event)
+  end
+
+  ActiveSupport::Notifications.subscribe("perform_start.active_job") do
+    RequestCostCollector.start_unit
+  end
+  ActiveSupport::Notifications.subscribe("perform.active_job") do |event|
+    RequestCostCollector.finish_unit(event.payload[:job]&.class&.name, event)
+  end
+
+  ActiveSupport::Notifications.subscribe("sql.active_record") do |event|
+    RequestCostCollector.record_sql(event)
+  end
+  ActiveSupport::Notifications.subscribe("cache_read.active_support") do |*, payload|
+    hit = payload[:hit] ? 1 : 0
+    RequestCostCollector.record_cache_read(hit, 1 - hit)
+  end
+  ActiveSupport::Notifications.subscribe("cache_read_multi.active_support") do |*, payload|
+    hits = payload[:hits].to_a.size
+    RequestCostCollector.record_cache_read(hits, Array(payload[:key]).size - hits)
+  end
+  ActiveSupport::Notifications.subscribe("call.bedrock_client") do |event|
+    RequestCostCollector.record_bedrock_call(event)
+  end
+end
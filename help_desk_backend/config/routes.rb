@@ -15,6 +15,8 @@ Rails.application.routes.draw do
   get "up" => "rails/health#show", as: :rails_health_check
 
   get '/health', to: 'health#show'
+  get '/health/caches', to: 'health#caches'
+  get '/health/metrics', to: 'health#metrics'
 
   # Conversations
   resources :conversations, only: [:index, :show, :create] do
@@ -24,10 +26,12 @@ Rails.application.routes.draw do
 
   # Messages
   resources :messages, only: [:create]
+  post "messages/batch", to: "messages#batch", as: :message_batch
   put "messages/:id/read", to: "messages#mark_read", as: :mark_message_read
 
   # Update/polling endpoints
   namespace :api do
+    get "updates", to: "updates#index"
     get "conversations/updates", to: "updates#conversations"
     get "messages/updates", to: "updates#messages"
     get "expert-queue/updates", to: "updates#expert_queue"
@@ -0,0 +1,9 @@
+class AddUpdateCursorIndexes < ActiveRecord::Migration[8.1]
+  def change
+    # Cursor lookups in Api::UpdatesController seek to the newest (updated_at, id) / (created_at, id) per scope
+    add_index :conversations, [:initiator_id, :updated_at]
+    add_index :conversations, [:assigned_expert_id, :updated_at]
+    add_index :conversations, [:status, :updated_at]
+    add_index :messages, [:conversation_id, :created_at]
+  end
+end
@@ -0,0 +1,30 @@
+class AddMessageCountersToConversations < ActiveRecord::Migration[8.1]
+  def up
+    # Maintained by Message callbacks so listings never count messages per row
+    add_column :conversations, :messages_count, :integer, default: 0, null: false
+    # Unread messages waiting for the initiator (sent by the expert) and for the expert (sent by the initiator)
+    add_column :conversations, :initiator_unread_count, :integer, default: 0, null: false
+    add_column :conversations, :expert_unread_count, :integer, default: 0, null: false
+
+    execute <<~SQL
+      UPDATE conversations SET
+        messages_count = (
+          SELECT COUNT(*) FROM messages WHERE messages.conversation_id = conversations.id
+        ),
+        initiator_unread_count = (
+          SELECT COUNT(*) FROM messages
+          WHERE messages.conversation_id = conversations.id AND messages.is_read = FALSE AND messages.sender_role = 'expert'
+        ),
+        expert_unread_count = (
+          SELECT COUNT(*) FROM messages
+          WHERE messages.conversation_id = conversations.id AND messages.is_read = FALSE AND messages.sender_role = 'initiator'
+        )
+    SQL
+  end
+
+  def down
+    remove_column :conversations, :expert_unread_count
+    remove_column :conversations, :initiator_unread_count
+    remove_column :conversations, :messages_count
+  end
+end
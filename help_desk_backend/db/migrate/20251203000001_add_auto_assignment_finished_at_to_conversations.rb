@@ -0,0 +1,13 @@
+class AddAutoAssignmentFinishedAtToConversations < ActiveRecord::Migration[8.1]
+  def up
+    # Set by AutoAssignExpertJob once it has run, assigned or not
+    add_column :conversations, :auto_assignment_finished_at, :datetime
+
+    # Existing conversations were assigned inline when they were created
+    execute "UPDATE conversations SET auto_assignment_finished_at = created_at"
+  end
+
+  def down
+    remove_column :conversations, :auto_assignment_finished_at
+  end
+end
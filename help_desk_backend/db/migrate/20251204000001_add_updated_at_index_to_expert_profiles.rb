@@ -0,0 +1,6 @@
+class AddUpdatedAtIndexToExpertProfiles < ActiveRecord::Migration[8.1]
+  def change
+    # ExpertCandidateIndex#sync re-reads profiles updated since its last sync
+    add_index :expert_profiles, :updated_at
+  end
+end
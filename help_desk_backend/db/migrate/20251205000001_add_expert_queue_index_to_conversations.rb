@@ -0,0 +1,9 @@
+class AddExpertQueueIndexToConversations < ActiveRecord::Migration[8.1]
+  def change
+    # ExpertsController#queue pages through status = 'waiting' AND assigned_expert_id IS NULL
+    # in (created_at, id) order; InnoDB appends the primary key to secondary indexes, so this
+    # serves the keyset seek directly. Message history pages use the existing
+    # [conversation_id, created_at] index the same way.
+    add_index :conversations, [:status, :assigned_expert_id, :created_at], name: "index_conversations_on_expert_queue"
+  end
+end
@@ -0,0 +1,18 @@
+class AddHotLookupIndexes < ActiveRecord::Migration[8.1]
+  def change
+    # /auth/login and the register uniqueness check look users up by username
+    add_index :users, :username, unique: true
+    # AuthCache resolves a user's expert profile on every expert request
+    add_index :expert_profiles, :user_id, unique: true
+
+    # ExpertsController#history and #unclaim read an expert's assignments newest first
+    add_index :expert_assignments, [:expert_id, :assigned_at]
+    add_index :expert_assignments, :conversation_id
+
+    # Each of these is the leading column of a composite index added for the update cursors,
+    # which serves the same lookups (and the foreign keys) at one index maintenance less per write
+    remove_index :conversations, :initiator_id, name: "index_conversations_on_initiator_id"
+    remove_index :conversations, :assigned_expert_id, name: "index_conversations_on_assigned_expert_id"
+    remove_index :messages, :conversation_id, name: "index_messages_on_conversation_id"
+  end
+end
@@ -0,0 +1,16 @@
+class AddSummaryTrackingToConversations < ActiveRecord::Migration[8.1]
+  def up
+    # last_message_at as of the stored summary; a later last_message_at means the summary is behind
+    add_column :conversations, :summary_last_message_at, :datetime
+    # Set while a GenerateSummaryJob is scheduled, so a burst of messages schedules one job
+    add_column :conversations, :summary_requested_at, :datetime
+
+    # Existing summaries were generated on read, from the messages there were at the time
+    execute "UPDATE conversations SET summary_last_message_at = last_message_at WHERE summary IS NOT NULL"
+  end
+
+  def down
+    remove_column :conversations, :summary_requested_at
+    remove_column :conversations, :summary_last_message_at
+  end
+end
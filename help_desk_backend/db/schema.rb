@@ -10,18 +10,26 @@
 #
 # It's strongly recommended that you check this file into your version control system.
 
-ActiveRecord::Schema[8.1].define(version: 2025_11_30_000001) do
+ActiveRecord::Schema[8.1].define(version: 2025_12_07_000001) do
   create_table "conversations", charset: "utf8mb4", collation: "utf8mb4_0900_ai_ci", force: :cascade do |t|
     t.bigint "assigned_expert_id"
+    t.datetime "auto_assignment_finished_at"
     t.datetime "created_at", null: false
+    t.integer "expert_unread_count", default: 0, null: false
     t.bigint "initiator_id", null: false
+    t.integer "initiator_unread_count", default: 0, null: false
     t.datetime "last_message_at"
+    t.integer "messages_count", default: 0, null: false
     t.string "status", default: "waiting", null: false
     t.text "summary"
+    t.datetime "summary_last_message_at"
+    t.datetime "summary_requested_at"
     t.string "title", null: false
     t.datetime "updated_at", null: false
-    t.index ["assigned_expert_id"], name: "index_conversations_on_assigned_expert_id"
-    t.index ["initiator_id"], name: "index_conversations_on_initiator_id"
+    t.index ["assigned_expert_id", "updated_at"], name: "index_conversations_on_assigned_expert_id_and_updated_at"
+    t.index ["initiator_id", "updated_at"], name: "index_conversations_on_initiator_id_and_updated_at"
+    t.index ["status", "assigned_expert_id", "created_at"], name: "index_conversations_on_expert_queue"
+    t.index ["status", "updated_at"], name: "index_conversations_on_status_and_updated_at"
   end
 
   create_table "expert_assignments", charset: "utf8mb4", collation: "utf8mb4_0900_ai_ci", force: :cascade do |t|
@@ -32,6 +40,8 @@ ActiveRecord::Schema[8.1].define(version: 2025_11_30_000001) do
     t.datetime "resolved_at"
     t.string "status"
     t.datetime "updated_at", null: false
+    t.index ["conversation_id"], name: "index_expert_assignments_on_conversation_id"
+    t.index ["expert_id", "assigned_at"], name: "index_expert_assignments_on_expert_id_and_assigned_at"
   end
 
   create_table "expert_profiles", charset: "utf8mb4", collation: "utf8mb4_0900_ai_ci", force: :cascade do |t|
@@ -41,6 +51,8 @@ ActiveRecord::Schema[8.1].define(version: 2025_11_30_000001) do
     t.json "knowledge_base_links"
     t.datetime "updated_at", null: false
     t.bigint "user_id"
+    t.index ["updated_at"], name: "index_expert_profiles_on_updated_at"
+    t.index ["user_id"], name: "index_expert_profiles_on_user_id", unique: true
   end
 
   create_table "messages", charset: "utf8mb4", collation: "utf8mb4_0900_ai_ci", force: :cascade do |t|
@@ -51,7 +63,7 @@ ActiveRecord::Schema[8.1].define(version: 2025_11_30_000001) do
     t.bigint "sender_id", null: false
     t.string "sender_role", null: false
     t.datetime "updated_at", null: false
-    t.index ["conversation_id"], name: "index_messages_on_conversation_id"
+    t.index ["conversation_id", "created_at"], name: "index_messages_on_conversation_id_and_created_at"
     t.index ["sender_id"], name: "index_messages_on_sender_id"
   end
 
@@ -70,6 +82,7 @@ ActiveRecord::Schema[8.1].define(version: 2025_11_30_000001) do
     t.string "password_digest"
     t.datetime "updated_at", null: false
     t.string "username"
+    t.index ["username"], name: "index_users_on_username", unique: true
   end
 
   add_foreign_key "conversations", "users", column: "assigned_expert_id"
@@ -0,0 +1,97 @@
+# frozen_string_literal: true
+
+# Thread-safe, incrementally updated in-memory inverted index ranked with Okapi BM25.
+#
+# Documents are added, replaced and removed one at a time; postings, document
+# lengths and the running total length are adjusted in place, so an update costs
+# O(terms in the document) rather than a rebuild.
+#
+#   index = Bm25Index.new
+#   index.upsert(42, "Postgres replication and MySQL tuning")
+#   index.search("mysql slow query", limit: 10) # => [[42, 1.23]]
+class Bm25Index
+  K1 = 1.2
+  B = 0.75
+
+  STOPWORDS = %w[
+    a an and are as at be but by can com do for from has have how http https i if in
+    is it its me my no not of on or org our so that the their this to was we what
+    when where which who why will with www you your
+  ].to_set.freeze
+
+  def self.tokenize(text)
+    text.to_s.downcase.scan(/[[:alnum:]]+/).reject { |token| token.length < 2 || STOPWORDS.include?(token) }
+  end
+
+  def initialize
+    @postings = Hash.new { |hash, term| hash[term] = {} }
+    @documents = {}
+    @lengths = {}
+    @total_length = 0
+    @mutex = Mutex.new
+  end
+
+  def upsert(id, text)
+    terms = self.class.tokenize(text).tally
+    @mutex.synchronize do
+      remove_document(id)
+      terms.each { |term, count| @postings[term][id] = count }
+      @documents[id] = terms.keys
+      @lengths[id] = terms.values.sum
+      @total_length += @lengths[id]
+    end
+  end
+
+  def delete(id)
+    @mutex.synchronize { remove_document(id) }
+  end
+
+  def include?(id)
+    @mutex.synchronize { @lengths.key?(id) }
+  end
+
+  def ids
+    @mutex.synchronize { @lengths.keys }
+  end
+
+  def size
+    @mutex.synchronize { @lengths.size }
+  end
+
+  # [[id, score], ...] of documents (integer ids) sharing at least one term with `query`, best first.
+  def search(query, limit:)
+    terms = self.class.tokenize(query).uniq
+    @mutex.synchronize do
+      count = @lengths.size
+      return [] if count.zero? || terms.empty?
+
+      average_length = [@total_length.fdiv(count), 1.0].max
+      scores = Hash.new(0.0)
+      terms.each do |term|
+        postings = @postings.fetch(term, nil)
+        next if postings.nil? || postings.empty?
+
+        idf = Math.log(1 + (count - postings.size + 0.5) / (postings.size + 0.5))
+        postings.each do |id, frequency|
+          norm = K1 * (1 - B + B * @lengths[id] / average_length)
+          scores[id] += idf * frequency * (K1 + 1) / (frequency + norm)
+        end
+      end
+      scores.max_by(limit) { |id, score| [score, -id] }
+    end
+  end
+
+  private
+
+  def remove_document(id)
+    length = @lengths.delete(id)
+    return unless length
+
+    @total_length -= length
+    @documents.delete(id).each do |term|
+      postings = @postings[term]
+      postings.delete(id)
+      @postings.delete(term) if postings.empty?
+    end
+  end
+end
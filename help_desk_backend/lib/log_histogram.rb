@@ -0,0 +1,77 @@
+# frozen_string_literal: true
+
+# Constant-memory log-linear histogram of non-negative values.
+#
+# Values are bucketed in thousandths (milliseconds at microsecond resolution): exact
+# buckets below 128 units, then 64 sub-buckets per power of two, so percentiles are
+# within 1/64 of the true value. The bucketing is the same as LatencyHistogram in
+# loadtest/metrics.py, which lets the harness subtract two scrapes of #to_h bucket by
+# bucket and take percentiles of the difference. Not thread-safe; callers synchronize.
+#
+#   histogram = LogHistogram.new
+#   histogram.record(12.5)
+#   histogram.percentile(0.95) # => 12.5 (to within 1/64)
+class LogHistogram
+  SUB_BUCKET_BITS = 6
+  SCALE = 1000
+
+  attr_reader :count, :sum, :max
+
+  def self.index(scaled)
+    return scaled if scaled < (2 << SUB_BUCKET_BITS)
+
+    shift = scaled.bit_length - SUB_BUCKET_BITS - 1
+    (shift << SUB_BUCKET_BITS) + (scaled >> shift) + (1 << SUB_BUCKET_BITS)
+  end
+
+  # Lower bound of the bucket, in thousandths
+  def self.value(index)
+    return index if index < (2 << SUB_BUCKET_BITS)
+
+    shift = (index >> SUB_BUCKET_BITS) - 2
+    (index - ((shift + 1) << SUB_BUCKET_BITS)) << shift
+  end
+
+  def initialize
+    @counts = Hash.new(0)
+    @count = 0
+    @sum = 0.0
+    @max = 0
+  end
+
+  def record(value)
+    value = 0 if value.negative?
+    @counts[self.class.index((value * SCALE).to_i)] += 1
+    @count += 1
+    @sum += value
+    @max = value if value > @max
+  end
+
+  def percentile(fraction)
+    return 0.0 if @count.zero?
+
+    target = [(fraction * @count).round, 1].max
+    seen = 0
+    @counts.keys.sort.each do |index|
+      seen += @counts[index]
+      return [self.class.value(index).fdiv(SCALE), @max].min if seen >= target
+    end
+    @max
+  end
+
+  def mean
+    @count.zero? ? 0.0 : @sum / @count
+  end
+
+  def to_h
+    {
+      count: @count,
+      sum: @sum.round(3),
+      max: @max.round(3),
+      p50: percentile(0.5).round(3),
+      p95: percentile(0.95).round(3),
+      p99: percentile(0.99).round(3),
+      buckets: @counts.dup
+    }
+  end
+end
@@ -0,0 +1,65 @@
+# frozen_string_literal: true
+
+# Thread-safe, size-bounded in-process cache with least-recently-used eviction
+# and optional per-entry expiry.
+#
+# Ruby hashes keep insertion order, so re-inserting a key on every read keeps the
+# least recently used entry first and eviction is a shift.
+#
+#   cache = LruCache.new(max_entries: 1000)
+#   cache.write("key", value, expires_in: 5.minutes)
+#   cache.read("key") # => value, or nil once expired or evicted
+class LruCache
+  Entry = Struct.new(:value, :expires_at)
+
+  attr_reader :max_entries, :evictions
+
+  def initialize(max_entries:)
+    @max_entries = max_entries
+    @entries = {}
+    @evictions = 0
+    @mutex = Mutex.new
+  end
+
+  def read(key)
+    @mutex.synchronize do
+      entry = @entries.delete(key)
+      return nil unless entry
+      return nil if entry.expires_at && entry.expires_at <= monotonic_now
+
+      @entries[key] = entry
+      entry.value
+    end
+  end
+
+  def write(key, value, expires_in: nil)
+    expires_at = expires_in && monotonic_now + expires_in.to_f
+    @mutex.synchronize do
+      @entries.delete(key)
+      @entries[key] = Entry.new(value, expires_at)
+      while @entries.size > @max_entries
+        @entries.shift
+        @evictions += 1
+      end
+    end
+    value
+  end
+
+  def delete(key)
+    @mutex.synchronize { @entries.delete(key)&.value }
+  end
+
+  def clear
+    @mutex.synchronize { @entries.clear }
+  end
+
+  def size
+    @mutex.synchronize { @entries.size }
+  end
+
+  private
+
+  def monotonic_now
+    Process.clock_gettime(Process::CLOCK_MONOTONIC)
+  end
+end
@@ -0,0 +1,28 @@
+# frozen_string_literal: true
+
+# Counts the SQL statements the current request (or job, or thread) sends to the database.
+#
+# config/initializers/query_counter.rb feeds it from the sql.active_record notification;
+# schema lookups and statements answered by the query cache are not counted.
+#
+#   before = QueryCounter.count
+#   ... # run some queries
+#   QueryCounter.count - before # => statements issued in between
+class QueryCounter
+  STATE_KEY = :query_counter_count
+
+  def self.count
+    ActiveSupport::IsolatedExecutionState[STATE_KEY] || 0
+  end
+
+  def self.record(payload)
+    return unless counted?(payload)
+
+    ActiveSupport::IsolatedExecutionState[STATE_KEY] = count + 1
+  end
+
+  # Whether a sql.active_record payload is a statement sent to the database
+  def self.counted?(payload)
+    payload[:name] != "SCHEMA" && !payload[:cached]
+  end
+end
@@ -0,0 +1,6 @@
+"""
+Support modules for the Locust harness in locustfile.py.
+
+Locust puts the locustfile's directory on sys.path, so these modules are
+importable as `loadtest.<module>` from locustfile.py without installing anything.
+"""
@@ -0,0 +1,377 @@
+"""
+Offline analysis of step-load runs: per-step results, the saturation knee, and
+run-to-run comparison.
+
+Reads either the harness's raw samples (METRICS_PREFIX_samples.csv, see
+loadtest/metrics.py) or Locust's --csv history (<csv>_stats_history.csv), one
+row at a time, and splits the run into StepLoadShape steps of --step-seconds
+from its first row. Raw samples give exact per-step throughput, error rate and
+p50/p95/p99 (histograms, constant memory). History rows only carry Locust's
+rolling-window figures, so a step's throughput is the mean of its rows'
+Requests/s and its percentiles are the median of its rows' percentile columns.
+Locust only writes per-endpoint history rows when run with --csv-full-history;
+without it the history holds nothing but the "Aggregated" row, and a warning says so.
+
+    python -m loadtest.analyze steps results/run_samples.csv [--name /conversations --name /messages]
+
+prints each endpoint's steps and marks the saturation step: the first step whose
+throughput grew by less than --plateau-gain over the previous step while p95 is
+at least --latency-growth times its best earlier step or the error rate passed
+--error-rate and is rising.
+
+    python -m loadtest.analyze diff results/before results/after [--step 5]
+
+compares two runs (whole run, or one step) per endpoint. Percentile changes come
+with bootstrap confidence intervals, computed from a fixed-size reservoir of
+each run's latencies (or history rows), and a verdict of "faster" or "slower"
+only when the interval excludes zero.
+
+A path may also be a METRICS_PREFIX or a Locust --csv prefix.
+"""
+
+import argparse
+import csv
+import math
+import os
+import random
+import sys
+
+from loadtest.metrics import PERCENTILES, LatencyHistogram
+
+STEP_SECONDS = 60  # StepLoadShape step length
+RESERVOIR_SIZE = 4000
+BOOTSTRAP_ITERATIONS = 500
+CONFIDENCE = 0.95
+PLATEAU_GAIN = 1.10
+LATENCY_GROWTH = 2.0
+ERROR_RATE = 0.01
+
+SAMPLE_HEADER = "timestamp"
+HISTORY_HEADER = "Timestamp"
+HISTORY_PERCENTILE_COLUMNS = {0.5: "50%", 0.95: "95%", 0.99: "99%"}
+HISTORY_AGGREGATED = "Aggregated"  # Locust's all-endpoints row
+
+
+def nearest_rank(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class Series:
+    """
+    Throughput, errors and latency of one endpoint over one step (or a whole run).
+
+    Samples feed a LatencyHistogram for the percentiles and a reservoir of
+    latencies for the bootstrap; history rows keep their Requests/s, Failures/s
+    and percentile columns (a step has one row per second at most).
+    """
+
+    def __init__(self, reservoir_size=RESERVOIR_SIZE, rng=None):
+        self.requests = 0
+        self.failures = 0
+        self.histogram = LatencyHistogram()
+        self.reservoir = []
+        self.reservoir_size = reservoir_size
+        self.rng = rng or random.Random(0)
+        self.duration = 0.0
+        self.users = None
+        self.history = False
+        self.rates = []
+        self.failure_rates = []
+        self.columns = {fraction: [] for fraction in PERCENTILES}
+
+    def add_sample(self, response_time, ok):
+        self.requests += 1
+        self.failures += 0 if ok else 1
+        self.histogram.record(response_time)
+        # Algorithm R: every sample ends up in the reservoir with equal probability
+        if len(self.reservoir) < self.reservoir_size:
+            self.reservoir.append(response_time)
+        else:
+            slot = self.rng.randrange(self.requests)
+            if slot < self.reservoir_size:
+                self.reservoir[slot] = response_time
+
+    def add_history_row(self, users, rate, failure_rate, percentiles):
+        self.history = True
+        self.users = users if self.users is None else max(self.users, users)
+        self.rates.append(rate)
+        self.failure_rates.append(failure_rate)
+        if rate > 0:
+            for fraction, value in percentiles.items():
+                if value is not None:
+                    self.columns[fraction].append(value)
+
+    def throughput(self):
+        if self.history:
+            return sum(self.rates) / len(self.rates) if self.rates else 0.0
+        return self.requests / self.duration if self.duration > 0 else 0.0
+
+    def error_rate(self):
+        if self.history:
+            total = sum(self.rates)
+            return sum(self.failure_rates) / total if total else 0.0
+        return self.failures / self.requests if self.requests else 0.0
+
+    def percentile(self, fraction):
+        if self.history:
+            return nearest_rank(sorted(self.columns[fraction]), 0.5)
+        return self.histogram.percentile(fraction)
+
+    def observations(self, fraction):
+        """Values the bootstrap resamples, and the fraction to take of each resample."""
+        if self.history:
+            return self.columns[fraction], 0.5
+        return self.reservoir, fraction
+
+
+def resolve_path(path):
+    if os.path.isfile(path):
+        return path
+    for suffix in ("_samples.csv", "_stats_history.csv"):
+        if os.path.isfile(path + suffix):
+            return path + suffix
+    raise FileNotFoundError(f"no samples or stats history file at {path}")
+
+
+def read_run(path, step_seconds=STEP_SECONDS, only_step=None, collapse=False, reservoir_size=RESERVOIR_SIZE,
+             run_start=None):
+    """
+    Stream a run into {(step, request_type, name): Series}.
+
+    With `only_step` other steps are skipped; with `collapse` every kept row goes
+    into one Series per endpoint (step None). Steps count from `run_start` (epoch
+    seconds) if given, else from the first row.
+    """
+    rng = random.Random(0)
+    series = {}
+    step_durations = {}
+
+    with open(resolve_path(path), newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return series
+        history = header[0] == HISTORY_HEADER
+        if not history and header[0] != SAMPLE_HEADER:
+            raise ValueError(f"{path}: neither a samples nor a stats history CSV")
+        column = {name: index for index, name in enumerate(header)}
+
+        for row in reader:
+            timestamp = float(row[0])
+            if run_start is None:
+                run_start = timestamp
+            step = int((timestamp - run_start) // step_seconds)
+            if step < 0 or only_step is not None and step != only_step:
+                continue
+            step_start = run_start + step * step_seconds
+            step_durations[step] = max(step_durations.get(step, 0.0), timestamp - step_start)
+
+            if history:
+                request_type, name = row[column["Type"]], row[column["Name"]]
+            else:
+                request_type, name = row[1], row[2]
+            key = (None if collapse else step, request_type, name)
+            entry = series.get(key)
+            if entry is None:
+                entry = series[key] = Series(reservoir_size, rng)
+
+            if history:
+                entry.add_history_row(
+                    int(row[column["User Count"]] or 0),
+                    _number(row[column["Requests/s"]]) or 0.0,
+                    _number(row[column["Failures/s"]]) or 0.0,
+                    {fraction: _number(row[column[label]]) for fraction, label in HISTORY_PERCENTILE_COLUMNS.items()},
+                )
+            else:
+                entry.add_sample(float(row[3]), row[4] == "1")
+
+    if history and series and all(name == HISTORY_AGGREGATED for _step, _type, name in series):
+        print(f"warning: {path} only has {HISTORY_AGGREGATED} rows; run Locust with --csv-full-history "
+              "for per-endpoint history", file=sys.stderr)
+
+    # A full step lasts step_seconds; the last one only as long as the run went on
+    for step in step_durations:
+        step_durations[step] = min(step_seconds, max(step_durations[step], 1.0))
+    for (step, _type, _name), entry in series.items():
+        entry.duration = sum(step_durations.values()) if step is None else step_durations[step]
+    return series
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def by_endpoint(series, names=None):
+    """{(request_type, name): [(step, Series), ...] in step order}, limited to `names` if given."""
+    endpoints = {}
+    for (step, request_type, name), entry in series.items():
+        if names and name not in names:
+            continue
+        endpoints.setdefault((request_type, name), []).append((step, entry))
+    for steps in endpoints.values():
+        steps.sort(key=lambda item: item[0])
+    return dict(sorted(endpoints.items()))
+
+
+def find_knee(steps, plateau_gain=PLATEAU_GAIN, latency_growth=LATENCY_GROWTH, error_rate=ERROR_RATE):
+    """The first step at which throughput plateaus while latency or errors take off, or None."""
+    best_p95 = None
+    for (_, previous), (step, current) in zip(steps, steps[1:]):
+        p95 = previous.percentile(0.95)
+        if p95 > 0:
+            best_p95 = p95 if best_p95 is None else min(best_p95, p95)
+        if previous.throughput() <= 0:
+            continue
+        plateau = current.throughput() < previous.throughput() * plateau_gain
+        latency = best_p95 is not None and current.percentile(0.95) >= latency_growth * best_p95
+        errors = current.error_rate() >= error_rate and current.error_rate() > previous.error_rate()
+        if plateau and (latency or errors):
+            return step
+    return None
+
+
+def bootstrap_difference(before, after, fraction, iterations=BOOTSTRAP_ITERATIONS, confidence=CONFIDENCE, rng=None):
+    """Confidence interval of percentile(after) - percentile(before), or None without data."""
+    before_values, before_fraction = before.observations(fraction)
+    after_values, after_fraction = after.observations(fraction)
+    if not before_values or not after_values:
+        return None
+    rng = rng or random.Random(0)
+    differences = sorted(
+        nearest_rank(sorted(rng.choices(after_values, k=len(after_values))), after_fraction)
+        - nearest_rank(sorted(rng.choices(before_values, k=len(before_values))), before_fraction)
+        for _ in range(iterations)
+    )
+    tail = (1 - confidence) / 2
+    return (differences[int(tail * iterations)], differences[min(iterations - 1, int((1 - tail) * iterations))])
+
+
+def verdict(interval):
+    if interval is None:
+        return "n/a"
+    low, high = interval
+    if high < 0:
+        return "faster"
+    if low > 0:
+        return "slower"
+    return "~"
+
+
+def step_rows(series, names=None, **knee_options):
+    for (request_type, name), steps in by_endpoint(series, names).items():
+        knee = find_knee(steps, **knee_options)
+        for step, entry in steps:
+            yield {
+                "request_type": request_type,
+                "name": name,
+                "step": step,
+                "users": "" if entry.users is None else entry.users,
+                "rps": round(entry.throughput(), 2),
+                "error_rate": round(entry.error_rate(), 4),
+                **{f"p{round(fraction * 100)}_ms": round(entry.percentile(fraction), 2) for fraction in PERCENTILES},
+                "saturation": int(step == knee),
+            }
+
+
+def diff_rows(before, after, names=None, iterations=BOOTSTRAP_ITERATIONS, confidence=CONFIDENCE):
+    rng = random.Random(0)
+    before_endpoints = {key: steps[0][1] for key, steps in by_endpoint(before, names).items()}
+    for key, steps in by_endpoint(after, names).items():
+        if key not in before_endpoints:
+            continue
+        old, new = before_endpoints[key], steps[0][1]
+        row = {"request_type": key[0], "name": key[1],
+               "rps_before": round(old.throughput(), 2), "rps_after": round(new.throughput(), 2),
+               "error_rate_before": round(old.error_rate(), 4), "error_rate_after": round(new.error_rate(), 4)}
+        for fraction in PERCENTILES:
+            label = f"p{round(fraction * 100)}"
+            interval = bootstrap_difference(old, new, fraction, iterations, confidence, rng)
+            row[f"{label}_before_ms"] = round(old.percentile(fraction), 2)
+            row[f"{label}_after_ms"] = round(new.percentile(fraction), 2)
+            row[f"{label}_ci_low_ms"] = "" if interval is None else round(interval[0], 2)
+            row[f"{label}_ci_high_ms"] = "" if interval is None else round(interval[1], 2)
+            row[f"{label}_verdict"] = verdict(interval)
+        yield row
+
+
+def write_csv(path, rows):
+    rows = list(rows)
+    if not rows:
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_steps(rows):
+    current = None
+    for row in rows:
+        if (row["request_type"], row["name"]) != current:
+            current = (row["request_type"], row["name"])
+            print(f"\n{row['request_type']} {row['name']}")
+            print(f"  {'step':>4} {'users':>6} {'rps':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        marker = "  <- saturation" if row["saturation"] else ""
+        print(f"  {row['step']:>4} {row['users']:>6} {row['rps']:>9.2f} {row['error_rate']:>7.2%} "
+              f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}{marker}")
+
+
+def print_diff(rows, confidence):
+    for row in rows:
+        print(f"\n{row['request_type']} {row['name']}: {row['rps_before']:.2f} -> {row['rps_after']:.2f} rps, "
+              f"errors {row['error_rate_before']:.2%} -> {row['error_rate_after']:.2%}")
+        for fraction in PERCENTILES:
+            label = f"p{round(fraction * 100)}"
+            interval = ("" if row[f"{label}_ci_low_ms"] == ""
+                        else f"[{row[f'{label}_ci_low_ms']:+.2f}, {row[f'{label}_ci_high_ms']:+.2f}] ms at {confidence:.0%}")
+            print(f"  {label:>4} {row[f'{label}_before_ms']:>9.2f} -> {row[f'{label}_after_ms']:>9.2f} ms  "
+                  f"{interval:<36} {row[f'{label}_verdict']}")
+
+
+def main(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--step-seconds", type=float, default=STEP_SECONDS)
+    common.add_argument("--name", action="append", help="endpoint name to include (repeatable; default all)")
+    common.add_argument("--csv", help="also write the rows to this CSV file")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    steps = commands.add_parser("steps", parents=[common], help="per-step results and the saturation step of one run")
+    steps.add_argument("run")
+    steps.add_argument("--plateau-gain", type=float, default=PLATEAU_GAIN)
+    steps.add_argument("--latency-growth", type=float, default=LATENCY_GROWTH)
+    steps.add_argument("--error-rate", type=float, default=ERROR_RATE)
+
+    diff = commands.add_parser("diff", parents=[common], help="compare two runs with bootstrap confidence intervals")
+    diff.add_argument("before")
+    diff.add_argument("after")
+    diff.add_argument("--step", type=int, help="compare only this step (default the whole run)")
+    diff.add_argument("--iterations", type=int, default=BOOTSTRAP_ITERATIONS)
+    diff.add_argument("--confidence", type=float, default=CONFIDENCE)
+    diff.add_argument("--reservoir", type=int, default=RESERVOIR_SIZE)
+
+    args = parser.parse_args(argv)
+    names = set(args.name) if args.name else None
+
+    if args.command == "steps":
+        rows = list(step_rows(read_run(args.run, args.step_seconds), names, plateau_gain=args.plateau_gain,
+                              latency_growth=args.latency_growth, error_rate=args.error_rate))
+        print_steps(rows)
+    else:
+        runs = [read_run(path, args.step_seconds, only_step=args.step, collapse=True, reservoir_size=args.reservoir)
+                for path in (args.before, args.after)]
+        rows = list(diff_rows(*runs, names=names, iterations=args.iterations, confidence=args.confidence))
+        print_diff(rows, args.confidence)
+
+    if args.csv:
+        write_csv(args.csv, rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Backend cache counters around a run.
+
+GET /health/caches reports the LLM, authentication and JSON fragment cache
+counters (see LlmCache#stats, AuthCache#stats and FragmentCache#stats) of the
+Puma process that serves it. Scraping it when the test starts and stops gives
+how many LLM calls the cache absorbed during the run, how much model wait time
+that eliminated, how often authentication skipped token verification and user
+lookups, and how many records the serializers did not have to encode again.
+With several Puma workers the scrape lands on one of them, so the delta only
+covers that process (matched by pid).
+
+Outside development and test the backend only serves its diagnostics endpoints
+(this one and /health/metrics) to requests carrying its DIAGNOSTICS_TOKEN; set
+the same DIAGNOSTICS_TOKEN for the harness and it is sent with every scrape.
+"""
+
+import json
+import os
+
+import requests
+
+CACHES_PATH = "/health/caches"
+DIAGNOSTICS_HEADER = "X-Diagnostics-Token"
+# Gauges and flags are reported as scraped at the end; every other number is a counter
+GAUGES = ("pid", "enabled", "hitRate")
+
+
+def diagnostics_headers():
+    """Headers for the backend's diagnostics endpoints."""
+    token = os.environ.get("DIAGNOSTICS_TOKEN")
+    return {DIAGNOSTICS_HEADER: token} if token else {}
+
+
+def fetch_cache_stats(host, timeout=5):
+    """Return the /health/caches payload, or None if the backend does not answer."""
+    try:
+        response = requests.get(host.rstrip("/") + CACHES_PATH, headers=diagnostics_headers(), timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def cache_stats_delta(before, after):
+    """Per-cache counter increase between two scrapes of the same process."""
+    delta = {}
+    for name, end in (after or {}).items():
+        if not isinstance(end, dict):
+            continue
+        start = (before or {}).get(name) or {}
+        if start.get("pid") != end.get("pid"):
+            # Different process (or no baseline): report its absolute counters
+            start = {}
+        counters = {}
+        for key, value in end.items():
+            if key in GAUGES or key.endswith("Entries") or not isinstance(value, (int, float)):
+                counters[key] = value
+            else:
+                counters[key] = value - start.get(key, 0)
+        hits = sum(v for k, v in counters.items() if k.endswith("Hits") or k == "coalesced")
+        misses = sum(v for k, v in counters.items() if k.endswith("Misses") or k == "misses")
+        counters["hitRate"] = round(hits / (hits + misses), 4) if hits + misses else 0.0
+        delta[name] = counters
+    return delta
+
+
+def write_cache_report(path, before, after):
+    delta = cache_stats_delta(before, after)
+    with open(path, "w") as f:
+        json.dump({"before": before, "after": after, "delta": delta}, f, indent=2)
+    return delta
@@ -0,0 +1,220 @@
+"""
+Endpoint-isolated benchmark: one endpoint at a time under a fixed-concurrency sweep.
+
+SCENARIO=benchmark runs EndpointBenchmarkUser, whose tasks are one tagged TaskSet per
+endpoint (ENDPOINTS below). LOAD_SHAPE=sweep runs ConcurrencySweepShape, which takes
+each endpoint in turn through SWEEP_LEVELS users (1, 4, 16, 64, 256 by default) for
+SWEEP_STEP_SECONDS each. Users have no think time, so every (endpoint, users) phase
+is a closed loop at exactly that concurrency. Every process follows the same
+SweepPlan clock from test start, and users only run the TaskSet of the current
+phase's endpoint. Locust's --tags and --exclude-tags select the endpoints:
+
+    SCENARIO=benchmark LOAD_SHAPE=sweep locust -f locustfile.py --headless --host URL --tags login send_message
+
+At the end of the run the capacity table is printed and written to
+METRICS_PREFIX_capacity.csv: throughput, throughput per user, error rate and
+p50/p95/p99 per endpoint and concurrency, with the saturation level marked by
+find_knee from loadtest/analyze.py. The plan goes to METRICS_PREFIX_sweep.json, so
+the table can be rebuilt from the samples later, across the workers of a
+distributed run:
+
+    python -m loadtest.benchmark log/loadtest/run-...-worker123 log/loadtest/run-...-worker456 [--csv capacity.csv]
+
+Only the endpoint's own request counts towards its rows (ENDPOINTS maps each to its
+method and request name); setup requests, such as the conversation a claim needs,
+are named apart.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import gevent
+from locust import LoadTestShape, TaskSet, tag, task
+
+from loadtest.analyze import find_knee, read_run, write_csv
+from loadtest.metrics import PERCENTILES
+
+DEFAULT_LEVELS = (1, 4, 16, 64, 256)
+STEP_SECONDS = 60
+
+# endpoint tag -> (request type, request name) recorded for it
+ENDPOINTS = {
+    "login": ("POST", "/auth/login"),
+    "register": ("POST", "/auth/register"),
+    "list_conversations": ("GET", "/conversations"),
+    "create_conversation": ("POST", "/conversations"),
+    "send_message": ("POST", "/messages"),
+    "read_messages": ("GET", "/conversations/:id/messages"),
+    "conversation_updates": ("GET", "/api/conversations/updates"),
+    "message_updates": ("GET", "/api/messages/updates"),
+    "expert_queue_updates": ("GET", "/api/expert-queue/updates"),
+    "updates": ("GET", "/api/updates"),
+    "expert_queue": ("GET", "/expert/queue"),
+    "claim": ("POST", "/expert/conversations/:id/claim"),
+}
+
+
+class SweepPlan:
+    """Which endpoint runs at which concurrency when: every endpoint through every level, in order."""
+
+    def __init__(self, endpoints=tuple(ENDPOINTS), levels=DEFAULT_LEVELS, step_seconds=STEP_SECONDS):
+        self.endpoints = list(endpoints)
+        self.levels = list(levels)
+        self.step_seconds = step_seconds
+        self.started_at = None
+
+    @property
+    def phases(self):
+        """[(endpoint, users), ...], one per step."""
+        return [(endpoint, users) for endpoint in self.endpoints for users in self.levels]
+
+    def steps(self):
+        """StepLoadShape-style [(duration, users), ...]."""
+        return [(self.step_seconds, users) for _, users in self.phases]
+
+    def select(self, tags=None, exclude_tags=None):
+        """Keep the endpoints Locust's --tags / --exclude-tags let through (the shape needs them before Locust filters)."""
+        self.endpoints = [endpoint for endpoint in ENDPOINTS
+                          if (not tags or endpoint in tags) and endpoint not in (exclude_tags or ())]
+
+    def start(self, at=None):
+        self.started_at = at or time.time()
+
+    def current_endpoint(self, now=None):
+        """Endpoint of the phase under way, or None before the start and after the last phase."""
+        if self.started_at is None:
+            return None
+        step = int(((now or time.time()) - self.started_at) // self.step_seconds)
+        phases = self.phases
+        return phases[step][0] if 0 <= step < len(phases) else None
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"endpoints": self.endpoints, "levels": self.levels, "stepSeconds": self.step_seconds,
+                       "startedAt": self.started_at}, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        plan = cls(data["endpoints"], data["levels"], data["stepSeconds"])
+        plan.started_at = data.get("startedAt")
+        return plan
+
+
+def endpoint_task_set(plan, endpoint, action):
+    """
+    A TaskSet tagged `endpoint` that calls action(user) back to back while the plan is
+    on that endpoint, and hands control back to the user otherwise.
+    """
+
+    @tag(endpoint)
+    @task
+    def run_endpoint(task_set):
+        current = plan.current_endpoint()
+        if current != endpoint:
+            if current is None:
+                gevent.sleep(1)
+            task_set.interrupt()
+        action(task_set.user)
+
+    name = "".join(part.title() for part in endpoint.split("_")) + "Benchmark"
+    return type(name, (TaskSet,), {"tasks": [run_endpoint], "endpoint": endpoint})
+
+
+class ConcurrencySweepShape(LoadTestShape):
+    """
+    Fixed-concurrency steps. Subclasses set steps: [(duration_seconds, users), ...];
+    each step's users are all started at once.
+    """
+    abstract = True
+    steps = []
+
+    def tick(self):
+        run_time = self.get_run_time()
+        elapsed = 0
+        for duration, users in self.steps:
+            elapsed += duration
+            if run_time < elapsed:
+                return users, users
+        return None
+
+
+def merge_runs(runs):
+    """Combine the read_run series of several processes (the workers of one run)."""
+    merged = {}
+    for series in runs:
+        for key, entry in series.items():
+            current = merged.get(key)
+            if current is None:
+                merged[key] = entry
+                continue
+            current.requests += entry.requests
+            current.failures += entry.failures
+            current.histogram.merge(entry.histogram)
+            current.duration = max(current.duration, entry.duration)
+    return merged
+
+
+def capacity_rows(series, plan, **knee_options):
+    """One row per endpoint and concurrency level, in plan order."""
+    for index, endpoint in enumerate(plan.endpoints):
+        request_type, name = ENDPOINTS[endpoint]
+        levels = []
+        for offset, users in enumerate(plan.levels):
+            step = index * len(plan.levels) + offset
+            entry = series.get((step, request_type, name))
+            if entry is not None:
+                levels.append((users, entry))
+        knee = find_knee(levels, **knee_options)
+        for users, entry in levels:
+            yield {
+                "endpoint": endpoint,
+                "request": f"{request_type} {name}",
+                "users": users,
+                "requests": entry.requests,
+                "rps": round(entry.throughput(), 2),
+                "rps_per_user": round(entry.throughput() / users, 2),
+                "error_rate": round(entry.error_rate(), 4),
+                **{f"p{round(fraction * 100)}_ms": round(entry.percentile(fraction), 2) for fraction in PERCENTILES},
+                "saturation": int(users == knee),
+            }
+
+
+def read_capacity(prefixes, plan=None):
+    """Capacity rows of a run from its METRICS_PREFIX(es); the plan defaults to the first prefix's."""
+    plan = plan or SweepPlan.load(f"{prefixes[0]}_sweep.json")
+    runs = [read_run(f"{prefix}_samples.csv", plan.step_seconds, run_start=plan.started_at) for prefix in prefixes]
+    return list(capacity_rows(merge_runs(runs), plan))
+
+
+def print_capacity_table(rows):
+    current = None
+    for row in rows:
+        if row["endpoint"] != current:
+            current = row["endpoint"]
+            print(f"\n{row['endpoint']} ({row['request']})")
+            print(f"  {'users':>6} {'rps':>9} {'rps/user':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        marker = "  <- saturation" if row["saturation"] else ""
+        print(f"  {row['users']:>6} {row['rps']:>9.2f} {row['rps_per_user']:>9.2f} {row['error_rate']:>7.2%} "
+              f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}{marker}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("prefixes", nargs="+", help="METRICS_PREFIX of the run (one per worker in distributed runs)")
+    parser.add_argument("--plan", help="sweep plan JSON (default <first prefix>_sweep.json)")
+    parser.add_argument("--csv", help="also write the table to this CSV file")
+    args = parser.parse_args(argv)
+
+    rows = read_capacity(args.prefixes, SweepPlan.load(args.plan) if args.plan else None)
+    print_capacity_table(rows)
+    if args.csv:
+        write_csv(args.csv, rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Micro-benchmarks for the load generator itself (run with `python -m loadtest.benchmarks.<name>`)."""
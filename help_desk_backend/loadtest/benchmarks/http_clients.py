@@ -0,0 +1,82 @@
+"""
+Benchmark: requests per second per generator core, HttpUser vs FastHttpUser.
+
+Runs the same closed-loop user (no wait time) against the backend with each
+client in turn, inside this single process, and divides the completed
+requests by the CPU seconds the process consumed. That ratio is what bounds
+how many simulated users one generator core can drive.
+
+    python -m loadtest.benchmarks.http_clients --host http://localhost:3000 [--path /health] [--users 50] [--seconds 20]
+"""
+
+import argparse
+import resource
+import time
+
+import gevent
+from locust import constant, task
+from locust.env import Environment
+
+from loadtest.clients import HTTP_CLIENTS, harness_user_class
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run(client, host, path, users, seconds, pool_size):
+    base = harness_user_class(client, pool_size=pool_size)
+
+    class BenchmarkUser(base):
+        wait_time = constant(0)
+
+        @task
+        def hit(self):
+            self.client.get(path, name=path)
+
+    BenchmarkUser.host = host
+    env = Environment(user_classes=[BenchmarkUser])
+    runner = env.create_local_runner()
+
+    cpu_before = cpu_seconds()
+    started = time.perf_counter()
+    runner.start(users, spawn_rate=users)
+    gevent.sleep(seconds)
+    runner.quit()
+    elapsed = time.perf_counter() - started
+    cpu_used = cpu_seconds() - cpu_before
+
+    total = env.stats.total
+    return {
+        "client": client,
+        "requests": total.num_requests,
+        "failures": total.num_failures,
+        "rps": total.num_requests / elapsed,
+        "cpu": cpu_used,
+        "rps_per_core": total.num_requests / cpu_used if cpu_used else 0.0,
+        "p95": total.get_response_time_percentile(0.95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", required=True)
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--pool-size", type=int, default=1)
+    parser.add_argument("--clients", nargs="+", default=list(HTTP_CLIENTS), choices=HTTP_CLIENTS)
+    args = parser.parse_args()
+
+    print(f"{'client':>10} {'requests':>10} {'failures':>9} {'req/s':>10} {'cpu s':>8} {'req/s/core':>11} {'p95 ms':>8}")
+    for client in args.clients:
+        r = run(client, args.host, args.path, args.users, args.seconds, args.pool_size)
+        print(
+            f"{r['client']:>10} {r['requests']:>10} {r['failures']:>9} {r['rps']:>10,.0f} "
+            f"{r['cpu']:>8.1f} {r['rps_per_core']:>11,.0f} {r['p95']:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark: persona task throughput against each user store backend.
+
+Replays the store operations an ActiveUser/ExpertUser task performs
+(pick a user, pick one of that user's conversations, pick any conversation,
+pick an expert, occasionally store a new conversation) against stores
+pre-filled with 1k, 10k and 100k conversations.
+
+    python -m loadtest.benchmarks.user_store [--sizes 1000 10000 100000] [--seconds 2]
+"""
+
+import argparse
+import random
+import time
+
+from loadtest.user_store import USER_STORE_BACKENDS
+
+CONVERSATIONS_PER_USER = 5
+EXPERT_SHARE = 0.15
+
+
+def fill_store(store, conversations):
+    users = max(1, conversations // CONVERSATIONS_PER_USER)
+    for user_id in range(1, users + 1):
+        store.store_user(f"user_{user_id}", f"token_{user_id}", user_id, is_expert=random.random() < EXPERT_SHARE)
+    for conversation_id in range(1, conversations + 1):
+        store.store_conversation(conversation_id, random.randint(1, users))
+    return users
+
+
+def run_tasks(store, users, next_conversation_id, seconds):
+    """Run the task mix for `seconds` and return tasks per second."""
+    tasks = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        # Run in small batches so the clock check does not dominate
+        for _ in range(100):
+            user = store.get_random_user()
+            store.get_random_conversation(user.get("user_id"))
+            store.get_random_conversation()
+            store.get_random_expert()
+            if random.random() < 0.05:
+                store.store_conversation(next_conversation_id, random.randint(1, users))
+                next_conversation_id += 1
+            tasks += 1
+    return tasks / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--backends", nargs="+", default=sorted(USER_STORE_BACKENDS))
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"{'conversations':>14} " + " ".join(f"{name + ' tasks/s':>20}" for name in args.backends))
+    for size in args.sizes:
+        results = []
+        for name in args.backends:
+            store = USER_STORE_BACKENDS[name]()
+            users = fill_store(store, size)
+            results.append(run_tasks(store, users, size + 1, args.seconds))
+        print(f"{size:>14} " + " ".join(f"{rate:>20,.0f}" for rate in results))
+
+
+if __name__ == "__main__":
+    main()
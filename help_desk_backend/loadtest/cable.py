@@ -0,0 +1,105 @@
+"""
+Minimal Action Cable client for the WebSocket personas.
+
+Speaks just enough of the Action Cable protocol (welcome, ping, subscribe,
+confirm/reject, message) to hold one UpdatesChannel subscription open and
+hand each broadcast payload to a callback. Uses websocket-client, which runs
+cooperatively under Locust's gevent monkey patching, with one receive
+greenlet per connection.
+"""
+
+import json
+import time
+from urllib.parse import urlencode, urlsplit, urlunsplit
+
+import gevent
+import websocket
+
+CABLE_PATH = "/cable"
+UPDATES_CHANNEL = json.dumps({"channel": "UpdatesChannel"})
+
+
+def cable_url(host, token, path=CABLE_PATH):
+    """ws(s):// URL of the cable endpoint on `host`, authenticated with `token`."""
+    parts = urlsplit(host)
+    scheme = "wss" if parts.scheme == "https" else "ws"
+    return urlunsplit((scheme, parts.netloc, path, urlencode({"token": token}), ""))
+
+
+class CableError(Exception):
+    pass
+
+
+class CableClient:
+    """One WebSocket connection subscribed to UpdatesChannel."""
+
+    def __init__(self, host, token, on_message, on_close=None, headers=None, timeout=10):
+        self.host = host
+        self.token = token
+        self.on_message = on_message
+        self.on_close = on_close
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.ws = None
+        self.last_ping = None
+        self._receiver = None
+
+    @property
+    def connected(self):
+        return self.ws is not None and self.ws.connected
+
+    def connect(self):
+        """Open the socket and subscribe; returns once the subscription is confirmed."""
+        parts = urlsplit(self.host)
+        self.ws = websocket.create_connection(
+            cable_url(self.host, self.token),
+            timeout=self.timeout,
+            # Action Cable rejects handshakes whose Origin does not match an allowed origin
+            origin=f"{parts.scheme}://{parts.netloc}",
+            header=[f"{name}: {value}" for name, value in self.headers.items()],
+        )
+        self.ws.send(json.dumps({"command": "subscribe", "identifier": UPDATES_CHANNEL}))
+        while True:
+            frame = json.loads(self.ws.recv())
+            kind = frame.get("type")
+            if kind == "confirm_subscription":
+                break
+            if kind in ("reject_subscription", "disconnect"):
+                self.close()
+                raise CableError(f"subscription refused: {frame}")
+        # Idle connections only see pings (every 3s) until something is broadcast
+        self.ws.settimeout(None)
+        self._receiver = gevent.spawn(self._receive_loop)
+
+    def _receive_loop(self):
+        error = None
+        try:
+            while True:
+                raw = self.ws.recv()
+                if not raw:
+                    break
+                frame = json.loads(raw)
+                kind = frame.get("type")
+                if kind == "ping":
+                    self.last_ping = time.time()
+                elif kind == "disconnect":
+                    break
+                elif "message" in frame:
+                    self.on_message(frame["message"], len(raw))
+        except (websocket.WebSocketException, OSError) as e:
+            error = e
+        # Only reached when the server ends the connection; close() kills this greenlet instead
+        self.close()
+        if self.on_close:
+            self.on_close(error)
+
+    def close(self):
+        receiver, self._receiver = self._receiver, None
+        if receiver is not None and receiver is not gevent.getcurrent():
+            receiver.kill(block=False)
+        if self.ws is not None:
+            try:
+                self.ws.close()
+            except (websocket.WebSocketException, OSError):
+                pass
+            self.ws = None
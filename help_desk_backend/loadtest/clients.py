@@ -0,0 +1,53 @@
+"""
+Selectable HTTP client for the personas.
+
+`harness_user_class()` returns the abstract base every persona subclasses:
+
+- "requests" (default): Locust's HttpUser (python-requests), with the
+  per-user urllib3 pool sized by pool_size.
+- "fast": Locust's FastHttpUser (geventhttpclient), which needs far less CPU
+  per request. pool_size becomes FastHttpUser.concurrency and shared_pool
+  makes every user draw connections from one process-wide pool.
+
+ChatBackend only uses get/post with json=, params=, headers=, name= and
+catch_response=, which both clients support, so persona code is unchanged.
+With keep_alive disabled every request carries `Connection: close`, which is
+useful to measure the cost of connection setup on the backend.
+"""
+
+from locust import FastHttpUser, HttpUser
+from requests.adapters import HTTPAdapter
+
+HTTP_CLIENTS = ("requests", "fast")
+
+
+def harness_user_class(client="requests", pool_size=1, keep_alive=True, shared_pool=False, default_headers=None):
+    headers = dict(default_headers or {})
+    if not keep_alive:
+        headers["Connection"] = "close"
+
+    if client == "fast":
+        from geventhttpclient.client import HTTPClientPool
+
+        class HarnessFastHttpUser(FastHttpUser):
+            abstract = True
+            concurrency = pool_size
+            client_pool = HTTPClientPool(concurrency=pool_size) if shared_pool else None
+            default_headers = headers
+
+        return HarnessFastHttpUser
+
+    if client == "requests":
+        class HarnessHttpUser(HttpUser):
+            abstract = True
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                self.client.mount("http://", adapter)
+                self.client.mount("https://", adapter)
+                self.client.headers.update(headers)
+
+        return HarnessHttpUser
+
+    raise ValueError(f"Unknown HTTP client {client!r}; expected one of {HTTP_CLIENTS}")
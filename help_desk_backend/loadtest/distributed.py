@@ -0,0 +1,126 @@
+"""
+Distributed-mode wiring: disjoint username ranges and a shared store.
+
+In `--processes N` or master/worker runs the master owns a
+UsernameRangeAllocator and hands each worker leases of consecutive username
+indexes on request, so two workers never generate the same `user_N`. The
+master also runs the SharedStoreServer that workers use for conversation and
+expert pools (see loadtest/shared_store.py).
+
+Standalone runs are left untouched: `setup_distributed` returns None and the
+locustfile keeps its in-process UserNameGenerator and store.
+"""
+
+import logging
+
+from gevent.event import Event
+from locust.runners import MasterRunner, WorkerRunner
+
+from loadtest.shared_store import SharedStoreServer, SharedUserStore
+
+LEASE_REQUEST = "harness:lease_usernames"
+LEASE_GRANTED = "harness:usernames_leased"
+DEFAULT_LEASE_SIZE = 256
+LEASE_TIMEOUT = 10
+
+logger = logging.getLogger(__name__)
+
+
+class UsernameRangeAllocator:
+    """Master-side allocator of disjoint [start, start + size) username index ranges."""
+
+    def __init__(self, max_users, lease_size=DEFAULT_LEASE_SIZE):
+        self.max_users = max_users
+        self.lease_size = lease_size
+        self.next_start = 0
+
+    def lease(self):
+        # Once the index space is exhausted the ranges wrap around; re-used
+        # usernames then log in instead of registering, exactly like a
+        # standalone run that cycles past MAX_USERS.
+        start = self.next_start % self.max_users
+        size = min(self.lease_size, self.max_users - start)
+        self.next_start = start + size
+        return {"start": start, "size": size}
+
+
+class LeasedUserNameGenerator:
+    """
+    Worker-side generator with the UserNameGenerator interface.
+
+    Usernames come from ranges leased from the master. The next lease is
+    requested when the current one is half used so spawning greenlets rarely
+    wait on the round trip.
+    """
+
+    def __init__(self, runner, prefix="user_"):
+        self.runner = runner
+        self.prefix = prefix
+        self.leases = []
+        self.current = None
+        self.pending = False
+        self.lease_ready = Event()
+
+    def on_lease(self, environment, msg, **kwargs):
+        self.leases.append(msg.data)
+        self.pending = False
+        self.lease_ready.set()
+
+    def _request_lease(self):
+        if not self.pending:
+            self.pending = True
+            self.lease_ready.clear()
+            self.runner.send_message(LEASE_REQUEST)
+
+    def generate_username(self):
+        while True:
+            if self.current and self.current["next"] < self.current["end"]:
+                index = self.current["next"]
+                self.current["next"] += 1
+                if not self.leases and self.current["end"] - self.current["next"] <= self.current["size"] // 2:
+                    self._request_lease()
+                return f"{self.prefix}{index}"
+
+            if self.leases:
+                lease = self.leases.pop(0)
+                self.current = {
+                    "next": lease["start"],
+                    "end": lease["start"] + lease["size"],
+                    "size": lease["size"],
+                }
+                continue
+
+            self._request_lease()
+            if not self.lease_ready.wait(LEASE_TIMEOUT):
+                self.pending = False
+                raise RuntimeError("Timed out waiting for a username lease from the master")
+
+
+def setup_distributed(environment, max_users, socket_path, lease_size=DEFAULT_LEASE_SIZE):
+    """
+    Register lease messages and the shared store for the current runner.
+
+    Returns (user_store, user_name_generator) for a worker, or None on the
+    master and in standalone runs (the master serves leases and the store but
+    runs no users).
+    """
+    runner = environment.runner
+
+    if isinstance(runner, MasterRunner):
+        allocator = UsernameRangeAllocator(max_users, lease_size)
+
+        def on_lease_request(environment, msg, **kwargs):
+            runner.send_message(LEASE_GRANTED, allocator.lease(), client_id=msg.node_id)
+
+        runner.register_message(LEASE_REQUEST, on_lease_request)
+        server = SharedStoreServer(socket_path).start()
+        environment.events.quitting.add_listener(lambda **kwargs: server.stop())
+        logger.info(f"Shared store listening on {socket_path}")
+        return None
+
+    if isinstance(runner, WorkerRunner):
+        generator = LeasedUserNameGenerator(runner)
+        runner.register_message(LEASE_GRANTED, generator.on_lease)
+        return SharedUserStore(socket_path), generator
+
+    return None
@@ -0,0 +1,372 @@
+"""
+Low-overhead instrumentation for the Locust harness.
+
+Replaces per-request print() listeners with:
+
+- LatencyHistogram: HDR-style log-linear histogram (~1.6% relative error,
+  constant memory) per (request type, `name=` label)
+- SampledFailureLog: rate-limited failure logging; tracebacks only for the
+  sampled few, with a count of what was suppressed
+- MetricsRecorder: ties it together. Every request goes into a bounded ring
+  buffer that a background greenlet flushes to `<prefix>_samples.csv`; at each
+  StepLoadShape step boundary the per-endpoint histograms are snapshotted to
+  `<prefix>_steps.csv`; `<prefix>_summary.csv` holds whole-run percentiles.
+  Quantities that are not request latencies (SQL statements per response,
+  summary staleness) go through MetricsRecorder.observe instead: they get their
+  own histograms, written per step to `<prefix>_values.csv` and for the whole run
+  to `<prefix>_values_summary.csv`, and never show up as requests in the samples,
+  steps or summary that loadtest/analyze.py and loadtest/benchmark.py read.
+  Throughputs (messages written) go through MetricsRecorder.count: the total per
+  step and per second of the step in `<prefix>_rates.csv`, over the whole run in
+  `<prefix>_rates_summary.csv`.
+
+Recording a request is a dict lookup, a histogram increment and a deque
+append, so full percentile data survives 10k users without stdout I/O.
+"""
+
+import collections
+import csv
+import os
+import time
+import traceback
+
+import gevent
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of latencies in milliseconds, stored at microsecond resolution.
+
+    Values below 128us get exact buckets; above that each power of two is split
+    into 64 sub-buckets, which bounds the relative error at 1/64.
+    """
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    SUB_BUCKET_BITS = 6
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    @classmethod
+    def _index(cls, micros):
+        if micros < (2 << cls.SUB_BUCKET_BITS):
+            return micros
+        shift = micros.bit_length() - cls.SUB_BUCKET_BITS - 1
+        return (shift << cls.SUB_BUCKET_BITS) + (micros >> shift) + (1 << cls.SUB_BUCKET_BITS)
+
+    @classmethod
+    def _value(cls, index):
+        if index < (2 << cls.SUB_BUCKET_BITS):
+            return index
+        shift = (index >> cls.SUB_BUCKET_BITS) - 2
+        mantissa = index - ((shift + 1) << cls.SUB_BUCKET_BITS)
+        return mantissa << shift
+
+    def record(self, millis):
+        micros = max(0, int(millis * 1000))
+        self.counts[self._index(micros)] += 1
+        self.count += 1
+        self.total += millis
+        if self.min is None or millis < self.min:
+            self.min = millis
+        if self.max is None or millis > self.max:
+            self.max = millis
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, fraction):
+        """Latency (ms) at or below which `fraction` of the recorded requests fall."""
+        if not self.count:
+            return 0.0
+        target = max(1, int(round(fraction * self.count)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._value(index) / 1000.0, self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class SampledFailureLog:
+    """Prints at most `per_second` failures per second and counts the rest."""
+
+    def __init__(self, per_second=5, print_fn=print):
+        self.per_second = per_second
+        self.print_fn = print_fn
+        self.window_start = 0.0
+        self.window_count = 0
+        self.suppressed = 0
+        self.total = 0
+
+    def _admit(self):
+        self.total += 1
+        now = time.monotonic()
+        if now - self.window_start >= 1.0:
+            if self.suppressed:
+                self.print_fn(f"... {self.suppressed} more failures suppressed")
+            self.window_start = now
+            self.window_count = 0
+            self.suppressed = 0
+        if self.window_count < self.per_second:
+            self.window_count += 1
+            return True
+        self.suppressed += 1
+        return False
+
+    def log(self, message):
+        if self._admit():
+            self.print_fn(message)
+
+    def exception(self, message):
+        """Log `message` plus the traceback of the exception being handled, if sampled."""
+        if self._admit():
+            self.print_fn(message)
+            self.print_fn(traceback.format_exc().rstrip())
+
+
+class MetricsRecorder:
+    """Per-endpoint histograms, a flushed sample ring buffer and per-step snapshots."""
+
+    SAMPLE_FIELDS = ("timestamp", "request_type", "name", "response_time_ms", "ok")
+    STEP_FIELDS = ("step", "step_start", "request_type", "name", "requests", "failures", "rps",
+                   "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    VALUE_FIELDS = ("step", "step_start", "kind", "name", "count", "mean", "p50", "p95", "p99", "max")
+    RATE_FIELDS = ("step", "step_start", "kind", "name", "count", "per_second")
+
+    def __init__(self, prefix=None, buffer_size=100_000, flush_interval=1.0):
+        self.prefix = prefix
+        self.flush_interval = flush_interval
+        self.samples = collections.deque(maxlen=buffer_size)
+        self.dropped_samples = 0
+        self.totals = {}
+        self.step_histograms = {}
+        self.values = {}
+        self.step_values = {}
+        self.counters = collections.Counter()
+        self.step_counters = collections.Counter()
+        self.failures = collections.Counter()
+        self.step_failures = collections.Counter()
+        self.step_durations = []
+        self.step_index = None
+        self.step_started_at = None
+        self.run_started_at = None
+        self._flusher = None
+        self._sample_file = None
+        self._sample_writer = None
+        self._step_file = None
+        self._step_writer = None
+        self._value_file = None
+        self._value_writer = None
+        self._rate_file = None
+        self._rate_writer = None
+
+    # -- recording ---------------------------------------------------------
+
+    def record(self, request_type, name, response_time, exception=None):
+        key = (request_type, name)
+        histogram = self.totals.get(key)
+        if histogram is None:
+            histogram = self.totals[key] = LatencyHistogram()
+        histogram.record(response_time)
+        step_histogram = self.step_histograms.get(key)
+        if step_histogram is None:
+            step_histogram = self.step_histograms[key] = LatencyHistogram()
+        step_histogram.record(response_time)
+        if exception is not None:
+            self.failures[key] += 1
+            self.step_failures[key] += 1
+        if len(self.samples) == self.samples.maxlen:
+            self.dropped_samples += 1
+        self.samples.append((time.time(), request_type, name, response_time, exception is None))
+
+    def observe(self, kind, name, value):
+        """Record a non-latency quantity (a count or a rate) under (kind, name), apart from the requests."""
+        key = (kind, name)
+        for histograms in (self.values, self.step_values):
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = LatencyHistogram()
+            histogram.record(value)
+
+    def count(self, kind, name, amount=1):
+        """Add `amount` to the (kind, name) counter, reported as a total and a per-second rate."""
+        key = (kind, name)
+        self.counters[key] += amount
+        self.step_counters[key] += amount
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self, step_durations=()):
+        """Open output files and start the flusher; step_durations drives step snapshots."""
+        self.step_durations = list(step_durations)
+        self.run_started_at = self.step_started_at = time.time()
+        self.step_index = 0
+        if self.prefix:
+            os.makedirs(os.path.dirname(self.prefix) or ".", exist_ok=True)
+            self._sample_file = open(f"{self.prefix}_samples.csv", "w", newline="", buffering=1 << 20)
+            self._sample_writer = csv.writer(self._sample_file)
+            self._sample_writer.writerow(self.SAMPLE_FIELDS)
+            self._step_file = open(f"{self.prefix}_steps.csv", "w", newline="")
+            self._step_writer = csv.writer(self._step_file)
+            self._step_writer.writerow(self.STEP_FIELDS)
+            self._value_file = open(f"{self.prefix}_values.csv", "w", newline="")
+            self._value_writer = csv.writer(self._value_file)
+            self._value_writer.writerow(self.VALUE_FIELDS)
+            self._rate_file = open(f"{self.prefix}_rates.csv", "w", newline="")
+            self._rate_writer = csv.writer(self._rate_file)
+            self._rate_writer.writerow(self.RATE_FIELDS)
+        self._flusher = gevent.spawn(self._flush_loop)
+
+    def stop(self):
+        if self._flusher is not None:
+            self._flusher.kill()
+            self._flusher = None
+        if self.step_index is not None:
+            self.snapshot_step()
+        self.flush()
+        if self.prefix and self.run_started_at is not None:
+            self.write_summary(f"{self.prefix}_summary.csv")
+            self.write_value_summary(f"{self.prefix}_values_summary.csv")
+            self.write_rate_summary(f"{self.prefix}_rates_summary.csv")
+        for f in (self._sample_file, self._step_file, self._value_file, self._rate_file):
+            if f is not None:
+                f.close()
+        self._sample_file = self._step_file = self._value_file = self._rate_file = None
+        self.run_started_at = None
+
+    def _flush_loop(self):
+        while True:
+            gevent.sleep(self.flush_interval)
+            self.flush()
+            self._check_step_boundary()
+
+    def flush(self):
+        """Drain the ring buffer to the samples file (or just discard it without a prefix)."""
+        samples = self.samples
+        count = len(samples)
+        if self._sample_writer is None:
+            samples.clear()
+            return
+        rows = [samples.popleft() for _ in range(count)]
+        self._sample_writer.writerows(
+            (f"{ts:.3f}", request_type, name, f"{response_time:.2f}", int(ok))
+            for ts, request_type, name, response_time, ok in rows
+        )
+
+    # -- steps -------------------------------------------------------------
+
+    def _check_step_boundary(self):
+        if not self.step_durations or self.step_index is None:
+            return
+        elapsed = time.time() - self.run_started_at
+        boundary = sum(self.step_durations[:self.step_index + 1])
+        if elapsed >= boundary and self.step_index < len(self.step_durations):
+            self.snapshot_step()
+
+    def snapshot_step(self):
+        """Write per-endpoint stats for the step that just ended and start a new one."""
+        now = time.time()
+        duration = max(now - self.step_started_at, 1e-9)
+        rows = []
+        for (request_type, name), histogram in sorted(self.step_histograms.items()):
+            rows.append((
+                self.step_index, f"{self.step_started_at:.3f}", request_type, name, histogram.count,
+                self.step_failures[(request_type, name)], f"{histogram.count / duration:.2f}",
+                f"{histogram.mean():.2f}", *(f"{histogram.percentile(p):.2f}" for p in PERCENTILES),
+                f"{histogram.max or 0:.2f}",
+            ))
+        if self._step_writer is not None:
+            self._step_writer.writerows(rows)
+            self._step_file.flush()
+        if self._value_writer is not None:
+            self._value_writer.writerows(
+                (self.step_index, f"{self.step_started_at:.3f}", kind, name, histogram.count,
+                 f"{histogram.mean():.2f}", *(f"{histogram.percentile(p):.2f}" for p in PERCENTILES),
+                 f"{histogram.max or 0:.2f}")
+                for (kind, name), histogram in sorted(self.step_values.items())
+            )
+            self._value_file.flush()
+        if self._rate_writer is not None:
+            self._rate_writer.writerows(
+                (self.step_index, f"{self.step_started_at:.3f}", kind, name, total, f"{total / duration:.2f}")
+                for (kind, name), total in sorted(self.step_counters.items())
+            )
+            self._rate_file.flush()
+        self.step_histograms = {}
+        self.step_values = {}
+        self.step_counters = collections.Counter()
+        self.step_failures = collections.Counter()
+        self.step_index += 1
+        self.step_started_at = now
+        return rows
+
+    # -- reporting ---------------------------------------------------------
+
+    def summary_rows(self):
+        for (request_type, name), histogram in sorted(self.totals.items()):
+            yield {
+                "request_type": request_type,
+                "name": name,
+                "requests": histogram.count,
+                "failures": self.failures[(request_type, name)],
+                "mean_ms": round(histogram.mean(), 2),
+                "p50_ms": round(histogram.percentile(0.5), 2),
+                "p95_ms": round(histogram.percentile(0.95), 2),
+                "p99_ms": round(histogram.percentile(0.99), 2),
+                "max_ms": round(histogram.max or 0, 2),
+            }
+
+    def write_summary(self, path):
+        rows = list(self.summary_rows())
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["request_type", "name", "requests", "failures",
+                                                   "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def value_summary_rows(self):
+        for (kind, name), histogram in sorted(self.values.items()):
+            yield {
+                "kind": kind,
+                "name": name,
+                "count": histogram.count,
+                "mean": round(histogram.mean(), 2),
+                "p50": round(histogram.percentile(0.5), 2),
+                "p95": round(histogram.percentile(0.95), 2),
+                "p99": round(histogram.percentile(0.99), 2),
+                "max": round(histogram.max or 0, 2),
+            }
+
+    def write_value_summary(self, path):
+        rows = list(self.value_summary_rows())
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["kind", "name", "count", "mean", "p50", "p95", "p99", "max"])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def rate_summary_rows(self):
+        duration = max(time.time() - self.run_started_at, 1e-9)
+        for (kind, name), total in sorted(self.counters.items()):
+            yield {"kind": kind, "name": name, "count": total, "per_second": round(total / duration, 2)}
+
+    def write_rate_summary(self, path):
+        rows = list(self.rate_summary_rows())
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["kind", "name", "count", "per_second"])
+            writer.writeheader()
+            writer.writerows(rows)
@@ -0,0 +1,160 @@
+"""
+Open-workload (constant arrival rate) load shape with coordinated-omission correction.
+
+With closed-loop personas (`wait_time = between(...)`) a slow backend slows
+the users down, offered load silently drops and the latency tail is hidden.
+Here every persona instead draws task start times from a shared
+ArrivalSchedule that issues slots at a fixed rate, independent of how fast
+earlier tasks completed:
+
+- `paced_by(schedule)` is used as a persona's wait_time. It claims the next
+  slot and sleeps until it; if the slot is already in the past the user is
+  behind, starts immediately and remembers how late it is (the schedule lag).
+- Requests made by that task carry the lag in their Locust context, so the
+  request listener can record `response_time + lag`: the latency a client
+  that arrived on schedule would have seen, i.e. including queueing delay.
+- ArrivalRateShape sizes the user population from each schedule's observed
+  task duration (Little's law) so enough users are free to take every slot.
+
+Rates are task iterations per second per persona. The schedules live in the
+process that runs the users and the shape updates them from tick(), so this
+shape is meant for single-process runs; distributed runs keep StepLoadShape.
+"""
+
+import math
+import time
+
+from locust import LoadTestShape
+
+DEFAULT_TASK_SECONDS = 1.0
+HEADROOM = 1.25
+EWMA_ALPHA = 0.1
+
+
+class ArrivalSchedule:
+    """Hands out task start slots at `rate` per second and tracks task durations."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rate = 0.0
+        self.next_slot = None
+        self.task_seconds = None
+        self.lag = 0.0
+
+    def set_rate(self, rate):
+        if rate != self.rate:
+            self.rate = rate
+            # Restart the schedule from now so a rate change does not replay a backlog
+            self.next_slot = time.monotonic() if rate > 0 else None
+
+    def claim(self):
+        """Return (slot_time, lag_seconds) for the next task, or (None, 0) when idle."""
+        if not self.rate or self.next_slot is None:
+            return None, 0.0
+        slot = self.next_slot
+        self.next_slot += 1.0 / self.rate
+        self.lag = max(0.0, time.monotonic() - slot)
+        return slot, self.lag
+
+    def observe_task(self, seconds):
+        if self.task_seconds is None:
+            self.task_seconds = seconds
+        else:
+            self.task_seconds += EWMA_ALPHA * (seconds - self.task_seconds)
+
+    def users_needed(self, rate):
+        if rate <= 0:
+            return 0
+        task_seconds = self.task_seconds if self.task_seconds is not None else DEFAULT_TASK_SECONDS
+        needed = rate * task_seconds * HEADROOM
+        # Users falling behind means the estimate is too low; grow faster while lagging
+        if self.lag > 1.0:
+            needed *= 1.5
+        return math.ceil(needed) + 1
+
+
+def paced_by(schedule, idle_wait=1.0):
+    """Build a wait_time function that paces a persona by the shared arrival schedule."""
+
+    def wait_time(user):
+        now = time.monotonic()
+        started = getattr(user, "_open_loop_task_started", None)
+        if started is not None:
+            schedule.observe_task(now - started)
+
+        slot, lag = schedule.claim()
+        if slot is None:
+            user._open_loop_task_started = None
+            user._open_loop_lag_ms = 0.0
+            return idle_wait
+
+        delay = max(0.0, slot - now)
+        user._open_loop_task_started = now + delay
+        user._open_loop_lag_ms = lag * 1000.0
+        return delay
+
+    return wait_time
+
+
+def lag_context(user):
+    """User.context() override that tags every request with the task's schedule lag."""
+    lag_ms = getattr(user, "_open_loop_lag_ms", None)
+    return {} if lag_ms is None else {"open_loop_lag_ms": lag_ms}
+
+
+def corrected_response_time(response_time, context):
+    """Latency including queueing delay, or None for requests outside open-loop pacing."""
+    lag_ms = (context or {}).get("open_loop_lag_ms")
+    if lag_ms is None:
+        return None
+    return response_time + lag_ms
+
+
+def split_rate(total_rate, weights):
+    """Split a total task rate across personas in proportion to their weights."""
+    total_weight = sum(weights.values())
+    return {name: total_rate * weight / total_weight for name, weight in weights.items()}
+
+
+class ArrivalRateShape(LoadTestShape):
+    """
+    Constant-arrival-rate shape. Subclasses set:
+
+    - steps: [(duration_seconds, {persona_class_name: tasks_per_second}), ...]
+    - schedules: {persona_class_name: ArrivalSchedule}
+    - user_classes: the persona classes, used for their weight shares
+    - max_users, spawn_rate
+    """
+    abstract = True
+    steps = []
+    schedules = {}
+    user_classes = []
+    max_users = 10000
+    spawn_rate = 100
+
+    def current_step(self):
+        elapsed = 0
+        run_time = self.get_run_time()
+        for index, (duration, rates) in enumerate(self.steps):
+            elapsed += duration
+            if run_time < elapsed:
+                return index, rates
+        return None, None
+
+    def tick(self):
+        index, rates = self.current_step()
+        if rates is None:
+            return None
+
+        total_weight = sum(cls.weight for cls in self.user_classes)
+        users = 0
+        for cls in self.user_classes:
+            rate = rates.get(cls.__name__, 0.0)
+            self.schedules[cls.__name__].set_rate(rate)
+            needed = self.schedules[cls.__name__].users_needed(rate)
+            # Locust splits users by weight, so size the total such that every persona's share suffices
+            if needed:
+                users = max(users, math.ceil(needed * total_weight / cls.weight))
+
+        return min(users, self.max_users), self.spawn_rate
+
@@ -0,0 +1,149 @@
+"""
+Server-side cost of each step, from the backend's per-action histograms.
+
+GET /health/metrics (RequestCostCollector) reports, per "Controller#action" and
+job class, cumulative histograms of wall time, SQL statements, SQL time, cache
+hits and misses, LLM calls and time, allocations and the remaining Ruby time.
+StepCostScraper scrapes it at every StepLoadShape step boundary and writes the
+difference between consecutive scrapes to METRICS_PREFIX_costs.csv, one row per
+step, action and metric, with the same step numbers as METRICS_PREFIX_steps.csv.
+A latency regression in a step can then be put down to more queries, slower
+queries, LLM wait or Ruby time.
+
+The backend buckets values exactly like LatencyHistogram (in thousandths), so
+the bucket counts of two scrapes subtract into the step's own histogram. As with
+/health/caches, a scrape lands on one Puma worker; when the pid changes between
+scrapes the later scrape is reported whole. Outside development and test the
+backend needs DIAGNOSTICS_TOKEN (see loadtest/backend_stats.py) and must run the
+collector, which DIAGNOSTICS_TOKEN also turns on.
+"""
+
+import collections
+import csv
+import os
+import time
+
+import gevent
+import requests
+
+from loadtest.backend_stats import diagnostics_headers
+from loadtest.metrics import PERCENTILES, LatencyHistogram
+
+COSTS_PATH = "/health/metrics"
+COST_FIELDS = ("step", "action", "requests", "metric", "mean", "p50", "p95", "p99", "max")
+# Printed per action at the end of a run
+SUMMARY_METRICS = ("durationMs", "sqlQueries", "sqlMs", "bedrockMs", "rubyMs")
+
+
+def fetch_request_costs(host, timeout=5):
+    """Return the /health/metrics payload, or None if the backend does not answer."""
+    try:
+        response = requests.get(host.rstrip("/") + COSTS_PATH, headers=diagnostics_headers(), timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def histogram_delta(before, after):
+    """LatencyHistogram of what `after` recorded since `before` (both /health/metrics histograms)."""
+    before = before or {}
+    start = {int(index): count for index, count in (before.get("buckets") or {}).items()}
+    histogram = LatencyHistogram()
+    counts = collections.Counter()
+    for index, count in (after.get("buckets") or {}).items():
+        difference = count - start.get(int(index), 0)
+        if difference > 0:
+            counts[int(index)] = difference
+    histogram.counts = counts
+    histogram.count = sum(counts.values())
+    histogram.total = after.get("sum", 0) - before.get("sum", 0)
+    # The backend only keeps the all-time maximum, which bounds the step's percentiles
+    histogram.max = after.get("max", 0)
+    return histogram
+
+
+def cost_rows(before, after, step):
+    """CSV rows of the per-action costs recorded between two scrapes."""
+    if after is None:
+        return []
+    if before is None or before.get("pid") != after.get("pid"):
+        before = {}
+    previous_actions = before.get("actions") or {}
+    rows = []
+    for action, metrics in sorted((after.get("actions") or {}).items()):
+        previous = previous_actions.get(action) or {}
+        requests_made = metrics.get("requests", 0) - previous.get("requests", 0)
+        if requests_made <= 0:
+            continue
+        for metric, histogram in metrics.items():
+            if not isinstance(histogram, dict):
+                continue
+            delta = histogram_delta(previous.get(metric), histogram)
+            rows.append({
+                "step": step, "action": action, "requests": requests_made, "metric": metric,
+                "mean": round(delta.mean(), 3),
+                **{f"p{round(p * 100)}": round(delta.percentile(p), 3) for p in PERCENTILES},
+                "max": round(delta.max or 0, 3),
+            })
+    return rows
+
+
+class StepCostScraper:
+    """Scrapes /health/metrics at each step boundary and appends the step's costs to a CSV file."""
+
+    def __init__(self, host, path, step_durations=()):
+        self.host = host
+        self.path = path
+        self.step_durations = list(step_durations)
+        self.step = 0
+        self.first = None
+        self.last = None
+        self._greenlet = None
+
+    def start(self):
+        self.first = self.last = fetch_request_costs(self.host)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", newline="") as f:
+            csv.DictWriter(f, fieldnames=COST_FIELDS).writeheader()
+        if self.step_durations:
+            self._greenlet = gevent.spawn(self._scrape_steps)
+
+    def stop(self):
+        """Record the last (partial) step; returns the whole run's rows (step "all")."""
+        if self._greenlet is not None:
+            self._greenlet.kill()
+            self._greenlet = None
+        self.scrape_step()
+        return cost_rows(self.first, self.last, "all")
+
+    def _scrape_steps(self):
+        started = time.time()
+        boundary = 0
+        for duration in self.step_durations:
+            boundary += duration
+            gevent.sleep(max(0, started + boundary - time.time()))
+            self.scrape_step()
+
+    def scrape_step(self):
+        current = fetch_request_costs(self.host)
+        if current is None:
+            return
+        with open(self.path, "a", newline="") as f:
+            csv.DictWriter(f, fieldnames=COST_FIELDS).writerows(cost_rows(self.last, current, self.step))
+        self.last = current
+        self.step += 1
+
+
+def print_cost_summary(rows, limit=10):
+    """Mean server-side cost per request of the busiest actions."""
+    by_action = collections.defaultdict(dict)
+    for row in rows:
+        by_action[row["action"]][row["metric"]] = row
+    busiest = sorted(by_action.items(), key=lambda item: -item[1]["durationMs"]["requests"])[:limit]
+    if not busiest:
+        return
+    print("Server cost per request (mean): " + ", ".join(SUMMARY_METRICS))
+    for action, metrics in busiest:
+        means = "  ".join(f"{metrics[m]['mean']:>9.2f}" if m in metrics else f"{'-':>9}" for m in SUMMARY_METRICS)
+        print(f"  {action:<45} {metrics['durationMs']['requests']:>8}  {means}")
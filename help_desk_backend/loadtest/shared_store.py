@@ -0,0 +1,214 @@
+"""
+Cross-process credential and conversation store for distributed Locust runs.
+
+When Locust runs with `--processes N` (or master/worker on one box) every
+worker has its own copy of the module-level `user_store`, so conversations
+created on one worker are invisible to ExpertUsers on another. The master
+runs a SharedStoreServer on a Unix socket, backed by an IndexedUserStore, and
+each worker talks to it through SharedUserStore, which has the same interface
+as the in-process stores.
+
+The protocol is one JSON object per line in each direction:
+
+    request:  {"op": "store_conversation", "args": {...}}
+    response: {"ok": true, "result": {...}}
+
+The server can also run on its own:
+
+    python -m loadtest.shared_store --socket /tmp/locust-harness.sock
+"""
+
+import argparse
+import json
+import os
+
+from gevent import socket
+from gevent.queue import Queue
+from gevent.server import StreamServer
+
+from loadtest.user_store import IndexedUserStore
+
+DEFAULT_SOCKET_PATH = "/tmp/locust-harness-shared-store.sock"
+
+
+def _as_dict(record):
+    return None if record is None else record.to_dict()
+
+
+class SharedStoreServer:
+    """Serves an IndexedUserStore to worker processes over a Unix socket."""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, store=None):
+        self.socket_path = socket_path
+        self.store = store or IndexedUserStore()
+        self._server = None
+        self._ops = {
+            "store_user": lambda args: _as_dict(self.store.store_user(**args)),
+            "store_conversation": lambda args: _as_dict(self.store.store_conversation(**args)),
+            "get_random_user": lambda args: _as_dict(self.store.get_random_user()),
+            "get_random_expert": lambda args: _as_dict(self.store.get_random_expert()),
+            "get_random_conversation": lambda args: _as_dict(self.store.get_random_conversation(**args)),
+            "counts": lambda args: list(self.store.counts()),
+        }
+
+    def start(self):
+        """Bind the socket and serve in the background (non-blocking)."""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        listener.listen(1024)
+        self._server = StreamServer(listener, self._handle)
+        self._server.start()
+        return self
+
+    def serve_forever(self):
+        self.start()
+        self._server.serve_forever()
+
+    def stop(self):
+        if self._server:
+            self._server.stop()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def _handle(self, conn, _address):
+        stream = conn.makefile("rwb")
+        try:
+            for line in stream:
+                try:
+                    request = json.loads(line)
+                    result = self._ops[request["op"]](request.get("args") or {})
+                    response = {"ok": True, "result": result}
+                except Exception as e:
+                    response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                stream.write(json.dumps(response).encode() + b"\n")
+                stream.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            stream.close()
+            conn.close()
+
+
+class SharedStoreError(Exception):
+    pass
+
+
+class _Connection:
+    def __init__(self, socket_path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_path)
+        self.stream = self.sock.makefile("rwb")
+
+    def call(self, op, args):
+        self.stream.write(json.dumps({"op": op, "args": args}).encode() + b"\n")
+        self.stream.flush()
+        line = self.stream.readline()
+        if not line:
+            raise SharedStoreError("shared store closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise SharedStoreError(response.get("error"))
+        return response.get("result")
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+
+class SharedUserStore:
+    """
+    Worker-side store with the UserStore interface.
+
+    Everything is written to a local IndexedUserStore and to the shared server.
+    Lookups scoped to one user (their own conversations) are answered locally,
+    since that user's greenlet lives on this worker; pool-wide samples (any
+    user, any expert, any conversation) go to the server so every worker sees
+    every other worker's data. If the server is unreachable the local store
+    answers instead, so a run degrades to per-worker pools rather than failing.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, pool_size=8):
+        self.socket_path = socket_path
+        self.local = IndexedUserStore()
+        self._pool = Queue()
+        self._pool_size = pool_size
+        self._opened = 0
+        self.remote_errors = 0
+
+    def _call(self, op, **args):
+        conn = None
+        try:
+            if self._pool.empty() and self._opened < self._pool_size:
+                self._opened += 1
+                try:
+                    conn = _Connection(self.socket_path)
+                except OSError:
+                    self._opened -= 1
+                    raise
+            else:
+                conn = self._pool.get()
+            result = conn.call(op, args)
+            self._pool.put(conn)
+            return result
+        except (OSError, ValueError, SharedStoreError):
+            self.remote_errors += 1
+            if conn is not None:
+                conn.close()
+                self._opened -= 1
+            raise
+
+    def _call_or_none(self, op, **args):
+        try:
+            return self._call(op, **args)
+        except (OSError, ValueError, SharedStoreError):
+            return None
+
+    def get_random_user(self):
+        return self._call_or_none("get_random_user") or self.local.get_random_user()
+
+    def get_random_expert(self):
+        return self._call_or_none("get_random_expert") or self.local.get_random_expert()
+
+    def get_user(self, username):
+        # Username ranges are leased per worker, so only this worker can have stored it
+        return self.local.get_user(username)
+
+    def store_user(self, username, auth_token, user_id, is_expert=False):
+        record = self.local.store_user(username, auth_token, user_id, is_expert)
+        self._call_or_none("store_user", username=username, auth_token=auth_token, user_id=user_id, is_expert=is_expert)
+        return record
+
+    def store_conversation(self, conversation_id, user_id, expert_id=None):
+        record = self.local.store_conversation(conversation_id, user_id, expert_id)
+        self._call_or_none("store_conversation", conversation_id=conversation_id, user_id=user_id, expert_id=expert_id)
+        return record
+
+    def get_random_conversation(self, user_id=None):
+        if user_id:
+            return self.local.get_random_conversation(user_id)
+        return self._call_or_none("get_random_conversation") or self.local.get_random_conversation()
+
+    def counts(self):
+        return self._call_or_none("counts") or self.local.counts()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the harness shared store as a standalone process.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH)
+    args = parser.parse_args()
+
+    server = SharedStoreServer(args.socket)
+    print(f"Shared store listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Pre-provisioned credential pool for the Locust personas.
+
+`python -m loadtest.warmup` registers users and experts ahead of a run and
+writes one JSON record per line:
+
+    {"username": "user_17", "password": "user_17", "user_id": 42,
+     "token": "<jwt>", "exp": 1767225600, "is_expert": false}
+
+`bin/rails dataset:seed EXPORT=<file>` writes the same records for the accounts
+of a bulk-seeded database (see DatasetSeeder).
+
+Runs started with TOKEN_POOL=<file> hand these records to personas in
+on_start instead of calling /auth/login or /auth/register, so ramp-up does
+not measure bcrypt. Tokens only last 15 minutes, so a pool from an earlier run
+is mostly expired: every load-generating process renews the records near or
+past their `exp` once in test_start, before personas spawn, with plain HTTP
+calls that are not recorded as requests (TokenPool.renew_stale). Tokens that
+expire later in a long run are refreshed by the persona that picks them up.
+Renewed tokens are written back at the end of the run.
+"""
+
+import base64
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_REFRESH_MARGIN = 120  # seconds before `exp` at which a token is refreshed
+
+
+def jwt_claim(token, claim):
+    """Return a claim of a JWT without verifying it (None if unreadable)."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload)).get(claim)
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def jwt_expiry(token):
+    """Return the `exp` claim of a JWT without verifying it (None if unreadable)."""
+    return jwt_claim(token, "exp")
+
+
+def load_records(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_records(path, records):
+    """
+    Write records as JSONL, replacing the file atomically. The temporary file is per
+    process: the workers of a --processes run all save the same pool when they quit.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    os.replace(tmp_path, path)
+
+
+class TokenPool:
+    """Hands out pre-provisioned credential records, cycling through experts and users separately."""
+
+    def __init__(self, path, refresh_margin=DEFAULT_REFRESH_MARGIN):
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self.records = load_records(path)
+        self.lock = threading.Lock()
+        self.dirty = False
+        self._queues = {
+            True: [r for r in self.records if r.get("is_expert")],
+            False: [r for r in self.records if not r.get("is_expert")],
+        }
+        # Start at a random offset so concurrent workers loading the same file spread out
+        self._cursors = {kind: random.randrange(len(q)) if q else 0 for kind, q in self._queues.items()}
+
+    def __len__(self):
+        return len(self.records)
+
+    def acquire(self, is_expert=False):
+        """Return the next record of the requested kind, or None if the pool has none."""
+        with self.lock:
+            queue = self._queues[bool(is_expert)]
+            if not queue:
+                return None
+            record = queue[self._cursors[bool(is_expert)] % len(queue)]
+            self._cursors[bool(is_expert)] += 1
+            return record
+
+    def needs_refresh(self, record, now=None):
+        exp = record.get("exp")
+        return exp is None or exp - (now or time.time()) < self.refresh_margin
+
+    def renew_stale(self, renew, concurrency=32):
+        """
+        Replace the token of every record near or past expiry with `renew(record)` (a new
+        token, or None to keep the old one), `concurrency` at a time. Returns how many were renewed.
+        """
+        stale = [record for record in self.records if self.needs_refresh(record)]
+        if not stale:
+            return 0
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            tokens = list(executor.map(renew, stale))
+        renewed = 0
+        for record, token in zip(stale, tokens):
+            if token:
+                self.update_token(record, token)
+                renewed += 1
+        return renewed
+
+    def update_token(self, record, token):
+        with self.lock:
+            record["token"] = token
+            record["exp"] = jwt_expiry(token)
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if self.dirty:
+                save_records(self.path, self.records)
+                self.dirty = False
@@ -0,0 +1,452 @@
+"""
+Record a run's exact request sequence and replay it against another backend.
+
+Recording (TRACE_RECORD=trace.jsonl.gz in the locustfile) writes one JSON line
+per HTTP request, gzip-compressed and in start-time order:
+
+    {"t": 12.345, "u": "u3", "m": "POST", "p": "/conversations/{c7}/messages",
+     "q": {...}, "b": {...}, "h": {...}, "n": "/conversations/:id/messages", "s": 201, "new": "m12"}
+
+`t` is seconds since the start of the run. Server ids are replaced by logical
+ids (u<n> users, c<n> conversations, m<n> messages) in the path, the query and
+the JSON body, and `new` names the id a response created. Values that are only
+valid against the recording server are stored as references instead: update and
+message cursors as {"$header": <response header>} (the latest value of that header
+the same user got for the same path) and `since` as {"$since": <seconds before the
+request>}. Users the run took from a TOKEN_POOL never log in, so their credentials
+are written once as {"auth": "u3", "username": ..., "password": ...}.
+
+Replaying re-issues the trace at --speed times the recorded pace. Each logical
+user's requests go out in order on their own connection; a request that refers to
+an id another user's request creates waits until that request has answered.
+Latencies go through MetricsRecorder, so replays compare with
+`python -m loadtest.analyze diff`, and --baseline does that comparison inline for
+CI (exit status 1 on a significant p95 regression beyond --tolerance, or when
+more than --max-mismatches of the responses disagree with the recorded status):
+
+    python -m loadtest.trace --host http://localhost:3000 --out log/replay-b trace.jsonl.gz \\
+        [--speed 2] [--baseline log/replay-a] [--username-suffix _r2]
+
+Action Cable traffic is not recorded.
+"""
+
+import gzip
+import heapq
+import itertools
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qsl, urlsplit
+
+from loadtest.token_pool import jwt_claim
+
+TRACE_VERSION = 1
+REORDER_SECONDS = 60  # requests are written once nothing can start before them any more
+# JSON keys and query parameters that carry server ids, by logical id kind
+ID_KEYS = {"conversation_id": "c", "conversationId": "c", "user_id": "u", "userId": "u"}
+# Path segments followed by a server id
+ID_SEGMENTS = {"conversations": "c", "messages": "m"}
+# Parameters whose value comes from a response header of the previous request to the same path
+CURSOR_PARAMS = {"cursor": "X-Updates-Cursor", "before": "X-Messages-Before", "after": "X-Messages-After"}
+CONDITIONAL_HEADERS = {"If-None-Match": "ETag"}
+# Responses that create an id: (method, path) -> kind
+CREATES = {("POST", "/conversations"): "c", ("POST", "/messages"): "m"}
+AUTH_PATHS = ("/auth/register", "/auth/login", "/auth/refresh")
+PLACEHOLDER = re.compile(r"\{([cum]\d+)\}")
+
+
+class LogicalIds:
+    """Server id <-> logical id for one kind of resource."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.logical = {}
+        self.counter = itertools.count(1)
+
+    def name(self, server_id, create=False):
+        """Logical id of `server_id`, newly assigned if `create`; None if unknown."""
+        key = str(server_id)
+        if key not in self.logical and create:
+            self.logical[key] = f"{self.kind}{next(self.counter)}"
+        return self.logical.get(key)
+
+
+class TraceRecorder:
+    """Turns Locust request events into trace lines; see the module docstring."""
+
+    def __init__(self, path, credentials=None):
+        self.path = path
+        self.credentials = {str(r["user_id"]): r for r in (credentials or []) if r.get("user_id")}
+        self.ids = {kind: LogicalIds(kind) for kind in "cum"}
+        self.started = None
+        self.pending = []
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        self.file = None
+        self.written = 0
+
+    def start(self):
+        self.started = time.time()
+        self.file = gzip.open(self.path, "wt", encoding="utf-8")
+        self._write({"trace": TRACE_VERSION, "recordedAt": datetime.now(timezone.utc).isoformat()})
+
+    def stop(self):
+        with self.lock:
+            self._flush(float("inf"))
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def record(self, name, response, response_time):
+        """Add the request behind `response`; requests without one (custom events) are skipped."""
+        request = getattr(response, "request", None)
+        if self.started is None or request is None or not getattr(request, "url", None):
+            return
+        started_at = time.time() - response_time / 1000.0
+        with self.lock:
+            event = self._event(name, request, response, started_at)
+            if event is None:
+                return
+            heapq.heappush(self.pending, (event["t"], next(self.sequence), event))
+            self._flush(started_at - self.started - REORDER_SECONDS)
+
+    def _event(self, name, request, response, started_at):
+        url = urlsplit(request.url)
+        method = (request.method or "GET").upper()
+        headers = request.headers or {}
+        user = self._user(headers.get("Authorization"))
+        event = {"t": round(started_at - self.started, 4), "u": user, "m": method, "p": self._path(url.path)}
+
+        query = {}
+        for key, value in parse_qsl(url.query):
+            if key in CURSOR_PARAMS:
+                query[key] = {"$header": CURSOR_PARAMS[key]}
+            elif key == "since":
+                query[key] = {"$since": round(started_at - _parse_time(value), 3)}
+            else:
+                query[key] = self._ids_in(key, value)
+        if query:
+            event["q"] = query
+        conditional = {header: {"$header": source}
+                       for header, source in CONDITIONAL_HEADERS.items() if headers.get(header)}
+        if conditional:
+            event["h"] = conditional
+
+        body = getattr(request, "body", None) or getattr(request, "payload", None)
+        if body:
+            try:
+                event["b"] = self._ids_in(None, json.loads(body))
+            except (TypeError, ValueError):
+                pass
+
+        event["n"] = name
+        event["s"] = response.status_code
+        self._created(event, method, url.path, response)
+        return event
+
+    def _user(self, authorization):
+        token = (authorization or "").removeprefix("Bearer ").strip()
+        server_id = jwt_claim(token, "user_id") if token else None
+        if server_id is None:
+            return None
+        known = self.ids["u"].name(server_id)
+        if known:
+            return known
+        user = self.ids["u"].name(server_id, create=True)
+        record = self.credentials.get(str(server_id))
+        if record:
+            # Taken from the token pool: the replay has to log this user in itself
+            self._write({"auth": user, "username": record["username"], "password": record["password"]})
+        return user
+
+    def _path(self, path):
+        segments = path.split("/")
+        for index in range(1, len(segments)):
+            kind = ID_SEGMENTS.get(segments[index - 1])
+            if kind and segments[index].isdigit():
+                logical = self.ids[kind].name(segments[index])
+                if logical:
+                    segments[index] = "{" + logical + "}"
+        return "/".join(segments)
+
+    def _ids_in(self, key, value):
+        if isinstance(value, dict):
+            return {k: self._ids_in(k, v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._ids_in(key, v) for v in value]
+        kind = ID_KEYS.get(key)
+        if kind and value is not None:
+            logical = self.ids[kind].name(value)
+            if logical:
+                return "{" + logical + "}"
+        return value
+
+    def _created(self, event, method, path, response):
+        if response.status_code not in (200, 201):
+            return
+        kind = CREATES.get((method, path))
+        if kind is None and path not in AUTH_PATHS:
+            return
+        try:
+            data = response.json()
+        except ValueError:
+            return
+        if not isinstance(data, dict):
+            return
+        if kind:
+            created = data.get("id")
+        else:
+            kind, created = "u", (data.get("user") or {}).get("id")
+        if created is not None:
+            event["new"] = self.ids[kind].name(created, create=True)
+
+    def _flush(self, before):
+        while self.pending and self.pending[0][0] <= before:
+            self._write(heapq.heappop(self.pending)[2])
+
+    def _write(self, line):
+        if self.file is not None:
+            self.file.write(json.dumps(line, separators=(",", ":")) + "\n")
+            self.written += 1
+
+
+def _parse_time(value):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return time.time()
+
+
+def read_trace(path):
+    """Yield the lines of a trace file one at a time."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class Replayer:
+    """Re-issues a trace against `host`; see the module docstring."""
+
+    def __init__(self, host, metrics, speed=1.0, id_timeout=30, username_suffix="", request_header=None):
+        import gevent.event
+        import gevent.queue
+        import requests
+
+        self._gevent_event = gevent.event
+        self._queue = gevent.queue
+        self._requests = requests
+        self.host = host.rstrip("/")
+        self.metrics = metrics
+        self.speed = speed
+        self.id_timeout = id_timeout
+        self.username_suffix = username_suffix
+        self.request_header = request_header
+        self.server_ids = {}
+        self.id_ready = {}
+        self.users = {}
+        self.queues = {}
+        self.workers = []
+        self.counts = {"requests": 0, "status_mismatches": 0, "unresolved": 0}
+
+    def run(self, path):
+        import gevent
+
+        started = time.time()
+        for event in read_trace(path):
+            if "trace" in event:
+                continue
+            if "auth" in event:
+                self._user(event["auth"])["credentials"] = (event["username"] + self.username_suffix, event["password"])
+                continue
+            delay = started + event["t"] / self.speed - time.time()
+            if delay > 0:
+                gevent.sleep(delay)
+            # Logins and registrations run on the connection of the user they authenticate
+            self._queue_for(event.get("u") or (event.get("new") if event["p"] in AUTH_PATHS else None)).put(event)
+        for queue in self.queues.values():
+            queue.put(None)
+        gevent.joinall(self.workers)
+        return self.counts
+
+    def _user(self, user):
+        return self.users.setdefault(user, {"token": None, "credentials": None, "headers": {},
+                                            "session": self._requests.Session()})
+
+    def _queue_for(self, user):
+        import gevent
+
+        if user not in self.queues:
+            self.queues[user] = self._queue.Queue()
+            self.workers.append(gevent.spawn(self._work, user, self.queues[user]))
+        return self.queues[user]
+
+    def _work(self, user, queue):
+        state = self._user(user)
+        for event in iter(queue.get, None):
+            try:
+                self._send(user, state, event)
+            except KeyError:
+                self.counts["unresolved"] += 1
+            except self._requests.RequestException as e:
+                self.metrics.record(event["m"], event.get("n") or event["p"], 0.0, e)
+
+    def _send(self, user, state, event):
+        if user and state["token"] is None and event["p"] not in AUTH_PATHS:
+            if state["credentials"]:
+                self._login(state, user)
+            else:
+                # Wait for the user's login or registration, which may still be under way
+                self._server_id(user)
+        path = PLACEHOLDER.sub(lambda m: self._server_id(m.group(1)), event["p"])
+        params = {k: v for k, v in self._resolve(event.get("q") or {}, state, event["p"]).items() if v is not None}
+        headers = {k: v for k, v in self._resolve(event.get("h") or {}, state, event["p"]).items() if v is not None}
+        body = self._resolve(event.get("b"), state, event["p"]) if "b" in event else None
+        if body and self.username_suffix and event["p"] in AUTH_PATHS:
+            body = _with_username_suffix(body, self.username_suffix)
+
+        response, elapsed = self._request(state, event["m"], path, params, headers, body)
+        if response.status_code == 401 and state["credentials"] and event["p"] not in AUTH_PATHS:
+            # Tokens outlive neither the recording nor a long replay; log in again once
+            self._login(state, user)
+            response, elapsed = self._request(state, event["m"], path, params, headers, body)
+        if event["p"] == "/auth/register" and response.status_code >= 400 and body:
+            # Already registered by an earlier replay against this database
+            response, elapsed = self._request(state, "POST", "/auth/login", {}, {}, {"user": {
+                "username": body["user"]["username"], "password": body["user"]["password"]}})
+
+        self.counts["requests"] += 1
+        mismatch = (response.status_code >= 400) != (event["s"] >= 400)
+        if mismatch:
+            self.counts["status_mismatches"] += 1
+        name = event.get("n") or event["p"]
+        self.metrics.record(event["m"], name, elapsed,
+                            Exception(f"HTTP {response.status_code}, recorded {event['s']}") if mismatch else None)
+        self._learn(user, state, event, response)
+
+    def _request(self, state, method, path, params, headers, body):
+        headers = dict(headers)
+        if state["token"]:
+            headers["Authorization"] = f"Bearer {state['token']}"
+        if self.request_header:
+            headers[self.request_header] = "1"
+        started = time.perf_counter()
+        response = state["session"].request(method, self.host + path, params=params, headers=headers,
+                                            json=body, timeout=60)
+        return response, (time.perf_counter() - started) * 1000
+
+    def _login(self, state, user):
+        username, password = state["credentials"]
+        response = state["session"].post(self.host + "/auth/login",
+                                         json={"user": {"username": username, "password": password}}, timeout=60)
+        if response.status_code == 200:
+            self._learn_auth(user, state, response.json())
+
+    def _learn(self, user, state, event, response):
+        for header in set(CURSOR_PARAMS.values()) | set(CONDITIONAL_HEADERS.values()):
+            if response.headers.get(header):
+                state["headers"][(event["p"], header)] = response.headers[header]
+        if response.status_code not in (200, 201) or "new" not in event:
+            return
+        data = response.json()
+        if event["p"] in AUTH_PATHS:
+            self._learn_auth(event["new"], state, data)
+            if event["p"] != "/auth/refresh" and isinstance(event.get("b"), dict):
+                credentials = event["b"].get("user") or {}
+                state["credentials"] = (credentials.get("username", "") + self.username_suffix,
+                                        credentials.get("password", ""))
+        elif data.get("id") is not None:
+            self._bind(event["new"], data["id"])
+
+    def _learn_auth(self, user, state, data):
+        state["token"] = data.get("token") or state["token"]
+        if (data.get("user") or {}).get("id") is not None:
+            self._bind(user, data["user"]["id"])
+
+    def _bind(self, logical, server_id):
+        self.server_ids[logical] = str(server_id)
+        self._ready(logical).set()
+
+    def _ready(self, logical):
+        if logical not in self.id_ready:
+            self.id_ready[logical] = self._gevent_event.Event()
+        return self.id_ready[logical]
+
+    def _server_id(self, logical):
+        if logical not in self.server_ids and not self._ready(logical).wait(self.id_timeout):
+            raise KeyError(logical)
+        return self.server_ids[logical]
+
+    def _resolve(self, value, state, path):
+        if isinstance(value, dict):
+            if "$header" in value:
+                return state["headers"].get((path, value["$header"]))
+            if "$since" in value:
+                return (datetime.now(timezone.utc) - timedelta(seconds=value["$since"])).isoformat()
+            return {k: self._resolve(v, state, path) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._resolve(v, state, path) for v in value]
+        if isinstance(value, str) and PLACEHOLDER.fullmatch(value):
+            return self._server_id(value[1:-1])
+        return value
+
+
+def _with_username_suffix(body, suffix):
+    user = dict(body.get("user") or {})
+    if "username" in user:
+        user["username"] += suffix
+    return {**body, "user": user}
+
+
+def main(argv=None):
+    from gevent import monkey
+
+    monkey.patch_all()
+
+    import argparse
+    import os
+
+    from loadtest.analyze import diff_rows, print_diff, read_run
+    from loadtest.metrics import MetricsRecorder
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace")
+    parser.add_argument("--host", required=True)
+    parser.add_argument("--out", required=True, help="metrics prefix for the replay's samples and summary")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay pace relative to the recording")
+    parser.add_argument("--username-suffix", default="", help="appended to every username, for a fresh set of users")
+    parser.add_argument("--request-header", default=os.environ.get("LOCUST_REQUEST_HEADER", "X-Locust-Request"))
+    parser.add_argument("--baseline", help="samples (or metrics prefix) of an earlier replay to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="p95 increase over the baseline allowed before the replay fails")
+    parser.add_argument("--min-regression-ms", type=float, default=2.0,
+                        help="p95 increase below which a change counts as noise whatever the tolerance")
+    parser.add_argument("--max-mismatches", type=float, default=0.01,
+                        help="fraction of responses allowed to fail where the recording succeeded, or vice versa")
+    args = parser.parse_args(argv)
+
+    metrics = MetricsRecorder(args.out)
+    metrics.start()
+    counts = Replayer(args.host, metrics, speed=args.speed, username_suffix=args.username_suffix,
+                      request_header=args.request_header).run(args.trace)
+    metrics.stop()
+    print(f"Replayed {counts['requests']} requests: {counts['status_mismatches']} status mismatches, "
+          f"{counts['unresolved']} skipped for ids that were never created")
+
+    failed = counts["requests"] and counts["status_mismatches"] / counts["requests"] > args.max_mismatches
+    if args.baseline:
+        rows = list(diff_rows(read_run(args.baseline, collapse=True), read_run(args.out, collapse=True)))
+        print_diff(rows, 0.95)
+        for row in rows:
+            allowed = max(args.tolerance * row["p95_before_ms"], args.min_regression_ms)
+            if row["p95_verdict"] == "slower" and row["p95_ci_low_ms"] > allowed:
+                print(f"REGRESSION: {row['request_type']} {row['name']} p95 "
+                      f"{row['p95_before_ms']:.2f} -> {row['p95_after_ms']:.2f} ms")
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
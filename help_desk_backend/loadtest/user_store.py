@@ -0,0 +1,258 @@
+"""
+Credential and conversation stores shared by the Locust personas.
+
+UserStore is the original single-lock, dict-backed store. IndexedUserStore keeps
+the same interface but samples in O(1) from array-backed pools, keeps a
+per-user conversation index and spreads writes over striped locks, so the
+load generator's own CPU use stays flat as the store grows toward MAX_USERS.
+"""
+
+import random
+import threading
+
+
+class UserRecord:
+    """Stored credentials for one simulated user."""
+    __slots__ = ("username", "auth_token", "user_id", "is_expert")
+
+    def __init__(self, username, auth_token, user_id, is_expert=False):
+        self.username = username
+        self.auth_token = auth_token
+        self.user_id = user_id
+        self.is_expert = is_expert
+
+    def get(self, key, default=None):
+        """Dict-style access so personas can treat records like the legacy dicts."""
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ConversationRecord:
+    """Stored metadata for one conversation created during the run."""
+    __slots__ = ("id", "user_id", "expert_id", "message_count")
+
+    def __init__(self, conversation_id, user_id, expert_id=None, message_count=0):
+        self.id = conversation_id
+        self.user_id = user_id
+        self.expert_id = expert_id
+        self.message_count = message_count
+
+    def get(self, key, default=None):
+        """Dict-style access so personas can treat records like the legacy dicts."""
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class UserStore:
+    """Thread-safe storage for user credentials and metadata."""
+    def __init__(self):
+        self.used_usernames = {}
+        self.expert_usernames = {}
+        self.conversations = {}
+        self.username_lock = threading.Lock()
+
+    def get_random_user(self):
+        with self.username_lock:
+            if not self.used_usernames:
+                return None
+            random_username = random.choice(list(self.used_usernames.keys()))
+            return self.used_usernames[random_username]
+
+    def get_random_expert(self):
+        with self.username_lock:
+            if not self.expert_usernames:
+                return None
+            random_username = random.choice(list(self.expert_usernames.keys()))
+            return self.expert_usernames[random_username]
+
+    def get_user(self, username):
+        with self.username_lock:
+            return self.used_usernames.get(username)
+
+    def store_user(self, username, auth_token, user_id, is_expert=False):
+        with self.username_lock:
+            user_data = {
+                "username": username,
+                "auth_token": auth_token,
+                "user_id": user_id,
+                "is_expert": is_expert
+            }
+            self.used_usernames[username] = user_data
+            if is_expert:
+                self.expert_usernames[username] = user_data
+            return user_data
+
+    def store_conversation(self, conversation_id, user_id, expert_id=None):
+        with self.username_lock:
+            self.conversations[conversation_id] = {
+                "id": conversation_id,
+                "user_id": user_id,
+                "expert_id": expert_id,
+                "message_count": 0
+            }
+            return self.conversations[conversation_id]
+
+    def get_random_conversation(self, user_id=None):
+        with self.username_lock:
+            if not self.conversations:
+                return None
+            if user_id:
+                user_convos = [c for c in self.conversations.values() if c["user_id"] == user_id]
+                return random.choice(user_convos) if user_convos else None
+            return random.choice(list(self.conversations.values()))
+
+
+class _Pool:
+    """Array-backed keyed pool: O(1) upsert and O(1) uniform sampling."""
+    __slots__ = ("items", "positions")
+
+    def __init__(self):
+        self.items = []
+        self.positions = {}
+
+    def put(self, key, item):
+        position = self.positions.get(key)
+        if position is None:
+            self.positions[key] = len(self.items)
+            self.items.append(item)
+        else:
+            self.items[position] = item
+
+    def get(self, key):
+        position = self.positions.get(key)
+        return None if position is None else self.items[position]
+
+    def sample(self):
+        return random.choice(self.items) if self.items else None
+
+    def __len__(self):
+        return len(self.items)
+
+
+class _Stripe:
+    """One lock plus the slice of every pool whose keys hash onto it."""
+    __slots__ = ("lock", "users", "experts", "conversations", "conversations_by_user")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = _Pool()
+        self.experts = _Pool()
+        self.conversations = _Pool()
+        self.conversations_by_user = {}
+
+
+class IndexedUserStore:
+    """
+    Drop-in replacement for UserStore built for 10k+ simulated users.
+
+    Users and conversations are spread over `stripes` independently locked
+    shards. Each shard keeps array-backed pools, so picking a random user,
+    expert or conversation never copies the key set, and a per-user index
+    answers get_random_conversation(user_id) without scanning every conversation.
+    """
+
+    def __init__(self, stripes=16):
+        self._stripes = [_Stripe() for _ in range(stripes)]
+
+    def _stripe_for(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def _sample(self, pool_name):
+        # Pick a shard with probability proportional to its size, then sample within it.
+        # Sizes are read without locking; a slightly stale size only skews the weighting.
+        sizes = [len(getattr(stripe, pool_name)) for stripe in self._stripes]
+        total = sum(sizes)
+        if not total:
+            return None
+        target = random.randrange(total)
+        for stripe, size in zip(self._stripes, sizes):
+            if target < size:
+                with stripe.lock:
+                    return getattr(stripe, pool_name).sample()
+            target -= size
+        return None
+
+    def get_random_user(self):
+        return self._sample("users")
+
+    def get_random_expert(self):
+        return self._sample("experts")
+
+    def get_user(self, username):
+        stripe = self._stripe_for(username)
+        with stripe.lock:
+            return stripe.users.get(username)
+
+    def store_user(self, username, auth_token, user_id, is_expert=False):
+        record = UserRecord(username, auth_token, user_id, is_expert)
+        stripe = self._stripe_for(username)
+        with stripe.lock:
+            stripe.users.put(username, record)
+            if is_expert:
+                stripe.experts.put(username, record)
+        return record
+
+    def store_conversation(self, conversation_id, user_id, expert_id=None):
+        stripe = self._stripe_for(conversation_id)
+        with stripe.lock:
+            record = stripe.conversations.get(conversation_id)
+            if record is None:
+                record = ConversationRecord(conversation_id, user_id, expert_id)
+                stripe.conversations.put(conversation_id, record)
+                is_new = True
+            else:
+                # Re-storing (e.g. after a claim) updates the record in place
+                record.expert_id = expert_id if expert_id is not None else record.expert_id
+                is_new = False
+
+        if is_new and user_id is not None:
+            owner_stripe = self._stripe_for(user_id)
+            with owner_stripe.lock:
+                owner_stripe.conversations_by_user.setdefault(user_id, []).append(record)
+        return record
+
+    def get_random_conversation(self, user_id=None):
+        if user_id:
+            stripe = self._stripe_for(user_id)
+            with stripe.lock:
+                user_convos = stripe.conversations_by_user.get(user_id)
+                return random.choice(user_convos) if user_convos else None
+        return self._sample("conversations")
+
+    def counts(self):
+        """Return (users, experts, conversations) currently stored."""
+        return (
+            sum(len(stripe.users) for stripe in self._stripes),
+            sum(len(stripe.experts) for stripe in self._stripes),
+            sum(len(stripe.conversations) for stripe in self._stripes),
+        )
+
+
+USER_STORE_BACKENDS = {
+    "legacy": UserStore,
+    "indexed": IndexedUserStore,
+}
+
+
+def create_user_store(backend="indexed"):
+    """Build the store selected by name (see USER_STORE_BACKENDS)."""
+    try:
+        return USER_STORE_BACKENDS[backend]()
+    except KeyError:
+        raise ValueError(f"Unknown user store backend {backend!r}; expected one of {sorted(USER_STORE_BACKENDS)}")
@@ -0,0 +1,132 @@
+"""
+Warm-up stage: provision users and experts ahead of a Locust run.
+
+Registers (or logs in, if they already exist) the same usernames the personas
+use, in parallel batches, and writes the resulting credentials to a token pool
+file (see loadtest/token_pool.py):
+
+    python -m loadtest.warmup --host http://localhost:3000 --users 8000 --experts 1500 --out tokens.jsonl
+
+Re-running with --refresh only renews tokens that are close to expiry:
+
+    python -m loadtest.warmup --host http://localhost:3000 --refresh --out tokens.jsonl
+
+Then start Locust with TOKEN_POOL=tokens.jsonl.
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from loadtest.token_pool import DEFAULT_REFRESH_MARGIN, jwt_expiry, load_records, save_records
+
+_sessions = threading.local()
+
+
+def _session():
+    if not hasattr(_sessions, "session"):
+        _sessions.session = requests.Session()
+    return _sessions.session
+
+
+def _record(username, password, data, is_expert):
+    token = data.get("token")
+    return {
+        "username": username,
+        "password": password,
+        "user_id": data.get("user", {}).get("id"),
+        "token": token,
+        "exp": jwt_expiry(token),
+        "is_expert": is_expert,
+    }
+
+
+def login(host, username, password, is_expert):
+    response = _session().post(
+        f"{host}/auth/login",
+        json={"user": {"username": username, "password": password}},
+        timeout=30,
+    )
+    if response.status_code == 200:
+        return _record(username, password, response.json(), is_expert)
+    return None
+
+
+def provision(host, username, is_expert):
+    """Register `username` (password = username, like the personas) or log in if it exists."""
+    password = username
+    response = _session().post(
+        f"{host}/auth/register",
+        json={"user": {"username": username, "password": password, "password_confirmation": password}},
+        timeout=30,
+    )
+    if response.status_code in (200, 201):
+        return _record(username, password, response.json(), is_expert)
+    return login(host, username, password, is_expert)
+
+
+def refresh(host, record, margin):
+    """Renew the record's token if it expires within `margin` seconds; returns the record."""
+    if record.get("exp") and record["exp"] - time.time() >= margin:
+        return record
+    response = _session().post(
+        f"{host}/auth/refresh",
+        headers={"Authorization": f"Bearer {record['token']}"},
+        timeout=30,
+    )
+    if response.status_code == 200:
+        record["token"] = response.json().get("token")
+        record["exp"] = jwt_expiry(record["token"])
+        return record
+    # Expired tokens cannot be refreshed; fall back to a fresh login
+    return login(host, record["username"], record["password"], record.get("is_expert", False)) or record
+
+
+def run_batches(executor, jobs, batch_size, label):
+    results = []
+    for start in range(0, len(jobs), batch_size):
+        batch = jobs[start:start + batch_size]
+        results.extend(executor.map(lambda job: job(), batch))
+        print(f"{label}: {min(start + batch_size, len(jobs))}/{len(jobs)}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", required=True)
+    parser.add_argument("--out", default="tokens.jsonl")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--experts", type=int, default=150)
+    parser.add_argument("--first-index", type=int, default=0, help="first username index (user_<n>)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--refresh", action="store_true", help="only refresh tokens in an existing --out file")
+    parser.add_argument("--refresh-margin", type=int, default=DEFAULT_REFRESH_MARGIN)
+    args = parser.parse_args()
+    host = args.host.rstrip("/")
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        if args.refresh:
+            records = load_records(args.out)
+            jobs = [lambda r=r: refresh(host, r, args.refresh_margin) for r in records]
+            records = run_batches(executor, jobs, args.batch_size, "refreshed")
+        else:
+            indexes = range(args.first_index, args.first_index + args.users + args.experts)
+            jobs = [
+                lambda i=i, n=n: provision(host, f"expert_user_{i}" if n < args.experts else f"user_{i}", n < args.experts)
+                for n, i in enumerate(indexes)
+            ]
+            records = run_batches(executor, jobs, args.batch_size, "provisioned")
+
+    failed = sum(1 for r in records if r is None)
+    records = [r for r in records if r is not None]
+    save_records(args.out, records)
+    print(f"Wrote {len(records)} records to {args.out} in {time.time() - started:.1f}s ({failed} failed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,36 +7,170 @@ User personas:
 3. ExpertUser - Responds to messages, manages queue (15% of users)
 4. NewUser - Registers for the first time (5% of users)
 
-Debug mode: Set DEBUG_MODE = True to see all HTTP requests and responses
+Debug mode: Set DEBUG_MODE=true to see all HTTP requests and responses. Otherwise
+requests are only recorded by the metrics pipeline (loadtest/metrics.py), which writes
+per-endpoint percentiles, per-step snapshots and raw samples under METRICS_PREFIX.
+`python -m loadtest.analyze` splits those samples (or Locust's --csv history, which
+needs --csv-full-history for per-endpoint rows) by step, finds the saturation step
+and compares two runs.
+The backend's LLM and auth cache counters are scraped at start and stop into
+METRICS_PREFIX_caches.json (see loadtest/backend_stats.py). The SQL statement count
+each response reports (X-DB-Queries) is observed as "DB <name> [queries]" in
+METRICS_PREFIX_values.csv, per step, apart from the request latencies. The backend's
+per-action cost histograms (GET /health/metrics: SQL, cache, LLM and Ruby time,
+allocations) are scraped at every step into METRICS_PREFIX_costs.csv (see
+loadtest/request_costs.py).
+
+Environment:
+- USER_STORE_BACKEND: "indexed" (default, see loadtest/user_store.py) or "legacy"
+- TOKEN_POOL: credentials file from `python -m loadtest.warmup`; personas then start
+  without calling /auth/login or /auth/register. Expired tokens are renewed before
+  users spawn, outside the recorded requests (see loadtest/token_pool.py)
+- HTTP_CLIENT: "requests" (default) or "fast" for FastHttpUser; HTTP_POOL_SIZE,
+  HTTP_SHARED_POOL and HTTP_KEEP_ALIVE tune connection reuse (see loadtest/clients.py)
+- LOCUST_REQUEST_HEADER: header sent on every request so the backend can tell harness
+  traffic apart; must match the backend's LOCUST_REQUEST_HEADER
+- DIAGNOSTICS_TOKEN: sent with the /health/caches and /health/metrics scrapes; must match
+  the backend's DIAGNOSTICS_TOKEN, without which production backends do not serve them
+- LOAD_SHAPE: "step" (default, StepLoadShape), "none" to drive the run with -u/-r/-t,
+  "sweep" for SweepLoadShape: every benchmarked endpoint at SWEEP_LEVELS concurrent users
+  (default 1,4,16,64,256) for SWEEP_STEP_SECONDS each,
+  or "arrival" for the open-workload ArrivalLoadShape: personas are paced to a target task rate per step, users are added
+  as needed to sustain it, and every request is also recorded as "<name> [intended]"
+  with latency measured from its scheduled start (see loadtest/open_loop.py)
+- TRACE_RECORD: file (e.g. trace.jsonl.gz) to record every request of the run into, with
+  logical ids and relative timestamps; `python -m loadtest.trace` replays it against
+  another backend under the identical workload (see loadtest/trace.py)
+- SCENARIO: "mixed" (default, the personas above) or a focused scenario that replaces them:
+  "listing" runs ConversationHistoryUser, which grows each user's history and records
+  /conversations latency per conversation-count bucket (best with LOAD_SHAPE=none);
+  "login" runs LoginUser, which registers once and then logs in repeatedly. Run it under
+  StepLoadShape against a backend with PRESENCE_FLUSH_INTERVAL=0 (an UPDATE per login)
+  and with the default (buffered presence writes) and compare /auth/login in the
+  per-step metrics to see the throughput the write coalescing buys;
+  "ingest" runs MessageIngestUser, which alternates single POST /messages with
+  POST /messages/batch of INGEST_BATCH_SIZE messages; compare the "DB ... [queries per
+  message]" rows of the two paths in METRICS_PREFIX_values.csv and their "INGEST ...
+  [messages written]" per-second rates in METRICS_PREFIX_rates.csv;
+  "benchmark" runs EndpointBenchmarkUser, one endpoint at a time (pick them with
+  --tags), meant for LOAD_SHAPE=sweep; it ends with a per-endpoint capacity table
+  (see loadtest/benchmark.py)
+- UPDATES_MODE: how IdleUser polls: "split" (default, the three /api/*/updates calls),
+  "combined" (one GET /api/updates) or "both" (each user picks one at random); every
+  poll is also recorded as "POLL updates cycle [split|combined]" for a side-by-side view
+- Every GET /conversations also observes "SUMMARY staleness [ms]" in
+  METRICS_PREFIX_values.csv per listed conversation with a summary: how long its newest
+  message has been missing from the summary (0 when covered)
+- TRACK_ASSIGNMENT: "true" (default) to follow every created conversation until expert
+  auto-assignment (a background job) finishes, polling GET /conversations/:id every
+  ASSIGNMENT_POLL_INTERVAL seconds, and record "ASSIGN time to assignment"
+- IDLE_TRANSPORT: "poll" (default, IdleUser) or "websocket" for WebSocketIdleUser, which
+  holds an Action Cable connection instead of polling; WS_PROBE_INTERVAL sets how often
+  it times a message round trip over it
+
+Distributed mode: with `--processes N` or master/worker runs, the master leases
+disjoint username ranges to workers and serves a shared conversation/expert
+store on a Unix socket (`--shared-store-socket`), see loadtest/distributed.py.
 """
 
+import os
 import random
-import threading
-from datetime import datetime
-from locust import HttpUser, task, between, events
+import uuid
+from datetime import datetime, timezone
+from locust.runners import MasterRunner, WorkerRunner
+from locust import task, between, constant, events
 from locust import LoadTestShape
 import time
 
+import gevent
+
+from loadtest import open_loop
+from loadtest.analyze import write_csv
+from loadtest.backend_stats import fetch_cache_stats, write_cache_report
+from loadtest.benchmark import ConcurrencySweepShape, SweepPlan, endpoint_task_set, print_capacity_table, read_capacity
+from loadtest.request_costs import StepCostScraper, print_cost_summary
+from loadtest.cable import CableClient
+from loadtest.clients import harness_user_class
+from loadtest.distributed import setup_distributed
+from loadtest.metrics import MetricsRecorder, SampledFailureLog
+from loadtest.shared_store import DEFAULT_SOCKET_PATH
+from loadtest.token_pool import TokenPool
+from loadtest.trace import TraceRecorder
+from loadtest.warmup import refresh as refresh_record
+from loadtest.user_store import create_user_store
+
 
 # Configuration
 MAX_USERS = 10000
 CONVERSATION_TOPICS = ["Technical Support", "Account Help", "Billing Question", "Feature Request", "Bug Report"]
-DEBUG_MODE = True  # Set to False to reduce logging
+DEBUG_MODE = os.environ.get("DEBUG_MODE", "false") == "true"  # per-request stdout logging
+METRICS_PREFIX = os.environ.get("METRICS_PREFIX", f"log/loadtest/run-{datetime.now():%Y%m%d-%H%M%S}")
+FAILURES_LOGGED_PER_SECOND = int(os.environ.get("FAILURES_LOGGED_PER_SECOND", 5))
+USER_STORE_BACKEND = os.environ.get("USER_STORE_BACKEND", "indexed")  # "indexed" or "legacy"
+TOKEN_POOL_PATH = os.environ.get("TOKEN_POOL")  # JSONL written by `python -m loadtest.warmup`
+HTTP_CLIENT = os.environ.get("HTTP_CLIENT", "requests")  # "requests" (HttpUser) or "fast" (FastHttpUser)
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 1))  # connections per user (or per process with a shared pool)
+HTTP_SHARED_POOL = os.environ.get("HTTP_SHARED_POOL", "false") == "true"  # FastHttpUser only
+HTTP_KEEP_ALIVE = os.environ.get("HTTP_KEEP_ALIVE", "true") == "true"
+# Header the backend uses to recognise harness traffic (ApplicationController#detect_locust_request)
+LOCUST_REQUEST_HEADER = os.environ.get("LOCUST_REQUEST_HEADER", "X-Locust-Request")
+UPDATES_CURSOR_HEADER = "X-Updates-Cursor"  # UpdateCursors::CURSOR_HEADER in the backend
+# SQL statements the backend issued for the request (ApplicationController::QUERY_COUNT_HEADER)
+QUERY_COUNT_HEADER = "X-DB-Queries"
+# Message history is paged; this header carries the cursor of the previous page (MessagesController)
+MESSAGES_BEFORE_HEADER = "X-Messages-Before"
+MESSAGE_SCROLL_BACK_PROBABILITY = 0.2
+LOAD_SHAPE = os.environ.get("LOAD_SHAPE", "step")  # "step" (closed loop), "arrival" (open loop) or "none"
+SCENARIO = os.environ.get("SCENARIO", "mixed")  # "mixed" personas or a focused scenario such as "listing"
+LISTING_MAX_CONVERSATIONS = int(os.environ.get("LISTING_MAX_CONVERSATIONS", 512))  # history each listing user grows to
+UPDATES_MODE = os.environ.get("UPDATES_MODE", "split")  # "split", "combined" or "both"
+TRACK_ASSIGNMENT = os.environ.get("TRACK_ASSIGNMENT", "true") == "true"
+ASSIGNMENT_POLL_INTERVAL = float(os.environ.get("ASSIGNMENT_POLL_INTERVAL", 0.5))
+ASSIGNMENT_TIMEOUT = 60  # seconds before an unfinished assignment counts as a failure
+IDLE_TRANSPORT = os.environ.get("IDLE_TRANSPORT", "poll")  # "poll" (IdleUser) or "websocket" (WebSocketIdleUser)
+WS_PROBE_INTERVAL = float(os.environ.get("WS_PROBE_INTERVAL", 30))  # seconds between delivery probes
+WS_PROBE_TIMEOUT = 30  # seconds before an undelivered probe counts as a failure
+TRACE_RECORD = os.environ.get("TRACE_RECORD")  # gzip JSONL trace of every request, see loadtest/trace.py
+INGEST_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", 20))  # messages per POST /messages/batch
+INGEST_CONVERSATIONS = 3  # conversations each ingest user spreads its messages over
+SWEEP_LEVELS = [int(users) for users in os.environ.get("SWEEP_LEVELS", "1,4,16,64,256").split(",")]
+SWEEP_STEP_SECONDS = int(os.environ.get("SWEEP_STEP_SECONDS", 60))
 
 
-# Debug event listeners
-@events.request.add_listener
-def on_request(request_type, name, response_time, response_length, exception, **kwargs):
-    if DEBUG_MODE and exception:
-        print(f"REQUEST FAILED: {request_type} {name} - Exception: {exception}")
+metrics = MetricsRecorder(METRICS_PREFIX)
+trace_recorder = None
+sweep_plan = SweepPlan(levels=SWEEP_LEVELS, step_seconds=SWEEP_STEP_SECONDS)
+failure_log = SampledFailureLog(per_second=FAILURES_LOGGED_PER_SECOND)
 
 
-@events.request.add_listener  
-def on_request_success(request_type, name, response_time, response_length, **kwargs):
+def log_debug(message):
     if DEBUG_MODE:
-        print(f"REQUEST OK: {request_type} {name} - {response_time}ms")
+        print(message)
+
+
+@events.request.add_listener
+def on_request(request_type, name, response_time, response_length, exception, **kwargs):
+    metrics.record(request_type, name, response_time, exception)
+    response = kwargs.get("response")
+    if trace_recorder is not None and response is not None:
+        trace_recorder.record(name, response, response_time)
+    query_count = response is not None and response.headers.get(QUERY_COUNT_HEADER)
+    if query_count:
+        metrics.observe("DB", f"{name} [queries]", int(query_count))
+    intended_response_time = open_loop.corrected_response_time(response_time, kwargs.get("context"))
+    if intended_response_time is not None:
+        # Coordinated-omission corrected latency: measured from the scheduled start of the task
+        metrics.record(request_type, f"{name} [intended]", intended_response_time, exception)
+    if exception:
+        failure_log.log(f"REQUEST FAILED: {request_type} {name} - Exception: {exception}")
+    else:
+        log_debug(f"REQUEST OK: {request_type} {name} - {response_time}ms")
+
 
 class StepLoadShape(LoadTestShape):
+    # Locust runs the one non-abstract shape in this file, see LOAD_SHAPE
+    abstract = LOAD_SHAPE != "step"
+
     # dynamic arrival rate plan
     steps = [
         (60, 2),
@@ -80,59 +214,17 @@ class UserNameGenerator:
         return f"user_{(self.seed + self.current_index * self.prime_number) % self.max_users}"
 
 
-class UserStore:
-    """Thread-safe storage for user credentials and metadata."""
-    def __init__(self):
-        self.used_usernames = {}
-        self.expert_usernames = {}
-        self.conversations = {}
-        self.username_lock = threading.Lock()
-
-    def get_random_user(self):
-        with self.username_lock:
-            if not self.used_usernames:
-                return None
-            random_username = random.choice(list(self.used_usernames.keys()))
-            return self.used_usernames[random_username]
-
-    def get_random_expert(self):
-        with self.username_lock:
-            if not self.expert_usernames:
-                return None
-            random_username = random.choice(list(self.expert_usernames.keys()))
-            return self.expert_usernames[random_username]
-
-    def store_user(self, username, auth_token, user_id, is_expert=False):
-        with self.username_lock:
-            user_data = {
-                "username": username,
-                "auth_token": auth_token,
-                "user_id": user_id,
-                "is_expert": is_expert
-            }
-            self.used_usernames[username] = user_data
-            if is_expert:
-                self.expert_usernames[username] = user_data
-            return user_data
-
-    def store_conversation(self, conversation_id, user_id, expert_id=None):
-        with self.username_lock:
-            self.conversations[conversation_id] = {
-                "id": conversation_id,
-                "user_id": user_id,
-                "expert_id": expert_id,
-                "message_count": 0
-            }
-            return self.conversations[conversation_id]
-
-    def get_random_conversation(self, user_id=None):
-        with self.username_lock:
-            if not self.conversations:
-                return None
-            if user_id:
-                user_convos = [c for c in self.conversations.values() if c["user_id"] == user_id]
-                return random.choice(user_convos) if user_convos else None
-            return random.choice(list(self.conversations.values()))
+# Base class for every persona: HttpUser or FastHttpUser depending on HTTP_CLIENT
+HarnessUser = harness_user_class(
+    HTTP_CLIENT,
+    pool_size=HTTP_POOL_SIZE,
+    keep_alive=HTTP_KEEP_ALIVE,
+    shared_pool=HTTP_SHARED_POOL,
+    default_headers={LOCUST_REQUEST_HEADER: "1"},
+)
+if LOAD_SHAPE == "arrival":
+    # Tag requests with the schedule lag of the task that made them
+    HarnessUser.context = open_loop.lag_context
 
 
 def auth_headers(token):
@@ -140,9 +232,146 @@ def auth_headers(token):
     return {"Authorization": f"Bearer {token}"}
 
 
-# Global shared instances
-user_store = UserStore()
+def parse_timestamp(value):
+    """Epoch seconds of a backend ISO 8601 timestamp."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+# Global shared instances (replaced per worker in distributed mode, see on_locust_init)
+user_store = create_user_store(USER_STORE_BACKEND)
 user_name_generator = UserNameGenerator(max_users=MAX_USERS)
+token_pool = TokenPool(TOKEN_POOL_PATH) if TOKEN_POOL_PATH else None
+
+
+@events.init_command_line_parser.add_listener
+def on_init_command_line_parser(parser):
+    parser.add_argument(
+        "--shared-store-socket",
+        default=DEFAULT_SOCKET_PATH,
+        help="Unix socket of the shared store the master serves to workers in distributed mode",
+    )
+
+
+@events.init.add_listener
+def on_locust_init(environment, **kwargs):
+    global user_store, user_name_generator
+    socket_path = getattr(environment.parsed_options, "shared_store_socket", DEFAULT_SOCKET_PATH)
+    if environment.parsed_options:
+        options = environment.parsed_options
+        sweep_plan.select(getattr(options, "tags", None), getattr(options, "exclude_tags", None))
+        SweepLoadShape.steps = sweep_plan.steps()
+    worker_state = setup_distributed(environment, MAX_USERS, socket_path)
+    if worker_state:
+        user_store, user_name_generator = worker_state
+        # Each worker writes its own metrics files (and trace)
+        metrics.prefix = f"{METRICS_PREFIX}-worker{os.getpid()}"
+
+
+cache_stats_at_start = None
+cost_scraper = None
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    global cache_stats_at_start, cost_scraper
+    shape = {"step": StepLoadShape, "arrival": ArrivalLoadShape, "sweep": SweepLoadShape}.get(LOAD_SHAPE)
+    step_durations = [duration for duration, _ in shape.steps] if shape else []
+    # One scrape per run: the master, or the only process in a local run
+    if not isinstance(environment.runner, WorkerRunner) and environment.host:
+        cache_stats_at_start = fetch_cache_stats(environment.host)
+        cost_scraper = StepCostScraper(environment.host, f"{METRICS_PREFIX}_costs.csv", step_durations)
+        cost_scraper.start()
+    # The master runs no users, so it has nothing to record
+    if not isinstance(environment.runner, MasterRunner):
+        if token_pool and environment.host:
+            renew_token_pool(environment.host.rstrip("/"))
+        metrics.start(step_durations=step_durations)
+        start_trace_recording(environment)
+        sweep_plan.start(metrics.run_started_at)
+
+
+def renew_token_pool(host):
+    """Renew expired pool tokens before users spawn, with plain requests so they are not persona traffic."""
+    def renew(record):
+        # On a copy: refresh() updates a record in place, TokenPool.update_token does it under the lock
+        renewed = refresh_record(host, dict(record), token_pool.refresh_margin)
+        return None if token_pool.needs_refresh(renewed) else renewed["token"]
+
+    started = time.time()
+    renewed = token_pool.renew_stale(renew)
+    if renewed:
+        print(f"Renewed {renewed} token pool records in {time.time() - started:.1f}s")
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    global cost_scraper
+    if not isinstance(environment.runner, MasterRunner):
+        metrics.stop()
+        if SCENARIO == "benchmark" and metrics.prefix:
+            report_capacity()
+        if trace_recorder is not None:
+            trace_recorder.stop()
+            print(f"Recorded {trace_recorder.written} trace lines to {trace_recorder.path}")
+    if not isinstance(environment.runner, WorkerRunner) and environment.host:
+        report_cache_stats(environment.host)
+    if cost_scraper is not None:
+        print_cost_summary(cost_scraper.stop())
+        cost_scraper = None
+
+
+def start_trace_recording(environment):
+    global trace_recorder
+    if not TRACE_RECORD:
+        return
+    path = TRACE_RECORD
+    if isinstance(environment.runner, WorkerRunner):
+        base, _, extension = TRACE_RECORD.partition(".")
+        path = f"{base}-worker{os.getpid()}.{extension}" if extension else f"{base}-worker{os.getpid()}"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    trace_recorder = TraceRecorder(path, credentials=token_pool.records if token_pool else None)
+    trace_recorder.start()
+
+
+def report_capacity():
+    """Print and save this process's per-endpoint capacity table (loadtest/benchmark.py)."""
+    sweep_plan.save(f"{metrics.prefix}_sweep.json")
+    rows = read_capacity([metrics.prefix], sweep_plan)
+    write_csv(f"{metrics.prefix}_capacity.csv", rows)
+    print_capacity_table(rows)
+
+
+def report_cache_stats(host):
+    cache_stats = fetch_cache_stats(host)
+    if cache_stats is None:
+        return
+    os.makedirs(os.path.dirname(METRICS_PREFIX) or ".", exist_ok=True)
+    delta = write_cache_report(f"{METRICS_PREFIX}_caches.json", cache_stats_at_start, cache_stats)
+    llm = delta.get("llm")
+    if llm:
+        print(
+            f"LLM cache (pid {llm['pid']}): hit rate {llm['hitRate']:.1%}, {llm['misses']} model calls, "
+            f"{llm['savedMs'] / 1000:.1f}s of LLM wait eliminated"
+        )
+    auth = delta.get("auth")
+    if auth:
+        print(
+            f"Auth cache (pid {auth['pid']}): hit rate {auth['hitRate']:.1%}, "
+            f"{auth['tokenMisses']} token verifications, {auth['identityMisses']} user lookups"
+        )
+    fragments = delta.get("fragments")
+    if fragments:
+        print(
+            f"Fragment cache (pid {fragments['pid']}): hit rate {fragments['hitRate']:.1%}, "
+            f"{fragments['misses']} records serialized"
+        )
+
+
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+    # Persist tokens refreshed during the run so the next run starts warm
+    if token_pool:
+        token_pool.save()
 
 
 class ChatBackend:
@@ -151,7 +380,7 @@ class ChatBackend:
     Provides common authentication and API interaction methods.
     """
     
-    def login(self, username, password):
+    def login(self, username, password, name="/auth/login"):
         """Login an existing user."""
         try:
             with self.client.post(
@@ -162,7 +391,7 @@ class ChatBackend:
                         "password": password
                     }
                 },
-                name="/auth/login",
+                name=name,
                 catch_response=True
             ) as response:
                 if response.status_code == 200:
@@ -172,8 +401,7 @@ class ChatBackend:
                     user_id = user_data.get("id")
                     
                     if not token or not user_id:
-                        print(f"Login response missing token or user_id for {username}")
-                        print(f"Response: {response.text[:300]}")
+                        failure_log.log(f"Login response missing token or user_id for {username}\nResponse: {response.text[:300]}")
                         response.failure("Missing token or user_id")
                         return None
                     
@@ -188,12 +416,10 @@ class ChatBackend:
                     # User doesn't exist yet, this is expected
                     response.failure(f"Login failed (expected for new users): {response.status_code}")
         except Exception as e:
-            print(f"Login exception for {username}: {e}")
-            import traceback
-            traceback.print_exc()
+            failure_log.exception(f"Login exception for {username}: {e}")
         return None
         
-    def register(self, username, password, is_expert=False):
+    def register(self, username, password, is_expert=False, name="/auth/register"):
         """Register a new user."""
         try:
             with self.client.post(
@@ -205,7 +431,7 @@ class ChatBackend:
                         "password_confirmation": password
                     }
                 },
-                name="/auth/register",
+                name=name,
                 catch_response=True
             ) as response:
                 if response.status_code == 201 or response.status_code == 200:
@@ -216,8 +442,7 @@ class ChatBackend:
                         user_id = user_data.get("id")
                         
                         if not token or not user_id:
-                            print(f"Registration response missing token or user_id for {username}")
-                            print(f"Response: {response.text[:300]}")
+                            failure_log.log(f"Registration response missing token or user_id for {username}\nResponse: {response.text[:300]}")
                             response.failure("Missing token or user_id")
                             return None
                         
@@ -229,64 +454,128 @@ class ChatBackend:
                             is_expert
                         )
                     except Exception as e:
-                        print(f"Registration response parsing failed for {username}: {e}")
-                        print(f"Response text: {response.text[:500]}")
+                        failure_log.log(f"Registration response parsing failed for {username}: {e}\nResponse text: {response.text[:500]}")
                         response.failure(f"Failed to parse registration response")
                 else:
-                    print(f"Registration failed for {username}: {response.status_code}")
-                    print(f"Response body: {response.text[:500]}")
+                    failure_log.log(f"Registration failed for {username}: {response.status_code}\nResponse body: {response.text[:500]}")
                     response.failure(f"Registration failed: {response.status_code}")
         except Exception as e:
-            print(f"Registration exception for {username}: {e}")
-            import traceback
-            traceback.print_exc()
+            failure_log.exception(f"Registration exception for {username}: {e}")
         return None
 
+    def login_or_register(self, username, password, is_expert=False):
+        """Login, registering the user first if they do not exist yet."""
+        return self.login(username, password) or self.register(username, password, is_expert)
+
+    def pooled_user(self, is_expert=False):
+        """Take pre-provisioned credentials from the token pool, refreshing the token if it is near expiry."""
+        if token_pool is None:
+            return None
+        record = token_pool.acquire(is_expert)
+        if record is None:
+            return None
+
+        if token_pool.needs_refresh(record):
+            with self.client.post(
+                "/auth/refresh",
+                headers=auth_headers(record["token"]),
+                name="/auth/refresh [token pool]",
+                catch_response=True
+            ) as response:
+                refreshed = response.status_code == 200
+                if refreshed:
+                    token_pool.update_token(record, response.json().get("token"))
+                elif response.status_code == 401:
+                    # Expected for a token that already expired, not a backend failure
+                    response.success()
+            if not refreshed:
+                # Expired tokens cannot be refreshed; fall back to a regular login
+                user = self.login(record["username"], record["password"])
+                if user:
+                    token_pool.update_token(record, user.get("auth_token"))
+                return user
+
+        return user_store.store_user(
+            record["username"],
+            record["token"],
+            record["user_id"],
+            record.get("is_expert", False)
+        )
+
+    def poll_updates(self, user, path, params=None):
+        """
+        Poll an /api/*/updates endpoint for what changed since the previous poll.
+        Sends back the server's cursor and ETag, so an unchanged poll is a 304; `since`
+        is only used until the first cursor arrives.
+        """
+        if not hasattr(self, 'update_cursors'):
+            self.update_cursors = {}
+        params = dict(params or {})
+        headers = auth_headers(user.get("auth_token"))
+
+        cursor, etag = self.update_cursors.get(path, (None, None))
+        if cursor:
+            params["cursor"] = cursor
+            if etag:
+                headers["If-None-Match"] = etag
+        elif getattr(self, 'last_check_time', None):
+            params["since"] = self.last_check_time.isoformat()
+
+        response = self.client.get(path, params=params, headers=headers, name=path)
+        if response.status_code == 200:
+            self.update_cursors[path] = (response.headers.get(UPDATES_CURSOR_HEADER), response.headers.get("ETag"))
+
+        return response.status_code in (200, 304)
+
     def check_conversation_updates(self, user):
         """Check for conversation updates."""
-        params = {"userId": user.get("user_id")}
-        if hasattr(self, 'last_check_time') and self.last_check_time:
-            params["since"] = self.last_check_time.isoformat()
-        
-        response = self.client.get(
-            "/api/conversations/updates",
-            params=params,
-            headers=auth_headers(user.get("auth_token")),
-            name="/api/conversations/updates"
-        )
-        
-        return response.status_code == 200
+        return self.poll_updates(user, "/api/conversations/updates", {"userId": user.get("user_id")})
     
     def check_message_updates(self, user):
         """Check for new messages in user's conversations."""
-        params = {"userId": user.get("user_id")}
-        if hasattr(self, 'last_check_time') and self.last_check_time:
-            params["since"] = self.last_check_time.isoformat()
-        
-        response = self.client.get(
-            "/api/messages/updates",
-            params=params,
-            headers=auth_headers(user.get("auth_token")),
-            name="/api/messages/updates"
-        )
-        
-        return response.status_code == 200
+        return self.poll_updates(user, "/api/messages/updates", {"userId": user.get("user_id")})
     
     def check_expert_queue_updates(self, user):
         """Check for updates in expert queue."""
         if not user.get("is_expert"):
             return True  # Skip for non-experts
             
-        response = self.client.get(
-            "/api/expert-queue/updates",
-            headers=auth_headers(user.get("auth_token")),
-            name="/api/expert-queue/updates"
+        return self.poll_updates(user, "/api/expert-queue/updates")
+
+    def check_all_updates(self, user):
+        """Check every update feed in a single GET /api/updates round trip."""
+        return self.poll_updates(user, "/api/updates")
+
+    def poll_update_cycle(self, user):
+        """
+        One full update poll, through the split or the combined endpoint per UPDATES_MODE.
+        The whole cycle is recorded as "POLL updates cycle [<mode>]" so both paths can be compared.
+        """
+        if not hasattr(self, 'updates_mode'):
+            self.updates_mode = random.choice(("split", "combined")) if UPDATES_MODE == "both" else UPDATES_MODE
+
+        started = time.perf_counter()
+        if self.updates_mode == "combined":
+            ok = self.check_all_updates(user)
+        else:
+            ok = all([
+                self.check_conversation_updates(user),
+                self.check_message_updates(user),
+                self.check_expert_queue_updates(user),
+            ])
+        self.environment.events.request.fire(
+            request_type="POLL",
+            name=f"updates cycle [{self.updates_mode}]",
+            response_time=(time.perf_counter() - started) * 1000,
+            response_length=0,
+            exception=None if ok else Exception("update poll failed"),
+            context=self.context(),
         )
-        
-        return response.status_code == 200
+        return ok
 
-    def create_conversation(self, user, topic=None):
+    def create_conversation(self, user, topic=None, name="/conversations", track_assignment=TRACK_ASSIGNMENT):
         """Create a new conversation."""
+        started = time.time()
         response = self.client.post(
             "/conversations",
             json={
@@ -294,136 +583,305 @@ class ChatBackend:
                 "status": "waiting"
             },
             headers=auth_headers(user.get("auth_token")),
-            name="/conversations"
+            name=name
         )
         
         if response.status_code == 201:
             data = response.json()
+            if track_assignment:
+                if data.get("assignedExpertId") or not data.get("assignmentPending"):
+                    # Assigned inline (AUTO_ASSIGN_SYNCHRONOUS=true on the backend)
+                    self.record_assignment(started, data)
+                else:
+                    gevent.spawn(self.track_assignment, user, data.get("id"), started)
             # Response is the conversation object directly (not nested under 'conversation')
             return user_store.store_conversation(
                 data.get("id"),
                 user.get("user_id")
             )
         else:
-            if DEBUG_MODE:
-                print(f"Conversation creation failed: {response.status_code}")
-                print(f"Response: {response.text[:200]}")
+            failure_log.log(f"Conversation creation failed: {response.status_code}\nResponse: {response.text[:200]}")
         return None
 
-    def send_message(self, user, conversation_id, message_text):
+    def track_assignment(self, user, conversation_id, started):
+        """Poll a new conversation until its background auto-assignment has finished."""
+        while time.time() - started < ASSIGNMENT_TIMEOUT:
+            gevent.sleep(ASSIGNMENT_POLL_INTERVAL)
+            response = self.client.get(
+                f"/conversations/{conversation_id}",
+                headers=auth_headers(user.get("auth_token")),
+                name="/conversations/:id [assignment poll]"
+            )
+            if response.status_code == 200:
+                data = response.json()
+                if data.get("assignedExpertId") or not data.get("assignmentPending"):
+                    self.record_assignment(started, data)
+                    return
+        self.fire_assignment_event("time to assignment", started, Exception("assignment did not finish"))
+
+    def record_assignment(self, started, conversation):
+        """Record create-to-assignment time; runs that found no expert are recorded separately."""
+        name = "time to assignment" if conversation.get("assignedExpertId") else "time to assignment [no expert]"
+        self.fire_assignment_event(name, started)
+
+    def fire_assignment_event(self, name, started, exception=None):
+        self.environment.events.request.fire(
+            request_type="ASSIGN",
+            name=name,
+            response_time=(time.time() - started) * 1000,
+            response_length=0,
+            exception=exception,
+            context=self.context(),
+        )
+
+    def send_message(self, user, conversation_id, message_text, name="/messages"):
         """Send a message to a conversation."""
         response = self.client.post(
             "/messages",
             json={
                 "conversation_id": conversation_id,
-                "user_id": user.get("user_id"),
-                "message": message_text
+                "content": message_text
             },
             headers=auth_headers(user.get("auth_token")),
-            name="/messages"
+            name=name
         )
         
         return response.status_code == 201
 
     def get_conversation_messages(self, user, conversation_id):
-        """Retrieve messages from a conversation."""
+        """Retrieve the latest page of a conversation's messages, sometimes scrolling back one page."""
         response = self.client.get(
             f"/conversations/{conversation_id}/messages",
             headers=auth_headers(user.get("auth_token")),
             name="/conversations/:id/messages"
         )
+        before = response.headers.get(MESSAGES_BEFORE_HEADER)
+        if response.status_code == 200 and before and random.random() < MESSAGE_SCROLL_BACK_PROBABILITY:
+            self.client.get(
+                f"/conversations/{conversation_id}/messages",
+                params={"before": before},
+                headers=auth_headers(user.get("auth_token")),
+                name="/conversations/:id/messages [scroll back]"
+            )
         
         return response.status_code == 200
 
-    def list_conversations(self, user):
+    def list_conversations(self, user, name="/conversations"):
         """List user's conversations."""
         response = self.client.get(
             "/conversations",
             params={"userId": user.get("user_id")},
             headers=auth_headers(user.get("auth_token")),
-            name="/conversations"
+            name=name
         )
         
         if response.status_code == 200:
             # Rails returns array directly, not nested under 'conversations'
             conversations = response.json()
-            if isinstance(conversations, list):
-                return conversations
-            else:
+            if not isinstance(conversations, list):
                 # Fallback if format is different
-                return conversations.get("conversations", [])
+                conversations = conversations.get("conversations", [])
+            self.record_summary_staleness(conversations)
+            return conversations
         return []
 
+    def record_summary_staleness(self, conversations):
+        """
+        Observe "SUMMARY staleness [ms]" for every listed conversation that has a summary:
+        how long its newest message has gone unsummarized, 0 when the summary covers it.
+        Compares backend timestamps with this machine's clock, like the /cable lag.
+        """
+        now = time.time()
+        for conversation in conversations:
+            covered = conversation.get("summaryLastMessageAt")
+            last_message = conversation.get("lastMessageAt")
+            if not covered or not last_message:
+                continue
+            last_message_at = parse_timestamp(last_message)
+            staleness = max(0.0, now - last_message_at) if last_message_at > parse_timestamp(covered) else 0.0
+            metrics.observe("SUMMARY", "staleness [ms]", staleness * 1000)
+
 
-class IdleUser(HttpUser, ChatBackend):
+class IdleUser(HarnessUser, ChatBackend):
     """
     Persona: A user that logs in and is idle but their browser polls for updates.
     Checks for message updates, conversation updates, and expert queue updates every 5 seconds.
     Weight: 10% of users
     """
+    abstract = SCENARIO != "mixed" or IDLE_TRANSPORT == "websocket"  # see WebSocketIdleUser
     weight = 10
     wait_time = between(5, 5)  # Check every 5 seconds
 
     def on_start(self):
         """Called when a simulated user starts."""
         self.last_check_time = None
+        self.user = self.pooled_user()
+        if self.user:
+            return
+
         username = user_name_generator.generate_username()
         password = username
         
         # Try to login first (user might already exist from previous test runs)
         try:
-            self.user = self.login(username, password)
-            if not self.user:
-                # User doesn't exist, register them
-                self.user = self.register(username, password)
+            self.user = self.login_or_register(username, password)
             
             if not self.user:
-                print(f"FAILED: Could not login or register user {username}")
-                print(f"Check your backend server at the host URL")
+                failure_log.log(f"FAILED: Could not login or register user {username}\nCheck your backend server at the host URL")
                 self.environment.runner.quit()
                 return
             
-            print(f"SUCCESS: IdleUser {username} ready (ID: {self.user.get('user_id')}, Token: {self.user.get('auth_token')[:20] if self.user.get('auth_token') else 'None'}...)")
+            log_debug(f"SUCCESS: IdleUser {username} ready (ID: {self.user.get('user_id')}, Token: {self.user.get('auth_token')[:20] if self.user.get('auth_token') else 'None'}...)")
         except Exception as e:
-            print(f"ERROR in on_start for {username}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            failure_log.exception(f"ERROR in on_start for {username}: {str(e)}")
             self.environment.runner.quit()
 
     @task
     def poll_for_updates(self):
         """Poll for all types of updates."""
         try:
-            self.check_conversation_updates(self.user)
-            self.check_message_updates(self.user)
-            self.check_expert_queue_updates(self.user)
-            self.last_check_time = datetime.utcnow()
+            self.poll_update_cycle(self.user)
+            self.last_check_time = datetime.now(timezone.utc)
+        except Exception as e:
+            failure_log.exception(f"ERROR in poll_for_updates: {e}")
+
+
+class WebSocketIdleUser(HarnessUser, ChatBackend):
+    """
+    Persona: IdleUser whose browser holds an Action Cable connection instead of polling.
+    Receives conversation, message and expert queue pushes on UpdatesChannel and records their
+    delivery latency (server sentAt to receipt) as "WS /cable <type>". Every WS_PROBE_INTERVAL
+    seconds it posts to its own conversation and records the end-to-end time until that message
+    is pushed back as "WS /cable message [end-to-end]", which needs no clock agreement.
+    Selected instead of IdleUser with IDLE_TRANSPORT=websocket.
+    Weight: 10% of users
+    """
+    abstract = SCENARIO != "mixed" or IDLE_TRANSPORT != "websocket"
+    weight = 10
+    wait_time = between(WS_PROBE_INTERVAL, WS_PROBE_INTERVAL)
+
+    def on_start(self):
+        """Authenticate like IdleUser, then open the cable."""
+        self.cable = None
+        self.conversation = None
+        self.pending_probes = {}
+        self.user = self.pooled_user()
+        if not self.user:
+            username = user_name_generator.generate_username()
+            self.user = self.login_or_register(username, username)
+
+        if not self.user:
+            failure_log.log("FAILED: WebSocketIdleUser could not login or register\nCheck your backend server at the host URL")
+            self.environment.runner.quit()
+            return
+
+        self.connect_cable()
+
+    def on_stop(self):
+        if self.cable:
+            self.cable.close()
+            self.cable = None
+
+    def fire_ws_event(self, name, response_time, response_length=0, exception=None):
+        self.environment.events.request.fire(
+            request_type="WS",
+            name=name,
+            response_time=response_time,
+            response_length=response_length,
+            exception=exception,
+            context=self.context(),
+        )
+
+    def connect_cable(self):
+        started = time.perf_counter()
+        cable = CableClient(
+            self.host,
+            self.user.get("auth_token"),
+            on_message=self.on_push,
+            on_close=self.on_cable_closed,
+            headers={LOCUST_REQUEST_HEADER: "1"},
+        )
+        try:
+            cable.connect()
+            self.cable = cable
+            exception = None
         except Exception as e:
-            print(f"ERROR in poll_for_updates: {e}")
-            import traceback
-            traceback.print_exc()
+            failure_log.log(f"WebSocket connect failed for {self.user.get('username')}: {e}")
+            exception = e
+        self.fire_ws_event("/cable [connect]", (time.perf_counter() - started) * 1000, exception=exception)
+
+    def on_cable_closed(self, error):
+        self.cable = None
+        self.fire_ws_event("/cable [disconnect]", 0, exception=error or Exception("closed by server"))
+
+    def on_push(self, message, length):
+        now = time.time()
+        kind = message.get("type", "unknown")
+        sent_at = message.get("sentAt")
+        if sent_at:
+            sent = parse_timestamp(sent_at)
+            self.fire_ws_event(f"/cable {kind}", max(0.0, now - sent) * 1000, length)
+
+        if kind == "message":
+            probe_started = self.pending_probes.pop(message.get("data", {}).get("content"), None)
+            if probe_started is not None:
+                self.fire_ws_event("/cable message [end-to-end]", (now - probe_started) * 1000, length)
+
+    @task
+    def probe_delivery(self):
+        """Post a uniquely tagged message to our own conversation; on_push times its arrival."""
+        if self.cable is None:
+            self.connect_cable()
+            return
+
+        now = time.time()
+        for content, started in list(self.pending_probes.items()):
+            if now - started > WS_PROBE_TIMEOUT:
+                del self.pending_probes[content]
+                self.fire_ws_event("/cable message [end-to-end]", (now - started) * 1000,
+                                   exception=Exception("probe not delivered"))
+
+        if self.conversation is None:
+            self.conversation = self.create_conversation(self.user)
+            if not self.conversation:
+                return
+
+        content = f"probe {uuid.uuid4().hex}"
+        self.pending_probes[content] = time.time()
+        response = self.client.post(
+            "/messages",
+            json={"conversation_id": self.conversation.get("id"), "content": content},
+            headers=auth_headers(self.user.get("auth_token")),
+            name="/messages [ws probe]"
+        )
+        if response.status_code != 201:
+            self.pending_probes.pop(content, None)
 
 
-class ActiveUser(HttpUser, ChatBackend):
+class ActiveUser(HarnessUser, ChatBackend):
     """
     Persona: An active user who creates conversations, sends messages, and browses.
     Simulates realistic user behavior with varied actions.
     Weight: 70% of users
     """
+    abstract = SCENARIO != "mixed"
     weight = 70
     wait_time = between(2, 10)  # Variable wait time for realistic behavior
 
     def on_start(self):
         """Called when a simulated user starts."""
         self.last_check_time = None
+        self.my_conversations = []
+        self.user = self.pooled_user()
+        if self.user:
+            return
+
         username = user_name_generator.generate_username()
         password = username
         
         try:
             # Check if user already exists in our store (from previous spawns)
-            existing_user = None
-            with user_store.username_lock:
-                existing_user = user_store.used_usernames.get(username)
+            existing_user = user_store.get_user(username)
             
             if existing_user:
                 # User was already registered by another instance, try login
@@ -440,16 +898,14 @@ class ActiveUser(HttpUser, ChatBackend):
                     self.user = self.login(username, password)
             
             if not self.user:
-                print(f"FAILED: ActiveUser {username} could not authenticate")
+                failure_log.log(f"FAILED: ActiveUser {username} could not authenticate")
                 self.environment.runner.quit()
                 return
                 
             self.my_conversations = []
-            print(f"SUCCESS: ActiveUser {username} ready")
+            log_debug(f"SUCCESS: ActiveUser {username} ready")
         except Exception as e:
-            print(f"ERROR in ActiveUser.on_start for {username}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            failure_log.exception(f"ERROR in ActiveUser.on_start for {username}: {str(e)}")
             self.environment.runner.quit()
 
     @task(5)
@@ -458,7 +914,7 @@ class ActiveUser(HttpUser, ChatBackend):
         try:
             self.my_conversations = self.list_conversations(self.user)
         except Exception as e:
-            print(f"ERROR in browse_conversations: {e}")
+            failure_log.log(f"ERROR in browse_conversations: {e}")
 
     @task(3)
     def create_new_conversation(self):
@@ -468,7 +924,7 @@ class ActiveUser(HttpUser, ChatBackend):
             if conversation:
                 self.my_conversations.append(conversation)
         except Exception as e:
-            print(f"ERROR in create_new_conversation: {e}")
+            failure_log.log(f"ERROR in create_new_conversation: {e}")
 
     @task(10)
     def send_message_to_conversation(self):
@@ -494,7 +950,7 @@ class ActiveUser(HttpUser, ChatBackend):
                 # No conversations available, create one first
                 self.create_new_conversation()
         except Exception as e:
-            print(f"ERROR in send_message_to_conversation: {e}")
+            failure_log.log(f"ERROR in send_message_to_conversation: {e}")
 
     @task(7)
     def read_messages(self):
@@ -511,29 +967,33 @@ class ActiveUser(HttpUser, ChatBackend):
         """Periodically check for updates."""
         self.check_conversation_updates(self.user)
         self.check_message_updates(self.user)
-        self.last_check_time = datetime.utcnow()
+        self.last_check_time = datetime.now(timezone.utc)
 
 
-class ExpertUser(HttpUser, ChatBackend):
+class ExpertUser(HarnessUser, ChatBackend):
     """
     Persona: An expert who responds to user messages and manages their queue.
     Simulates expert behavior including queue management and response patterns.
     Weight: 15% of users
     """
+    abstract = SCENARIO != "mixed"
     weight = 15
     wait_time = between(3, 8)  # Experts respond relatively quickly
 
     def on_start(self):
         """Called when a simulated expert starts."""
         self.last_check_time = None
+        self.assigned_conversations = []
+        self.user = self.pooled_user(is_expert=True)
+        if self.user:
+            return
+
         username = f"expert_{user_name_generator.generate_username()}"
         password = username
         
         try:
             # Check if expert already exists in our store
-            existing_user = None
-            with user_store.username_lock:
-                existing_user = user_store.used_usernames.get(username)
+            existing_user = user_store.get_user(username)
             
             if existing_user:
                 # Expert was already registered, try login
@@ -550,16 +1010,14 @@ class ExpertUser(HttpUser, ChatBackend):
                     self.user = self.login(username, password)
             
             if not self.user:
-                print(f"FAILED: ExpertUser {username} could not authenticate")
+                failure_log.log(f"FAILED: ExpertUser {username} could not authenticate")
                 self.environment.runner.quit()
                 return
                 
             self.assigned_conversations = []
-            print(f"SUCCESS: ExpertUser {username} ready")
+            log_debug(f"SUCCESS: ExpertUser {username} ready")
         except Exception as e:
-            print(f"ERROR in ExpertUser.on_start for {username}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            failure_log.exception(f"ERROR in ExpertUser.on_start for {username}: {str(e)}")
             self.environment.runner.quit()
 
     @task(8)
@@ -584,26 +1042,47 @@ class ExpertUser(HttpUser, ChatBackend):
         
         if queue_response.status_code == 200:
             queue_data = queue_response.json()
-            conversations = queue_data.get("conversations", [])
+            conversations = queue_data.get("waitingConversations", [])
             
-            if conversations:
-                # Pick a random conversation to claim
-                conversation = random.choice(conversations)
-                conversation_id = conversation.get("id")
-                
-                response = self.client.post(
-                    f"/expert/conversations/{conversation_id}/claim",
-                    headers=auth_headers(self.user.get("auth_token")),
-                    name="/expert/conversations/:id/claim"
-                )
-                
+            if not conversations:
+                self.fire_claim_event("queue empty", 0)
+                return
+
+            # Pick a random conversation to claim
+            conversation = random.choice(conversations)
+            conversation_id = conversation.get("id")
+
+            started = time.time()
+            with self.client.post(
+                f"/expert/conversations/{conversation_id}/claim",
+                headers=auth_headers(self.user.get("auth_token")),
+                name="/expert/conversations/:id/claim",
+                catch_response=True
+            ) as response:
+                response_time = (time.time() - started) * 1000
                 if response.status_code == 200:
+                    self.fire_claim_event("won", response_time)
                     conv_data = user_store.store_conversation(
                         conversation_id,
-                        conversation.get("user_id"),
+                        conversation.get("questionerId"),
                         self.user.get("user_id")
                     )
                     self.assigned_conversations.append(conv_data)
+                elif response.status_code == 409:
+                    # Another expert claimed it first: contention, not an error
+                    response.success()
+                    self.fire_claim_event("lost race", response_time)
+
+    def fire_claim_event(self, outcome, response_time):
+        """Claim outcomes as "CLAIM won|lost race|queue empty"; won / (won + lost race) is the success rate."""
+        self.environment.events.request.fire(
+            request_type="CLAIM",
+            name=outcome,
+            response_time=response_time,
+            response_length=0,
+            exception=None,
+            context=self.context(),
+        )
 
     @task(10)
     def respond_to_message(self):
@@ -640,15 +1119,16 @@ class ExpertUser(HttpUser, ChatBackend):
         """Check for updates across all assigned conversations."""
         self.check_conversation_updates(self.user)
         self.check_message_updates(self.user)
-        self.last_check_time = datetime.utcnow()
+        self.last_check_time = datetime.now(timezone.utc)
 
 
-class NewUser(HttpUser, ChatBackend):
+class NewUser(HarnessUser, ChatBackend):
     """
     Persona: A brand new user registering and exploring the platform.
     Simulates onboarding flow and initial user actions.
     Weight: 5% of users
     """
+    abstract = SCENARIO != "mixed"
     weight = 5
     wait_time = between(1, 5)
 
@@ -661,14 +1141,12 @@ class NewUser(HttpUser, ChatBackend):
             # NewUser always registers directly (never tries to login first)
             self.user = self.register(self.username, self.password)
             if not self.user:
-                print(f"FAILED: NewUser {self.username} registration failed")
+                failure_log.log(f"FAILED: NewUser {self.username} registration failed")
                 self.environment.runner.quit()
                 return
-            print(f"SUCCESS: NewUser {self.username} registered")
+            log_debug(f"SUCCESS: NewUser {self.username} registered")
         except Exception as e:
-            print(f"ERROR in NewUser.on_start for {self.username}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            failure_log.exception(f"ERROR in NewUser.on_start for {self.username}: {str(e)}")
             self.environment.runner.quit()
 
     @task(1)
@@ -692,4 +1170,245 @@ class NewUser(HttpUser, ChatBackend):
             self.check_message_updates(self.user)
             
         # After onboarding, stop this user (they become regular users)
-        self.stop()
\ No newline at end of file
+        self.stop()
+
+
+class ConversationHistoryUser(HarnessUser, ChatBackend):
+    """
+    Scenario (SCENARIO=listing): /conversations latency against conversations per user.
+    Each user adds one conversation per task until it has LISTING_MAX_CONVERSATIONS, then
+    lists them. Listings are named "/conversations [history <=N]", N being the power of two
+    bounding the size of the user's previous listing, so the per-name p95 in the metrics
+    summary gives the latency curve over history size.
+    """
+    abstract = SCENARIO != "listing"
+    wait_time = between(1, 2)
+
+    def on_start(self):
+        self.history = 0
+        username = f"history_{user_name_generator.generate_username()}"
+        self.user = self.login_or_register(username, username)
+        if not self.user:
+            failure_log.log(f"FAILED: ConversationHistoryUser {username} could not authenticate")
+            self.environment.runner.quit()
+
+    @task
+    def grow_and_list(self):
+        if self.history < LISTING_MAX_CONVERSATIONS:
+            self.create_conversation(self.user)
+
+        bucket = 1 << max(self.history - 1, 0).bit_length()
+        conversations = self.list_conversations(self.user, name=f"/conversations [history <={bucket}]")
+        self.history = len(conversations)
+
+
+class LoginUser(HarnessUser, ChatBackend):
+    """
+    Scenario (SCENARIO=login): /auth/login throughput. Each user registers once in
+    on_start and then logs in with the same credentials every task, so the run
+    measures password verification and the presence write of a login.
+    """
+    abstract = SCENARIO != "login"
+    wait_time = between(0.5, 1.5)
+
+    def on_start(self):
+        self.username = f"login_{user_name_generator.generate_username()}"
+        if not self.login_or_register(self.username, self.username):
+            failure_log.log(f"FAILED: LoginUser {self.username} could not authenticate")
+            self.environment.runner.quit()
+
+    @task
+    def log_in(self):
+        self.login(self.username, self.username)
+
+
+class MessageIngestUser(HarnessUser, ChatBackend):
+    """
+    Scenario (SCENARIO=ingest): message write cost, one message per request against
+    INGEST_BATCH_SIZE per request. Each user opens INGEST_CONVERSATIONS conversations in
+    on_start, then every task sends either one POST /messages or one POST /messages/batch
+    spread over them. Besides the usual per-request rows, each path observes
+    "DB <name> [queries per message]" (MetricsRecorder.observe, so it is not counted as a
+    request) and counts "INGEST <name> [messages written]", which MetricsRecorder.count
+    reports per step as messages per second of wall-clock time.
+    """
+    abstract = SCENARIO != "ingest"
+    wait_time = between(0.5, 1.5)
+
+    def on_start(self):
+        username = f"ingest_{user_name_generator.generate_username()}"
+        self.user = self.login_or_register(username, username)
+        if not self.user:
+            failure_log.log(f"FAILED: MessageIngestUser {username} could not authenticate")
+            self.environment.runner.quit()
+            return
+        self.conversation_ids = [
+            conversation["id"]
+            for conversation in (self.create_conversation(self.user) for _ in range(INGEST_CONVERSATIONS))
+            if conversation
+        ]
+
+    def post_messages(self, path, payload, count):
+        response = self.client.post(path, json=payload, headers=auth_headers(self.user.get("auth_token")), name=path)
+        if response.status_code != 201:
+            return
+        metrics.count("INGEST", f"{path} [messages written]", count)
+        query_count = response.headers.get(QUERY_COUNT_HEADER)
+        if query_count:
+            metrics.observe("DB", f"{path} [queries per message]", int(query_count) / count)
+
+    @task
+    def send_one(self):
+        if self.conversation_ids:
+            self.post_messages("/messages", {
+                "conversation_id": random.choice(self.conversation_ids),
+                "content": random.choice(CONVERSATION_TOPICS),
+            }, 1)
+
+    @task
+    def send_batch(self):
+        if self.conversation_ids:
+            self.post_messages("/messages/batch", {"messages": [
+                {"conversationId": random.choice(self.conversation_ids), "content": random.choice(CONVERSATION_TOPICS)}
+                for _ in range(INGEST_BATCH_SIZE)
+            ]}, INGEST_BATCH_SIZE)
+
+
+class EndpointBenchmarkUser(HarnessUser, ChatBackend):
+    """
+    Scenario (SCENARIO=benchmark, with LOAD_SHAPE=sweep): per-endpoint capacity. Each
+    task set repeats one endpoint with no think time while the sweep is on it (see
+    loadtest/benchmark.py); --tags picks the endpoints. Every user logs in (or registers)
+    its own account once and opens one conversation for the message endpoints; requests
+    made only to set an endpoint up are named "... [benchmark setup]" so they stay out of
+    the endpoint's rows.
+    """
+    abstract = SCENARIO != "benchmark"
+    wait_time = constant(0)  # closed loop: the sweep level is the concurrency
+
+    setup_name = "[benchmark setup]"
+
+    def on_start(self):
+        self.last_check_time = None
+        self.username = f"bench_{user_name_generator.generate_username()}"
+        self.password = self.username
+        self.user = (self.login(self.username, self.password, name=f"/auth/login {self.setup_name}")
+                     or self.register(self.username, self.password, is_expert=True,
+                                      name=f"/auth/register {self.setup_name}"))
+        if not self.user:
+            failure_log.log(f"FAILED: EndpointBenchmarkUser {self.username} could not authenticate")
+            self.environment.runner.quit()
+            return
+        self.conversation = self.setup_conversation()
+        if self.conversation:
+            self.send_message(self.user, self.conversation["id"], "Benchmark conversation",
+                              name=f"/messages {self.setup_name}")
+
+    def setup_conversation(self):
+        return self.create_conversation(self.user, name=f"/conversations {self.setup_name}", track_assignment=False)
+
+    def benchmark_login(self):
+        self.login(self.username, self.password)
+
+    def benchmark_register(self):
+        username = f"bench_new_{uuid.uuid4().hex[:16]}"
+        self.register(username, username)
+
+    def benchmark_list_conversations(self):
+        self.list_conversations(self.user)
+
+    def benchmark_create_conversation(self):
+        self.create_conversation(self.user, track_assignment=False)
+
+    def benchmark_send_message(self):
+        if self.conversation:
+            self.send_message(self.user, self.conversation["id"], random.choice(CONVERSATION_TOPICS))
+
+    def benchmark_read_messages(self):
+        if self.conversation:
+            self.get_conversation_messages(self.user, self.conversation["id"])
+
+    def benchmark_conversation_updates(self):
+        self.check_conversation_updates(self.user)
+
+    def benchmark_message_updates(self):
+        self.check_message_updates(self.user)
+
+    def benchmark_expert_queue_updates(self):
+        # Logins do not report is_expert, so skip check_expert_queue_updates' check
+        self.poll_updates(self.user, "/api/expert-queue/updates")
+
+    def benchmark_updates(self):
+        self.check_all_updates(self.user)
+
+    def benchmark_expert_queue(self):
+        self.client.get("/expert/queue", headers=auth_headers(self.user.get("auth_token")), name="/expert/queue")
+
+    def benchmark_claim(self):
+        """Claim a conversation of our own; losing it to auto-assignment (409) is not a failure."""
+        conversation = self.setup_conversation()
+        if not conversation:
+            return
+        with self.client.post(
+            f"/expert/conversations/{conversation['id']}/claim",
+            headers=auth_headers(self.user.get("auth_token")),
+            name="/expert/conversations/:id/claim",
+            catch_response=True
+        ) as response:
+            if response.status_code == 409:
+                response.success()
+
+    tasks = [
+        endpoint_task_set(sweep_plan, endpoint, action)
+        for endpoint, action in {
+            "login": benchmark_login,
+            "register": benchmark_register,
+            "list_conversations": benchmark_list_conversations,
+            "create_conversation": benchmark_create_conversation,
+            "send_message": benchmark_send_message,
+            "read_messages": benchmark_read_messages,
+            "conversation_updates": benchmark_conversation_updates,
+            "message_updates": benchmark_message_updates,
+            "expert_queue_updates": benchmark_expert_queue_updates,
+            "updates": benchmark_updates,
+            "expert_queue": benchmark_expert_queue,
+            "claim": benchmark_claim,
+        }.items()
+    ]
+
+
+class SweepLoadShape(ConcurrencySweepShape):
+    # steps are set from sweep_plan once the --tags are known, see on_locust_init
+    abstract = LOAD_SHAPE != "sweep"
+
+
+# Open-loop plan: total persona task iterations per second for each 60s step, split by weight
+ARRIVAL_RATES = [10, 25, 50, 100, 200, 400, 800, 1600]
+PERSONAS = [
+    cls for cls in (IdleUser, WebSocketIdleUser, ActiveUser, ExpertUser, NewUser, ConversationHistoryUser, LoginUser,
+                MessageIngestUser, EndpointBenchmarkUser)
+    if not cls.abstract
+]
+arrival_schedules = {cls.__name__: open_loop.ArrivalSchedule(cls.__name__) for cls in PERSONAS}
+
+
+def pace_personas():
+    """Replace each persona's think time with pacing by its arrival schedule."""
+    for persona in PERSONAS:
+        persona.wait_time = open_loop.paced_by(arrival_schedules[persona.__name__])
+
+
+if LOAD_SHAPE == "arrival":
+    pace_personas()
+
+
+class ArrivalLoadShape(open_loop.ArrivalRateShape):
+    abstract = LOAD_SHAPE != "arrival"
+
+    steps = [
+        (60, open_loop.split_rate(rate, {cls.__name__: cls.weight for cls in PERSONAS}))
+        for rate in ARRIVAL_RATES
+    ]
+    schedules = arrival_schedules
+    user_classes = PERSONAS
+    max_users = MAX_USERS
@@ -0,0 +1,93 @@
+# frozen_string_literal: true
+
+# Benchmark: assignment prompt cost against expert count, every expert vs the BM25 shortlist.
+#
+# For each expert count, inserts that many users with expert profiles (inside a
+# transaction that is rolled back afterwards) and times the part of
+# AutoExpertAssignmentService#assign that scales with the expert table: picking
+# the candidates and building the user prompt. Prompt size is reported in
+# characters and approximate tokens, which is what the model's latency grows with.
+# The first shortlist timing includes building the index from the table.
+#
+# With ALLOW_BEDROCK_CALL=true and --llm it also times one real model call per
+# mode (bypassing LlmCache).
+#
+#   bin/rails runner script/benchmarks/expert_assignment.rb [--sizes 100,1000,10000] [--shortlist 20] [--repeat 5] [--llm]
+
+require "benchmark"
+require "optparse"
+
+options = { sizes: [100, 1_000, 10_000], shortlist: AutoExpertAssignmentService::SHORTLIST_SIZE.nonzero? || 20, repeat: 5, llm: false }
+OptionParser.new do |opts|
+  opts.on("--sizes LIST", Array) { |list| options[:sizes] = list.map(&:to_i) }
+  opts.on("--shortlist N", Integer) { |n| options[:shortlist] = n }
+  opts.on("--repeat N", Integer) { |n| options[:repeat] = n }
+  opts.on("--llm") { options[:llm] = true }
+end.parse!(ARGV)
+
+TOPICS = [
+  "MySQL replication and slow query tuning", "Kubernetes deployments and Helm charts",
+  "VPN and corporate network troubleshooting", "Password resets and account recovery",
+  "Billing, invoices and refunds", "iOS and Android app crashes", "Rails performance and caching",
+  "Printer and scanner drivers", "Email delivery and spam filtering", "Laptop hardware repairs"
+].freeze
+
+def insert_experts(count)
+  now = Time.current
+  digest = BCrypt::Password.create("password123", cost: BCrypt::Engine::MIN_COST)
+  prefix = SecureRandom.hex(4)
+  count.times.each_slice(1000) do |slice|
+    users = slice.map { |i| { username: "bench_#{prefix}_#{i}", password_digest: digest, created_at: now, updated_at: now } }
+    User.insert_all(users)
+    user_ids = User.where(username: users.map { |u| u[:username] }).pluck(:id)
+    ExpertProfile.insert_all(user_ids.each_with_index.map do |user_id, i|
+      { user_id: user_id, bio: "I help with #{TOPICS[i % TOPICS.size]}", created_at: now, updated_at: now }
+    end)
+  end
+end
+
+def median_ms(samples)
+  (samples.sort[samples.size / 2] * 1000).round(1)
+end
+
+def measure(service, repeat)
+  experts = prompt = nil
+  samples = Array.new(repeat) do
+    Benchmark.realtime do
+      experts = service.candidate_experts
+      prompt = service.send(:build_user_prompt, experts)
+    end
+  end
+  [samples, experts.size, prompt.size]
+end
+
+def time_llm_call(service)
+  experts = service.candidate_experts
+  client = BedrockClient.new(model_id: ENV["BEDROCK_MODEL_ID"] || "anthropic.claude-3-5-haiku-20241022-v1:0")
+  Benchmark.realtime do
+    client.send(:call_model, system_prompt: service.send(:build_system_prompt),
+                             user_prompt: service.send(:build_user_prompt, experts), max_tokens: 500, temperature: 0.3)
+  end
+end
+
+puts format("%-8s %-10s %10s %10s %12s %10s %10s", "experts", "mode", "first ms", "median ms", "candidates", "chars", "~tokens")
+options[:sizes].each do |size|
+  ActiveRecord::Base.transaction do
+    insert_experts(size)
+    initiator = User.create!(username: "bench_initiator_#{SecureRandom.hex(4)}", password: "password123")
+    conversation = Conversation.create!(title: "Replica is lagging and queries are slow", initiator: initiator, status: "waiting")
+
+    modes = { "all" => 0, "top #{options[:shortlist]}" => options[:shortlist] }
+    modes.each do |mode, shortlist_size|
+      service = AutoExpertAssignmentService.new(conversation, shortlist_size: shortlist_size,
+                                                              candidate_index: ExpertCandidateIndex.new)
+      samples, candidates, chars = measure(service, options[:repeat])
+      line = format("%-8d %-10s %10.1f %10.1f %12d %10d %10d", size, mode, samples.first * 1000,
+                    median_ms(samples.drop(1).presence || samples), candidates, chars, chars / 4)
+      line += format(" %10.0f ms LLM", time_llm_call(service) * 1000) if options[:llm] && ENV["ALLOW_BEDROCK_CALL"] == "true"
+      puts line
+    end
+
+    raise ActiveRecord::Rollback
+  end
+end
@@ -0,0 +1,90 @@
+# frozen_string_literal: true
+
+# Benchmark: GET /conversations/:id/messages latency against messages per conversation.
+#
+# For each size, creates one conversation with that many messages (inside a transaction
+# that is rolled back afterwards) and times:
+#
+# - tail:    the default request, the latest page, through the full Rails stack
+# - scroll:  a page from the middle of the history via the `before` cursor, likewise
+# - full:    the previous behaviour, every message loaded and serialized (the query and
+#            JSON only; skipped above --full-max messages)
+#
+#   bin/rails runner script/benchmarks/message_history.rb [--sizes 10,1000,100000] [--repeat 50] [--full-max 100000]
+
+require "benchmark"
+require "optparse"
+
+options = { sizes: [10, 1_000, 100_000], repeat: 50, full_max: 100_000 }
+OptionParser.new do |opts|
+  opts.on("--sizes LIST", Array) { |list| options[:sizes] = list.map(&:to_i) }
+  opts.on("--repeat N", Integer) { |n| options[:repeat] = n }
+  opts.on("--full-max N", Integer) { |n| options[:full_max] = n }
+end.parse!(ARGV)
+
+INSERT_BATCH = 10_000
+
+def insert_messages(conversation, user, count)
+  start = Time.current - count.seconds
+  count.times.each_slice(INSERT_BATCH) do |slice|
+    Message.insert_all(slice.map do |i|
+      { conversation_id: conversation.id, sender_id: user.id, sender_role: "initiator", content: "Message #{i}",
+        is_read: false, created_at: start + i.seconds, updated_at: start + i.seconds }
+    end)
+  end
+end
+
+def percentiles(samples)
+  sorted = samples.sort
+  pick = ->(fraction) { (sorted[[(fraction * sorted.size).ceil - 1, 0].max] * 1000).round(2) }
+  [pick.(0.5), pick.(0.95)]
+end
+
+def timed(repeat)
+  Array.new(repeat) { Benchmark.realtime { yield } }
+end
+
+session = ActionDispatch::Integration::Session.new(Rails.application)
+session.host! "localhost"
+
+puts format("%-10s %-8s %10s %10s %8s", "messages", "request", "p50 ms", "p95 ms", "rows")
+options[:sizes].each do |size|
+  ActiveRecord::Base.transaction do
+    user = User.create!(username: "bench_history_#{SecureRandom.hex(4)}", password: "password123")
+    conversation = Conversation.create!(title: "History benchmark", initiator: user, status: "waiting")
+    insert_messages(conversation, user, size)
+    headers = { "Authorization" => "Bearer #{JwtService.encode(user)}" }
+    path = "/conversations/#{conversation.id}/messages"
+
+    # A cursor from the middle of the history, found by paging back from the tail
+    middle_cursor = nil
+    session.get path, headers: headers
+    pages_back = (size / MessagesController::MESSAGE_PAGE_SIZE) / 2
+    pages_back.times do
+      cursor = session.response.headers[MessagesController::BEFORE_CURSOR_HEADER] or break
+      middle_cursor = cursor
+      session.get path, params: { before: cursor }, headers: headers
+    end
+
+    requests = { "tail" => {} }
+    requests["scroll"] = { before: middle_cursor } if middle_cursor
+    requests.each do |name, params|
+      samples = timed(options[:repeat]) { session.get path, params: params, headers: headers }
+      rows = JSON.parse(session.response.body).size
+      puts format("%-10d %-8s %10.2f %10.2f %8d", size, name, *percentiles(samples), rows)
+    end
+
+    if size <= options[:full_max]
+      repeat = size > 10_000 ? 3 : options[:repeat]
+      samples = timed(repeat) do
+        conversation.messages.includes(:sender).order(created_at: :asc).map do |m|
+          { id: m.id.to_s, senderUsernameWithId: "#{m.sender.username}##{m.sender.id}", content: m.content,
+            timestamp: m.created_at.iso8601, isRead: m.is_read }
+        end.to_json
+      end
+      puts format("%-10d %-8s %10.2f %10.2f %8d", size, "full", *percentiles(samples), size)
+    end
+
+    raise ActiveRecord::Rollback
+  end
+end
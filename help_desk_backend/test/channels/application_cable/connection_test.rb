@@ -0,0 +1,29 @@
+require "test_helper"
+
+module ApplicationCable
+  class ConnectionTest < ActionCable::Connection::TestCase
+    setup do
+      @user = User.create!(
+        username: "asker",
+        password: "questions1234",
+        password_confirmation: "questions1234"
+        )
+    end
+
+    test "connects with a token query parameter" do
+      connect params: { token: JwtService.encode(@user) }
+
+      assert_equal @user, connection.current_user
+    end
+
+    test "connects with an Authorization header" do
+      connect headers: { "Authorization" => "Bearer #{JwtService.encode(@user)}" }
+
+      assert_equal @user, connection.current_user
+    end
+
+    test "rejects connections without a valid token" do
+      assert_reject_connection { connect params: { token: "invalid" } }
+    end
+  end
+end
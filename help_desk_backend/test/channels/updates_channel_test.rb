@@ -0,0 +1,73 @@
+require "test_helper"
+
+class UpdatesChannelTest < ActionCable::Channel::TestCase
+  setup do
+    @initiator = User.create!(
+      username: "asker",
+      password: "questions1234",
+      password_confirmation: "questions1234"
+      )
+
+    @expert = User.create!(
+      username: "expert",
+      password: "answers1234",
+      password_confirmation: "answers1234"
+      )
+
+    ExpertProfile.create!(user: @expert)
+
+    @conversation = Conversation.create!(
+      title: "Test Conversation",
+      status: "active",
+      initiator: @initiator,
+      assigned_expert: @expert
+    )
+  end
+
+  test "subscribers stream their own updates" do
+    stub_connection current_user: @initiator
+    subscribe
+
+    assert subscription.confirmed?
+    assert_has_stream UpdatesBroadcaster.user_stream(@initiator.id)
+    assert_no_stream UpdatesBroadcaster::EXPERT_QUEUE_STREAM
+  end
+
+  test "experts also stream the expert queue" do
+    stub_connection current_user: @expert
+    subscribe
+
+    assert_has_stream UpdatesBroadcaster.user_stream(@expert.id)
+    assert_has_stream UpdatesBroadcaster::EXPERT_QUEUE_STREAM
+  end
+
+  test "new messages are broadcast to both participants" do
+    assert_broadcasts(UpdatesBroadcaster.user_stream(@initiator.id), 1) do
+      assert_broadcasts(UpdatesBroadcaster.user_stream(@expert.id), 1) do
+        Message.create!(
+          conversation: @conversation,
+          sender: @initiator,
+          sender_role: "initiator",
+          content: "Hello expert!",
+          is_read: false
+        )
+      end
+    end
+
+    payload = broadcasts(UpdatesBroadcaster.user_stream(@expert.id)).last
+    payload = JSON.parse(payload) if payload.is_a?(String)
+    assert_equal "message", payload["type"]
+    assert_equal "Hello expert!", payload["data"]["content"]
+    assert_not_nil payload["sentAt"]
+  end
+
+  test "waiting conversations are broadcast to the expert queue" do
+    assert_broadcasts(UpdatesBroadcaster::EXPERT_QUEUE_STREAM, 1) do
+      Conversation.create!(
+        title: "Waiting Conversation",
+        status: "waiting",
+        initiator: @initiator
+      )
+    end
+  end
+end
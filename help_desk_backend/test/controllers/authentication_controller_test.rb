@@ -54,6 +54,21 @@ class AuthenticationControllerTest < ActionDispatch::IntegrationTest
     assert_not_nil json["token"]
   end
 
+  test "login records presence without updating the user record" do
+    PresenceTracker.expects(:touch).with(@user.id, instance_of(ActiveSupport::TimeWithZone))
+
+    post "/auth/login", params: {
+      user: {
+        username: @user.username,
+        password: "password123"
+      }
+    }
+
+    assert_response :success
+    json = JSON.parse(response.body)
+    assert_not_nil json["user"]["last_active_at"]
+  end
+
   test "should reject invalid login" do
     post "/auth/login", params: {
       user: {
@@ -1,6 +1,8 @@
 require "test_helper"
 
 class ConversationsControllerTest < ActionDispatch::IntegrationTest
+  include ActiveJob::TestHelper
+
   def setup
     @user = User.create!(
       username: "testuser",
@@ -21,6 +23,21 @@ class ConversationsControllerTest < ActionDispatch::IntegrationTest
   end
 
   # GET /conversations tests
+  test "GET /conversations serves the stored summary and schedules missing ones" do
+    conversation = Conversation.create!(title: "Test Conversation", initiator: @user, status: "waiting")
+    Message.create!(conversation: conversation, sender: @user, content: "Hello", is_read: false)
+
+    BedrockClient.any_instance.expects(:call).never
+    assert_enqueued_with(job: GenerateSummaryJob, args: [conversation.id]) do
+      get "/conversations", headers: @headers
+    end
+
+    assert_response :success
+    body = JSON.parse(response.body)
+    assert_nil body.first["summary"]
+    assert_nil body.first["summaryLastMessageAt"]
+  end
+
   test "GET /conversations returns user's conversations" do
     conversation = Conversation.create!(
       title: "Test Conversation",
@@ -350,10 +367,12 @@ class ConversationsControllerTest < ActionDispatch::IntegrationTest
       bio: "I help with database issues"
     )
 
-    post "/conversations",
-         params: { title: "Database connection problem" },
-         headers: @headers,
-         as: :json
+    perform_enqueued_jobs do
+      post "/conversations",
+           params: { title: "Database connection problem" },
+           headers: @headers,
+           as: :json
+    end
 
     assert_response :created
     body = JSON.parse(response.body)
@@ -364,5 +383,44 @@ class ConversationsControllerTest < ActionDispatch::IntegrationTest
     assert_equal expert_user.id, conversation.assigned_expert_id
     assert_not_nil ExpertAssignment.find_by(conversation: conversation, expert_id: expert_user.expert_profile.id)
   end
-end
 
+  test "POST /conversations enqueues auto-assignment instead of running it inline" do
+    expert_user = User.create!(
+      username: "expert",
+      password: "password123",
+      password_confirmation: "password123"
+    )
+    ExpertProfile.create!(user: expert_user)
+
+    assert_enqueued_with(job: AutoAssignExpertJob) do
+      post "/conversations",
+           params: { title: "Database connection problem" },
+           headers: @headers,
+           as: :json
+    end
+
+    assert_response :created
+    body = JSON.parse(response.body)
+    assert_nil body["assignedExpertId"]
+    assert_equal true, body["assignmentPending"]
+  end
+
+  test "GET /conversations/:id reports the assignment once the job has run" do
+    expert_user = User.create!(
+      username: "expert",
+      password: "password123",
+      password_confirmation: "password123"
+    )
+    ExpertProfile.create!(user: expert_user)
+    conversation = Conversation.create!(title: "Database connection problem", initiator: @user, status: "waiting")
+
+    AutoAssignExpertJob.perform_now(conversation.id)
+
+    get "/conversations/#{conversation.id}", headers: @headers
+
+    assert_response :success
+    body = JSON.parse(response.body)
+    assert_equal expert_user.id.to_s, body["assignedExpertId"]
+    assert_equal false, body["assignmentPending"]
+  end
+end
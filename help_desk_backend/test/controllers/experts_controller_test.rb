@@ -30,6 +30,14 @@ class ExpertsControllerTest < ActionDispatch::IntegrationTest
     assert_equal @expert_profile.id, json["id"]
   end
 
+  test "GET /expert/profile is forbidden for users without an expert profile" do
+    user = User.create!(username: "not_an_expert", password: "password123", password_confirmation: "password123")
+
+    get "/expert/profile", headers: { "Authorization" => "Bearer #{JwtService.encode(user)}" }
+
+    assert_response :forbidden
+  end
+
   # POST /expert/conversations/:conversation_id/claim: claim a conversation as an expert
   test "POST /expert/conversations/:conversation_id/claim assigns conversation to expert" do
 
@@ -178,6 +186,41 @@ class ExpertsControllerTest < ActionDispatch::IntegrationTest
 
 
   # GET /expert/queue: get the expert queue (waiting and assigned conversations)
+  test "POST /expert/conversations/:conversation_id/claim returns 409 when another expert got there first" do
+    other = User.create!(username: "other_expert", password: "password123", password_confirmation: "password123")
+    conversation = Conversation.create!(title: "Taken", initiator: other, status: "active", assigned_expert: other)
+
+    post "/expert/conversations/#{conversation.id}/claim", headers: @headers
+
+    assert_response :conflict
+    assert_equal other.id, conversation.reload.assigned_expert_id
+    assert_equal 0, ExpertAssignment.where(conversation: conversation).count
+  end
+
+  test "POST /expert/conversations/:conversation_id/claim returns 404 for an unknown conversation" do
+    post "/expert/conversations/0/claim", headers: @headers
+
+    assert_response :not_found
+  end
+
+  test "GET /expert/queue pages through waiting conversations oldest first" do
+    base = Time.current.change(usec: 0)
+    waiting = 3.times.map do |i|
+      Conversation.create!(title: "Waiting #{i}", initiator: @user, status: "waiting", created_at: base + i.seconds)
+    end
+
+    get "/expert/queue", params: { limit: 2 }, headers: @headers
+    json = JSON.parse(@response.body)
+    assert_equal waiting.first(2).map { |c| c.id.to_s }, json["waitingConversations"].map { |c| c["id"] }
+    assert_not_nil json["nextCursor"]
+    assert_not_nil json["queueVersion"]
+
+    get "/expert/queue", params: { limit: 2, cursor: json["nextCursor"] }, headers: @headers
+    json = JSON.parse(@response.body)
+    assert_equal [waiting.last.id.to_s], json["waitingConversations"].map { |c| c["id"] }
+    assert_nil json["nextCursor"]
+  end
+
   test "GET /expert/queue returns waiting and assigned conversations" do
 
     waiting_conversation = Conversation.create!(
@@ -14,4 +14,86 @@ class HealthControllerTest < ActionDispatch::IntegrationTest
     
   end
 
+  test "requests carrying the Locust header are flagged as harness traffic" do
+    Current.expects(:might_be_locust_request=).with(true)
+
+    get "/health", headers: { ApplicationController::LOCUST_REQUEST_HEADER => "1" }
+
+    assert_response :success
+  end
+
+  test "requests without the Locust header are not flagged as harness traffic" do
+    Current.expects(:might_be_locust_request=).with(false)
+
+    get "/health", headers: { "User-Agent" => "python-requests/2.32.3" }
+
+    assert_response :success
+  end
+
+  test "GET /health/caches returns LLM cache counters" do
+    get "/health/caches"
+
+    assert_response :success
+    json = JSON.parse(response.body)
+    assert_includes json["llm"].keys, "hitRate"
+    assert_includes json["llm"].keys, "savedMs"
+  end
+
+  test "GET /health/caches returns authentication cache counters" do
+    get "/health/caches"
+
+    assert_response :success
+    json = JSON.parse(response.body)
+    assert_includes json["auth"].keys, "tokenHits"
+    assert_includes json["auth"].keys, "identityHits"
+  end
+
+  test "GET /health/caches returns fragment cache counters" do
+    get "/health/caches"
+
+    assert_response :success
+    json = JSON.parse(response.body)
+    assert_includes json["fragments"].keys, "l1Hits"
+    assert_includes json["fragments"].keys, "misses"
+  end
+
+  test "outside development and test the diagnostics endpoints require the token" do
+    Rails.env.stubs(:local?).returns(false)
+    HealthController.stubs(:diagnostics_token).returns("secret")
+
+    get "/health/metrics"
+    assert_response :not_found
+    get "/health/caches", headers: { HealthController::DIAGNOSTICS_HEADER => "wrong" }
+    assert_response :not_found
+
+    get "/health/caches", headers: { HealthController::DIAGNOSTICS_HEADER => "secret" }
+    assert_response :success
+  end
+
+  test "outside development and test the diagnostics endpoints are off without a token" do
+    Rails.env.stubs(:local?).returns(false)
+    HealthController.stubs(:diagnostics_token).returns(nil)
+
+    get "/health/caches", headers: { HealthController::DIAGNOSTICS_HEADER => "" }
+    assert_response :not_found
+  end
+
+  test "GET /health/metrics returns per-action cost histograms" do
+    get "/health"
+    get "/health/metrics"
+
+    assert_response :success
+    json = JSON.parse(response.body)
+    costs = json["actions"]["HealthController#show"]
+    assert_operator costs["requests"], :>=, 1
+    assert_includes costs.keys, "sqlQueries"
+    assert_includes costs["durationMs"].keys, "buckets"
+  end
+
+  test "responses report how many SQL statements they issued" do
+    get "/health"
+
+    assert_equal "0", response.headers[ApplicationController::QUERY_COUNT_HEADER]
+  end
+
 end
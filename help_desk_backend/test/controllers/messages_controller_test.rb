@@ -1,6 +1,8 @@
 require "test_helper"
 
 class MessagesControllerTest < ActionDispatch::IntegrationTest
+  include ActiveJob::TestHelper
+
   def setup
     @user = User.create!(
       username: "testuser",
@@ -180,6 +182,48 @@ class MessagesControllerTest < ActionDispatch::IntegrationTest
     assert_not_nil message_data["isRead"]
   end
 
+  test "GET /conversations/:conversation_id/messages returns the latest page and a cursor to scroll back" do
+    base = Time.current.change(usec: 0)
+    messages = 5.times.map do |i|
+      Message.create!(conversation: @conversation, sender: @user, sender_role: "initiator",
+                      content: "Message #{i}", created_at: base + i.seconds)
+    end
+
+    get "/conversations/#{@conversation.id}/messages", params: { limit: 2 }, headers: @headers
+
+    assert_response :success
+    assert_equal messages.last(2).map { |m| m.id.to_s }, JSON.parse(response.body).map { |m| m["id"] }
+    before = response.headers[MessagesController::BEFORE_CURSOR_HEADER]
+    assert_not_nil before
+
+    get "/conversations/#{@conversation.id}/messages", params: { limit: 2, before: before }, headers: @headers
+    assert_equal messages[1..2].map { |m| m.id.to_s }, JSON.parse(response.body).map { |m| m["id"] }
+
+    get "/conversations/#{@conversation.id}/messages",
+        params: { limit: 2, before: response.headers[MessagesController::BEFORE_CURSOR_HEADER] }, headers: @headers
+    assert_equal [messages[0].id.to_s], JSON.parse(response.body).map { |m| m["id"] }
+    assert_nil response.headers[MessagesController::BEFORE_CURSOR_HEADER]
+  end
+
+  test "GET /conversations/:conversation_id/messages with after returns only newer messages" do
+    first = Message.create!(conversation: @conversation, sender: @user, sender_role: "initiator", content: "Old")
+    get "/conversations/#{@conversation.id}/messages", headers: @headers
+    after = response.headers[MessagesController::AFTER_CURSOR_HEADER]
+
+    newer = Message.create!(conversation: @conversation, sender: @user, sender_role: "initiator",
+                            content: "New", created_at: first.created_at + 1.second)
+    get "/conversations/#{@conversation.id}/messages", params: { after: after }, headers: @headers
+
+    assert_response :success
+    assert_equal [newer.id.to_s], JSON.parse(response.body).map { |m| m["id"] }
+  end
+
+  test "GET /conversations/:conversation_id/messages rejects a malformed cursor" do
+    get "/conversations/#{@conversation.id}/messages", params: { before: "not-a-cursor" }, headers: @headers
+
+    assert_response :bad_request
+  end
+
   # POST /messages tests
   test "POST /messages creates a new message" do
     post "/messages",
@@ -371,6 +415,102 @@ class MessagesControllerTest < ActionDispatch::IntegrationTest
     assert_equal false, body["isRead"]
   end
 
+  test "POST /messages bumps the conversation counters" do
+    post "/messages",
+         params: { conversation_id: @conversation.id, content: "New message" },
+         headers: @headers,
+         as: :json
+
+    assert_response :created
+    @conversation.reload
+    assert_equal 1, @conversation.messages_count
+    assert_equal 1, @conversation.expert_unread_count
+    assert_not_nil @conversation.last_message_at
+  end
+
+  test "POST /messages schedules one summary for a burst of messages" do
+    assert_enqueued_jobs 1, only: GenerateSummaryJob do
+      4.times do |i|
+        post "/messages",
+             params: { conversation_id: @conversation.id, content: "Message #{i}" },
+             headers: @headers,
+             as: :json
+      end
+    end
+
+    assert_not_nil @conversation.reload.summary_requested_at
+    assert_nil @conversation.summary
+  end
+
+  # POST /messages/batch tests
+  test "POST /messages/batch writes every message and bumps each conversation once" do
+    other = Conversation.create!(title: "Other Conversation", initiator: @user, status: "waiting")
+
+    post "/messages/batch",
+         params: { messages: [
+           { conversationId: @conversation.id, content: "One" },
+           { conversationId: other.id, content: "Two" },
+           { conversationId: @conversation.id, content: "Three" }
+         ] },
+         headers: @headers,
+         as: :json
+
+    assert_response :created
+    body = JSON.parse(response.body)
+    assert_equal 3, body["created"]
+    assert_empty body["errors"]
+    assert_equal %w[One Three], @conversation.messages.order(:id).pluck(:content)
+    assert_equal ["initiator"], @conversation.messages.distinct.pluck(:sender_role)
+    assert_equal 2, @conversation.reload.messages_count
+    assert_equal 2, @conversation.expert_unread_count
+    assert_equal 1, other.reload.messages_count
+  end
+
+  test "POST /messages/batch counts each conversation's own messages towards its summary" do
+    others = 2.times.map { |i| Conversation.create!(title: "Other #{i}", initiator: @user, status: "waiting") }
+    2.times { |i| Message.create!(conversation: @conversation, sender: @user, content: "Earlier #{i}", is_read: false) }
+
+    GenerateSummaryJob.expects(:request).with(@conversation, 3)
+    others.each { |other| GenerateSummaryJob.expects(:request).with(other, 1) }
+    post "/messages/batch",
+         params: { messages: [@conversation, *others].map { |c| { conversationId: c.id, content: "Hello" } } },
+         headers: @headers,
+         as: :json
+
+    assert_response :created
+  end
+
+  test "POST /messages/batch skips entries the user cannot post to" do
+    other_user = User.create!(username: "otheruser", password: "password123", password_confirmation: "password123")
+    foreign = Conversation.create!(title: "Foreign Conversation", initiator: other_user, status: "waiting")
+
+    post "/messages/batch",
+         params: { messages: [
+           { conversationId: foreign.id, content: "Nope" },
+           { conversationId: @conversation.id, content: "" },
+           { conversationId: @conversation.id, content: "Yes" }
+         ] },
+         headers: @headers,
+         as: :json
+
+    assert_response :created
+    body = JSON.parse(response.body)
+    assert_equal 1, body["created"]
+    assert_equal [0, 1], body["errors"].map { |e| e["index"] }
+    assert_equal 0, foreign.messages.count
+    assert_equal ["Yes"], @conversation.messages.pluck(:content)
+  end
+
+  test "POST /messages/batch rejects an empty or oversized batch" do
+    post "/messages/batch", params: { messages: [] }, headers: @headers, as: :json
+    assert_response :bad_request
+
+    entries = Array.new(MessageWriter::MAX_BATCH_SIZE + 1) { { conversationId: @conversation.id, content: "x" } }
+    post "/messages/batch", params: { messages: entries }, headers: @headers, as: :json
+    assert_response :payload_too_large
+    assert_equal 0, @conversation.messages.count
+  end
+
   # PUT /messages/:id/read tests
   test "PUT /messages/:id/read marks message as read" do
     other_user = User.create!(
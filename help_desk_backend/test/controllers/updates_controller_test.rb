@@ -78,4 +78,145 @@ class UpdatesControllerTest < ActionDispatch::IntegrationTest
     assert_operator json["waitingConversations"].length, :>, 0
     assert_operator json["assignedConversations"].length, :>, 0
   end
-end
\ No newline at end of file
+
+  test "conversations updates return a cursor and an empty delta when nothing changed" do
+    get "/api/conversations/updates",
+        headers: { "Authorization" => "Bearer #{@initiator_token}" }
+
+    assert_response :success
+    cursor = response.headers[UpdateCursors::CURSOR_HEADER]
+    assert_not_nil cursor
+
+    get "/api/conversations/updates",
+        params: { cursor: cursor },
+        headers: { "Authorization" => "Bearer #{@initiator_token}" }
+
+    assert_response :success
+    assert_equal [], JSON.parse(response.body)
+    assert_equal cursor, response.headers[UpdateCursors::CURSOR_HEADER]
+  end
+
+  test "updates answer 304 when the cursor has not moved and the ETag matches" do
+    get "/api/messages/updates",
+        headers: { "Authorization" => "Bearer #{@expert_token}" }
+    cursor = response.headers[UpdateCursors::CURSOR_HEADER]
+    etag = response.headers["ETag"]
+
+    get "/api/messages/updates",
+        params: { cursor: cursor },
+        headers: { "Authorization" => "Bearer #{@expert_token}", "If-None-Match" => etag }
+
+    assert_response :not_modified
+  end
+
+  test "messages updates after a cursor only include new messages" do
+    get "/api/messages/updates",
+        headers: { "Authorization" => "Bearer #{@expert_token}" }
+    cursor = response.headers[UpdateCursors::CURSOR_HEADER]
+    etag = response.headers["ETag"]
+
+    Message.create!(
+      conversation: @conversation,
+      sender: @expert,
+      sender_role: "expert",
+      content: "How can I help?",
+      is_read: false
+    )
+
+    get "/api/messages/updates",
+        params: { cursor: cursor },
+        headers: { "Authorization" => "Bearer #{@expert_token}", "If-None-Match" => etag }
+
+    assert_response :success
+    json = JSON.parse(response.body)
+    assert_equal ["How can I help?"], json.map { |m| m["content"] }
+    assert_not_equal cursor, response.headers[UpdateCursors::CURSOR_HEADER]
+  end
+
+  test "expert_queue updates track waiting and assigned conversations separately" do
+    get "/api/expert-queue/updates",
+        headers: { "Authorization" => "Bearer #{@expert_token}" }
+    cursor = response.headers[UpdateCursors::CURSOR_HEADER]
+
+    Conversation.create!(
+      title: "New Waiting Conversation",
+      status: "waiting",
+      initiator: @initiator
+    )
+
+    get "/api/expert-queue/updates",
+        params: { cursor: cursor },
+        headers: { "Authorization" => "Bearer #{@expert_token}" }
+
+    assert_response :success
+    json = JSON.parse(response.body)
+    assert_equal ["New Waiting Conversation"], json["waitingConversations"].map { |c| c["title"] }
+    assert_equal [], json["assignedConversations"]
+  end
+
+  test "updates reject a malformed cursor" do
+    get "/api/conversations/updates",
+        params: { cursor: "not-a-cursor" },
+        headers: { "Authorization" => "Bearer #{@initiator_token}" }
+
+    assert_response :bad_request
+  end
+
+  test "combined updates return all sections for experts in one response" do
+    Conversation.create!(
+      title: "Waiting Conversation",
+      status: "waiting",
+      initiator: @initiator
+    )
+
+    get "/api/updates",
+        headers: { "Authorization" => "Bearer #{@expert_token}" }
+
+    assert_response :success
+    json = JSON.parse(response.body)
+    assert_equal ["Test Conversation"], json["conversations"].map { |c| c["title"] }
+    assert_equal ["Hello expert!"], json["messages"].map { |m| m["content"] }
+    assert_equal ["Waiting Conversation"], json["expertQueue"]["waitingConversations"].map { |c| c["title"] }
+    assert_equal ["Test Conversation"], json["expertQueue"]["assignedConversations"].map { |c| c["title"] }
+    assert_not_nil response.headers[UpdateCursors::CURSOR_HEADER]
+  end
+
+  test "combined updates omit the expert queue for non-experts" do
+    get "/api/updates",
+        headers: { "Authorization" => "Bearer #{@initiator_token}" }
+
+    assert_response :success
+    json = JSON.parse(response.body)
+    assert_equal 1, json["conversations"].length
+    assert_not json.key?("expertQueue")
+  end
+
+  test "combined updates only return the sections that changed after the cursor" do
+    get "/api/updates",
+        headers: { "Authorization" => "Bearer #{@initiator_token}" }
+    cursor = response.headers[UpdateCursors::CURSOR_HEADER]
+    etag = response.headers["ETag"]
+
+    get "/api/updates",
+        params: { cursor: cursor },
+        headers: { "Authorization" => "Bearer #{@initiator_token}", "If-None-Match" => etag }
+    assert_response :not_modified
+
+    Message.create!(
+      conversation: @conversation,
+      sender: @expert,
+      sender_role: "expert",
+      content: "How can I help?",
+      is_read: false
+    )
+
+    get "/api/updates",
+        params: { cursor: cursor },
+        headers: { "Authorization" => "Bearer #{@initiator_token}", "If-None-Match" => etag }
+
+    assert_response :success
+    json = JSON.parse(response.body)
+    assert_equal [], json["conversations"]
+    assert_equal ["How can I help?"], json["messages"].map { |m| m["content"] }
+  end
+end
@@ -0,0 +1,72 @@
+require "test_helper"
+
+class GenerateSummaryJobTest < ActiveJob::TestCase
+  def setup
+    @user = User.create!(username: "asker", password: "password123", password_confirmation: "password123")
+    @conversation = Conversation.create!(title: "Printer", initiator: @user, status: "waiting")
+    3.times { |i| Message.create!(conversation: @conversation, sender: @user, content: "Message #{i}", is_read: false) }
+    @conversation.reload
+
+    BedrockClient.any_instance.stubs(:call).returns({ output_text: "The printer is jammed.", raw_response: nil })
+  end
+
+  test "conversations without messages are not claimed" do
+    conversation = Conversation.create!(title: "Fresh", initiator: @user, status: "waiting")
+
+    assert_no_enqueued_jobs(only: GenerateSummaryJob) do
+      GenerateSummaryJob.request(conversation, 0)
+      GenerateSummaryJob.request_missing([conversation])
+    end
+    assert_nil conversation.reload.summary_requested_at
+  end
+
+  test "listings schedule missing summaries once" do
+    assert_enqueued_jobs 1, only: GenerateSummaryJob do
+      GenerateSummaryJob.request_missing([@conversation])
+      GenerateSummaryJob.request_missing([@conversation.reload])
+    end
+
+    @conversation.update!(summary: "Known", summary_requested_at: nil)
+    assert_no_enqueued_jobs(only: GenerateSummaryJob) { GenerateSummaryJob.request_missing([@conversation]) }
+  end
+
+  test "waits while messages are still arriving" do
+    GenerateSummaryJob.request(@conversation, 3)
+
+    BedrockClient.any_instance.expects(:call).never
+    assert_enqueued_with(job: GenerateSummaryJob, args: [@conversation.id]) do
+      GenerateSummaryJob.perform_now(@conversation.id)
+    end
+    assert_nil @conversation.reload.summary
+  end
+
+  test "summarizes once messages settle and records the last message covered" do
+    GenerateSummaryJob.request(@conversation, 3)
+
+    travel GenerateSummaryJob::DEBOUNCE + 1.second do
+      GenerateSummaryJob.perform_now(@conversation.id)
+    end
+    @conversation.reload
+    assert_equal "The printer is jammed.", @conversation.summary
+    assert_equal @conversation.last_message_at, @conversation.summary_last_message_at
+    assert_nil @conversation.summary_requested_at
+  end
+
+  test "stops waiting at the maximum delay" do
+    GenerateSummaryJob.request(@conversation, 3)
+
+    travel GenerateSummaryJob::MAX_DELAY + 1.second do
+      Message.create!(conversation: @conversation, sender: @user, content: "Still there?", is_read: false)
+      GenerateSummaryJob.perform_now(@conversation.id)
+    end
+    assert_equal "The printer is jammed.", @conversation.reload.summary
+  end
+
+  test "a current summary is not generated again" do
+    @conversation.update!(summary: "Known", summary_last_message_at: @conversation.last_message_at)
+
+    BedrockClient.any_instance.expects(:call).never
+    GenerateSummaryJob.perform_now(@conversation.id)
+    assert_equal "Known", @conversation.reload.summary
+  end
+end
@@ -0,0 +1,26 @@
+require "test_helper"
+
+class Bm25IndexTest < ActiveSupport::TestCase
+  test "ranks documents by query term relevance" do
+    index = Bm25Index.new
+    index.upsert(1, "Cooking and baking bread")
+    index.upsert(2, "MySQL replication, MySQL indexes and query tuning")
+    index.upsert(3, "Postgres query planning")
+
+    assert_equal [2, 3], index.search("Slow MySQL query", limit: 10).map(&:first)
+    assert_equal [2], index.search("Slow MySQL query", limit: 1).map(&:first)
+  end
+
+  test "upsert replaces a document and delete removes it" do
+    index = Bm25Index.new
+    index.upsert(1, "networking")
+    index.upsert(1, "databases")
+
+    assert_empty index.search("networking", limit: 10)
+    assert_equal [1], index.search("databases", limit: 10).map(&:first)
+
+    index.delete(1)
+    assert_empty index.search("databases", limit: 10)
+    assert_equal 0, index.size
+  end
+end
@@ -0,0 +1,22 @@
+require "test_helper"
+
+class LogHistogramTest < ActiveSupport::TestCase
+  test "percentiles are within the bucket resolution" do
+    histogram = LogHistogram.new
+    (1..1000).each { |ms| histogram.record(ms) }
+
+    assert_equal 1000, histogram.count
+    assert_in_delta 500, histogram.percentile(0.5), 500 / 64.0
+    assert_in_delta 950, histogram.percentile(0.95), 950 / 64.0
+    assert_equal 1000, histogram.max
+    assert_in_delta 500.5, histogram.mean, 0.001
+  end
+
+  test "bucket indexes round trip to their lower bound" do
+    [0, 1, 127, 128, 1_000, 123_456, 10_000_000].each do |scaled|
+      lower = LogHistogram.value(LogHistogram.index(scaled))
+      assert_operator lower, :<=, scaled
+      assert_operator scaled - lower, :<=, scaled / 64
+    end
+  end
+end
@@ -0,0 +1,23 @@
+require "test_helper"
+
+class LruCacheTest < ActiveSupport::TestCase
+  test "evicts the least recently used entry when full" do
+    cache = LruCache.new(max_entries: 2)
+    cache.write("a", 1)
+    cache.write("b", 2)
+    cache.read("a")
+    cache.write("c", 3)
+
+    assert_equal 1, cache.read("a")
+    assert_nil cache.read("b")
+    assert_equal 3, cache.read("c")
+    assert_equal 1, cache.evictions
+  end
+
+  test "expired entries are not returned" do
+    cache = LruCache.new(max_entries: 2)
+    cache.write("a", 1, expires_in: 0)
+
+    assert_nil cache.read("a")
+  end
+end
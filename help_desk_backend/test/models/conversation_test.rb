@@ -37,4 +37,42 @@ class ConversationTest < ActiveSupport::TestCase
         assert_not_nil conversation.initiator, "initiator should not be null"
         assert_not_nil conversation.status, "status should not be null"
     end
-end
\ No newline at end of file
+
+    test "unread_count_for returns each participant's unread counter" do
+        expert = User.create!(
+            username: "expertuser",
+            password: "password123",
+            password_confirmation: "password123"
+        )
+        conversation = Conversation.create!(
+            title: "Test Conversation",
+            initiator: @user,
+            assigned_expert: expert,
+            status: "active"
+        )
+        Message.create!(conversation: conversation, sender: expert, sender_role: "expert", content: "Hi", is_read: false)
+        Message.create!(conversation: conversation, sender: expert, sender_role: "expert", content: "Still there?", is_read: false)
+        Message.create!(conversation: conversation, sender: @user, sender_role: "initiator", content: "Yes", is_read: false)
+
+        conversation.reload
+        assert_equal 2, conversation.unread_count_for(@user)
+        assert_equal 1, conversation.unread_count_for(expert)
+        assert_equal 0, conversation.unread_count_for(nil)
+    end
+
+    test "for_user returns initiated and assigned conversations once each" do
+        expert = User.create!(
+            username: "expertuser",
+            password: "password123",
+            password_confirmation: "password123"
+        )
+        initiated = Conversation.create!(title: "Initiated", initiator: @user, status: "waiting")
+        assigned = Conversation.create!(title: "Assigned", initiator: expert, assigned_expert: @user, status: "active")
+        own = Conversation.create!(title: "Own", initiator: @user, assigned_expert: @user, status: "active")
+        Conversation.create!(title: "Other", initiator: expert, status: "waiting")
+
+        assert_equal [initiated, assigned, own].map(&:id).sort, Conversation.for_user(@user).pluck(:id).sort
+        assert_equal own.id, Conversation.for_user(@user).order(updated_at: :desc).first.id
+        assert_equal 3, Conversation.for_user(@user).count
+    end
+end
@@ -230,4 +230,42 @@ class MessageTest < ActiveSupport::TestCase
     assert message.save, "message should save with is_read false"
     assert_equal false, message.is_read, "is_read should default to false"
   end
+
+  test "creating messages updates the conversation's message and unread counters" do
+    Message.create!(
+      conversation: @conversation,
+      sender: @user,
+      sender_role: "initiator",
+      content: "Unread message",
+      is_read: false
+    )
+    Message.create!(
+      conversation: @conversation,
+      sender: @user,
+      sender_role: "initiator",
+      content: "Read message",
+      is_read: true
+    )
+
+    @conversation.reload
+    assert_equal 2, @conversation.messages_count, "messages_count should count every message"
+    assert_equal 1, @conversation.expert_unread_count, "only the unread initiator message awaits the expert"
+    assert_equal 0, @conversation.initiator_unread_count, "the initiator has nothing unread"
+  end
+
+  test "marking a message read decrements the unread counter" do
+    message = Message.create!(
+      conversation: @conversation,
+      sender: @user,
+      sender_role: "initiator",
+      content: "Unread message",
+      is_read: false
+    )
+
+    message.update!(is_read: true)
+
+    @conversation.reload
+    assert_equal 1, @conversation.messages_count
+    assert_equal 0, @conversation.expert_unread_count, "unread counter should drop once the message is read"
+  end
 end
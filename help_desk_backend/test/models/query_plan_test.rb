@@ -0,0 +1,80 @@
+require "test_helper"
+
+# Runs EXPLAIN on the hot request path queries and fails when MySQL would read a whole
+# table (access type ALL) or a whole index (type index) for any of them. Derived and
+# union result tables (<derived2>, <union2,3>) are skipped: they are the already
+# filtered rows of the index lookups beneath them.
+class QueryPlanTest < ActiveSupport::TestCase
+  FULL_SCAN_TYPES = %w[ALL index].freeze
+
+  def setup
+    now = Time.current
+    User.insert_all(Array.new(200) do |i|
+      { username: "plan_user_#{i}", password_digest: "x", created_at: now, updated_at: now }
+    end)
+    user_ids = User.where("username LIKE 'plan_user_%'").order(:id).pluck(:id)
+    @user = User.find(user_ids.first)
+    @expert = User.find(user_ids.last)
+
+    ExpertProfile.insert_all(user_ids.last(20).map { |id| { user_id: id, created_at: now, updated_at: now } })
+    Conversation.insert_all(Array.new(400) do |i|
+      assigned = i.even? ? user_ids.last(20).sample : nil
+      { title: "Plan #{i}", initiator_id: user_ids[i % 180], assigned_expert_id: assigned,
+        status: assigned ? "active" : "waiting", created_at: now - i.minutes, updated_at: now - i.minutes }
+    end)
+    conversation_ids = Conversation.pluck(:id)
+    @conversation_id = conversation_ids.first
+    Message.insert_all(Array.new(1000) do |i|
+      { conversation_id: conversation_ids[i % conversation_ids.size], sender_id: user_ids[i % 180],
+        sender_role: "initiator", content: "Message #{i}", is_read: false,
+        created_at: now - i.seconds, updated_at: now - i.seconds }
+    end)
+    @expert_profile_id = ExpertProfile.where(user_id: @expert.id).pick(:id)
+    ExpertAssignment.insert_all(conversation_ids.first(100).map do |id|
+      { conversation_id: id, expert_id: @expert_profile_id, status: "active", assigned_at: now,
+        created_at: now, updated_at: now }
+    end)
+  end
+
+  test "login looks the user up by username" do
+    assert_no_full_scan User.where(username: "plan_user_7")
+  end
+
+  test "the expert check looks the profile up by user" do
+    assert_no_full_scan ExpertProfile.where(user_id: @expert.id).select(:id)
+  end
+
+  test "a user's conversations are read from one index range per role" do
+    assert_no_full_scan Conversation.for_user(@user).order(updated_at: :desc)
+    assert_no_full_scan Conversation.for_user(@expert).where("conversations.updated_at > ?", 1.hour.ago)
+  end
+
+  test "conversation and message update deltas seek by updated_at" do
+    since = 10.minutes.ago
+    assert_no_full_scan Conversation.waiting.where("conversations.updated_at > ?", since)
+    assert_no_full_scan Conversation.assigned_to(@expert).where("conversations.updated_at > ?", since)
+    assert_no_full_scan Message.where(conversation_id: @conversation_id).where("messages.created_at > ?", since)
+  end
+
+  test "the expert queue and message history pages seek their index" do
+    assert_no_full_scan ExpertQueue.waiting.order(:created_at, :id).limit(51)
+    assert_no_full_scan Message.where(conversation_id: @conversation_id).order(created_at: :desc, id: :desc).limit(51)
+  end
+
+  test "expert assignment lookups use an index" do
+    assert_no_full_scan ExpertAssignment.where(expert_id: @expert_profile_id).order(assigned_at: :desc)
+    assert_no_full_scan ExpertAssignment.where(conversation_id: @conversation_id, expert_id: @expert_profile_id)
+                                        .order(assigned_at: :desc).limit(1)
+  end
+
+  private
+
+  def assert_no_full_scan(relation)
+    plan = ActiveRecord::Base.connection.select_all("EXPLAIN #{relation.to_sql}").to_a
+    scans = plan.select do |row|
+      row["table"].present? && !row["table"].start_with?("<") && FULL_SCAN_TYPES.include?(row["type"])
+    end
+
+    assert_empty scans, "Full scan in the plan of\n  #{relation.to_sql}\n#{plan.map(&:inspect).join("\n")}"
+  end
+end
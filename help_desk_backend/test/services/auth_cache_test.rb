@@ -0,0 +1,39 @@
+require "test_helper"
+
+class AuthCacheTest < ActiveSupport::TestCase
+  def setup
+    @cache = AuthCache.new(entries: 10, identity_ttl: 1.minute, enabled: true)
+    @user = User.create!(username: "cached", password: "password123", password_confirmation: "password123")
+    @token = JwtService.encode(@user)
+  end
+
+  test "a repeated token is authenticated without verifying or querying again" do
+    assert_equal @user, @cache.authenticate(@token)
+
+    JwtService.expects(:decode).never
+    assert_no_queries do
+      assert_equal @user, @cache.authenticate(@token)
+    end
+    stats = @cache.stats
+    assert_equal 1, stats[:tokenHits]
+    assert_equal 1, stats[:identityHits]
+  end
+
+  test "expired tokens are rejected" do
+    expired = JWT.encode({ user_id: @user.id, exp: 1.minute.ago.to_i }, JwtService::SECRET_KEY, "HS256")
+
+    assert_nil @cache.authenticate(expired)
+    assert_equal 0, @cache.stats[:tokenEntries]
+  end
+
+  test "identities are invalidated when the user or their expert profile changes" do
+    assert_nil @cache.expert_profile_id(@user.id)
+
+    profile = ExpertProfile.create!(user: @user)
+    @cache.invalidate_user(@user.id)
+    assert_equal profile.id, @cache.expert_profile_id(@user.id)
+
+    AuthCache.expects(:invalidate_user).with(@user.id).at_least_once
+    @user.update!(username: "renamed")
+  end
+end
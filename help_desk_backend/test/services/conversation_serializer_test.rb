@@ -0,0 +1,56 @@
+require "test_helper"
+
+class ConversationSerializerTest < ActiveSupport::TestCase
+  def setup
+    @user = User.create!(username: "asker", password: "password123", password_confirmation: "password123")
+    @expert = User.create!(username: "helper", password: "password123", password_confirmation: "password123")
+    @conversation = Conversation.create!(title: "Printer", initiator: @user, assigned_expert: @expert, status: "active")
+    @cache = FragmentCache.new(store: nil, l1_entries: 100, ttl: 1.minute, enabled: true)
+  end
+
+  def serialize(conversations, **options)
+    JSON.parse(ConversationSerializer.new(cache: @cache, **options).json(conversations))
+  end
+
+  test "the list view leaves out the detail fields" do
+    list = serialize([@conversation], view: :list).first
+    detail = serialize([@conversation], view: :detail).first
+
+    assert_equal "asker", list["questionerUsername"]
+    assert_not list.key?("summary")
+    assert_equal "helper##{@expert.id}", detail["assignedExpertUsernameWithId"]
+    assert_equal list, detail.slice(*list.keys)
+  end
+
+  test "unreadCount is added per viewer and not cached" do
+    Message.create!(conversation: @conversation, sender: @expert, content: "Try turning it off", is_read: false)
+    conversations = [@conversation.reload]
+
+    assert_equal 1, serialize(conversations, viewer: @user).first["unreadCount"]
+    assert_equal 0, serialize(conversations, viewer: @expert).first["unreadCount"]
+    assert_not serialize(conversations).first.key?("unreadCount")
+  end
+
+  test "changed conversations are encoded again" do
+    serialize([@conversation])
+    @conversation.update!(status: "resolved")
+    Message.create!(conversation: @conversation, sender: @user, content: "Thanks", is_read: false)
+
+    assert_equal "resolved", serialize([@conversation]).first["status"]
+    assert_not_nil serialize([@conversation.reload]).first["lastMessageAt"]
+    assert_equal 3, @cache.stats[:misses]
+  end
+
+  test "warm listings load no associations" do
+    serialize([@conversation])
+    conversation = Conversation.find(@conversation.id)
+
+    assert_no_queries { serialize([conversation]) }
+  end
+
+  test "json_object joins encoded members" do
+    json = RecordSerializer.json_object(items: "[1,2]", "next" => nil.to_json)
+
+    assert_equal({ "items" => [1, 2], "next" => nil }, JSON.parse(json))
+  end
+end
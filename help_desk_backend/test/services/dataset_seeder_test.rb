@@ -0,0 +1,67 @@
+require "test_helper"
+
+class DatasetSeederTest < ActiveSupport::TestCase
+  def seed(**options)
+    DatasetSeeder.new(users: 20, experts: 3, conversations: 40, messages: 200, batch_size: 25, **options).run
+  end
+
+  test "inserts the requested rows with counters that match the messages" do
+    users_before = User.count
+    counts = seed
+
+    assert_equal 23, User.count - users_before
+    assert_equal 3, ExpertProfile.where(user: User.where("username LIKE 'seed_expert_%'")).count
+    assert_equal 40, counts[:conversations]
+    assert_equal counts[:messages], Message.count
+    assert_in_delta 200, counts[:messages], 40
+
+    Conversation.includes(:messages).find_each do |conversation|
+      messages = conversation.messages
+      assert_equal messages.size, conversation.messages_count
+      assert_equal messages.map(&:created_at).max, conversation.last_message_at
+      assert_equal messages.count { |m| !m.is_read && m.sender_role == "expert" }, conversation.initiator_unread_count
+      assert_equal messages.count { |m| !m.is_read && m.sender_role == "initiator" }, conversation.expert_unread_count
+      if conversation.status == "waiting"
+        assert_nil conversation.assigned_expert_id
+      else
+        assert ExpertAssignment.exists?(conversation: conversation,
+                                        expert_id: ExpertProfile.find_by!(user_id: conversation.assigned_expert_id).id)
+      end
+    end
+  end
+
+  test "seeded accounts log in with the shared password" do
+    seed(password: "seeded-password")
+
+    user = User.find_by!(username: "seed_user_0")
+    assert user.authenticate("seeded-password")
+  end
+
+  test "exports credentials in the token pool format" do
+    Dir.mktmpdir do |dir|
+      path = File.join(dir, "tokens.jsonl")
+      counts = seed(export_path: path, export_users: 5)
+      records = File.readlines(path).map { |line| JSON.parse(line) }
+
+      assert_equal 8, counts[:exported]
+      assert_equal 3, records.count { |record| record["is_expert"] }
+      record = records.find { |r| r["username"] == "seed_user_0" }
+      assert_equal User.find_by!(username: "seed_user_0").id, record["user_id"]
+      assert_equal record["user_id"], JwtService.decode(record["token"])[:user_id]
+      assert_operator record["exp"], :>, Time.current.to_i
+    end
+  end
+
+  test "the same seed generates the same data" do
+    seed(seed: 7)
+    first = Message.order(:id).pluck(:content, :sender_role)
+    Message.delete_all
+    ExpertAssignment.delete_all
+    Conversation.delete_all
+    ExpertProfile.where(user: User.where("username LIKE 'seed_%'")).delete_all
+    User.where("username LIKE 'seed_%'").delete_all
+
+    seed(seed: 7)
+    assert_equal first, Message.order(:id).pluck(:content, :sender_role)
+  end
+end
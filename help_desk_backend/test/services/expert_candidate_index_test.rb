@@ -0,0 +1,39 @@
+require "test_helper"
+
+class ExpertCandidateIndexTest < ActiveSupport::TestCase
+  def setup
+    @index = ExpertCandidateIndex.new(sync_interval: 0)
+  end
+
+  def create_expert(username, **attributes)
+    user = User.create!(username: username, password: "password123", password_confirmation: "password123")
+    ExpertProfile.create!(user: user, **attributes)
+  end
+
+  test "shortlists experts matching the bio, FAQ or knowledge base links first" do
+    create_expert("gardener", bio: "Roses and vegetable gardens")
+    dba = create_expert("dba", bio: "Databases", faq: [{ "question" => "Why is my MySQL replica lagging?" }])
+    network = create_expert("network", knowledge_base_links: ["https://example.com/vpn-troubleshooting"])
+
+    assert_equal dba.id, @index.shortlist("MySQL replica lag", limit: 5).first
+    assert_equal network.id, @index.shortlist("VPN keeps dropping", limit: 5).first
+  end
+
+  test "shortlist is bounded and padded with unmatched experts" do
+    3.times { |i| create_expert("expert#{i}") }
+    matching = create_expert("dba", bio: "Databases")
+
+    shortlist = @index.shortlist("databases", limit: 2)
+    assert_equal 2, shortlist.size
+    assert_equal matching.id, shortlist.first
+    assert_not_equal matching.id, shortlist.last
+  end
+
+  test "picks up profile updates on the next sync" do
+    expert = create_expert("expert", bio: "Gardening")
+    @index.sync
+    expert.update!(bio: "Kubernetes clusters")
+
+    assert_equal expert.id, @index.shortlist("kubernetes", limit: 1).first
+  end
+end
@@ -0,0 +1,39 @@
+require "test_helper"
+
+class FragmentCacheTest < ActiveSupport::TestCase
+  def setup
+    @store = ActiveSupport::Cache::MemoryStore.new
+    @cache = FragmentCache.new(store: @store, l1_entries: 10, ttl: 1.minute, enabled: true)
+  end
+
+  test "builds only the missing fragments and returns them in key order" do
+    assert_equal ["a1", "b1"], @cache.fetch_multi(%w[a b]) { |keys| keys.to_h { |key| [key, "#{key}1"] } }
+
+    built = nil
+    fragments = @cache.fetch_multi(%w[c a b]) do |keys|
+      built = keys
+      keys.to_h { |key| [key, "#{key}2"] }
+    end
+    assert_equal %w[c], built
+    assert_equal ["c2", "a1", "b1"], fragments
+
+    stats = @cache.stats
+    assert_equal 2, stats[:l1Hits]
+    assert_equal 3, stats[:misses]
+  end
+
+  test "another process's fragments are read from the shared store" do
+    @cache.fetch_multi(%w[a]) { { "a" => "shared" } }
+    other = FragmentCache.new(store: @store, l1_entries: 10, ttl: 1.minute, enabled: true)
+
+    assert_equal ["shared"], other.fetch_multi(%w[a]) { flunk "fragment should come from the store" }
+    assert_equal 1, other.stats[:l2Hits]
+  end
+
+  test "a disabled cache builds every fragment" do
+    cache = FragmentCache.new(store: @store, enabled: false)
+    2.times { assert_equal ["a1"], cache.fetch_multi(%w[a]) { { "a" => "a1" } } }
+
+    assert_nil @store.read("a")
+  end
+end
@@ -0,0 +1,82 @@
+require "test_helper"
+
+class LlmCacheTest < ActiveSupport::TestCase
+  def setup
+    @cache = LlmCache.new(store: ActiveSupport::Cache::MemoryStore.new, l1_entries: 10, ttl: 1.hour, enabled: true)
+    @params = {
+      model_id: "model",
+      system_prompt: "You are a helpful assistant.",
+      user_prompt: "How do I reset my password?",
+      max_tokens: 100,
+      temperature: 0.3
+    }
+  end
+
+  test "second identical call is served from the cache" do
+    calls = 0
+    2.times { @cache.fetch(**@params) { calls += 1; { output_text: "Use the reset link." } } }
+
+    assert_equal 1, calls
+    stats = @cache.stats
+    assert_equal 1, stats[:misses]
+    assert_equal 1, stats[:l1Hits]
+    assert_equal 0.5, stats[:hitRate]
+  end
+
+  test "prompts differing only in whitespace share a key" do
+    key = LlmCache.key_for(**@params)
+    assert_equal key, LlmCache.key_for(**@params, user_prompt: "  How do I reset\n my password? ")
+    assert_not_equal key, LlmCache.key_for(**@params, system_prompt: "FAQ: passwords are reset by email.")
+  end
+
+  test "entries evicted from the process cache are read back from Rails.cache" do
+    @cache.fetch(**@params) { { output_text: "Use the reset link." } }
+    10.times { |i| @cache.fetch(**@params, user_prompt: "Question #{i}") { { output_text: "Answer #{i}" } } }
+
+    response = @cache.fetch(**@params) { flunk "should not call the model again" }
+
+    assert_equal "Use the reset link.", response[:output_text]
+    assert_equal 1, @cache.stats[:l2Hits]
+    assert_operator @cache.stats[:l1Evictions], :>, 0
+  end
+
+  test "concurrent identical calls make a single model call" do
+    calls = Concurrent::AtomicFixnum.new
+    threads = 5.times.map do
+      Thread.new do
+        @cache.fetch(**@params) { calls.increment; sleep 0.2; { output_text: "Use the reset link." } }
+      end
+    end
+    responses = threads.map(&:value)
+
+    assert_equal 1, calls.value
+    assert responses.all? { |r| r[:output_text] == "Use the reset link." }
+  end
+
+  test "failed calls are not cached" do
+    assert_raises(RuntimeError) { @cache.fetch(**@params) { raise "Bedrock LLM call failed" } }
+
+    response = @cache.fetch(**@params) { { output_text: "Use the reset link." } }
+
+    assert_equal "Use the reset link.", response[:output_text]
+  end
+
+  test "faked calls are cached apart from real calls" do
+    LlmCache.stubs(:instance).returns(@cache)
+    client = BedrockClient.new(model_id: "model")
+    client.stubs(:sleep)
+    # Harness requests (X-Locust-Request), then a real user with the same prompts, then the harness again
+    client.stubs(:should_fake_llm_call?).returns(true, true, false, true)
+    reply = stub(output: stub(message: stub(content: [stub(text: "Use the reset link.")])))
+    Aws::BedrockRuntime::Client.any_instance.stubs(:converse).returns(reply)
+    prompts = @params.except(:model_id)
+
+    assert_equal "This is a fake response from the LLM.", client.call(**prompts)[:output_text]
+    assert_equal "This is a fake response from the LLM.", client.call(**prompts)[:output_text]
+    assert_equal "Use the reset link.", client.call(**prompts)[:output_text]
+    assert_equal "This is a fake response from the LLM.", client.call(**prompts)[:output_text]
+    stats = @cache.stats
+    assert_equal 2, stats[:misses]
+    assert_equal 2, stats[:l1Hits]
+  end
+end
@@ -0,0 +1,42 @@
+require "test_helper"
+
+class PresenceTrackerTest < ActiveSupport::TestCase
+  def setup
+    @tracker = PresenceTracker.new(flush_interval: 60)
+    @user = User.create!(username: "present", password: "password123", password_confirmation: "password123")
+    @other = User.create!(username: "also_present", password: "password123", password_confirmation: "password123")
+  end
+
+  test "touches are buffered and written in one statement on flush" do
+    earlier = 2.minutes.ago.change(usec: 0)
+    later = 1.minute.ago.change(usec: 0)
+    @tracker.touch(@user.id, earlier)
+    @tracker.touch(@user.id, later)
+    @tracker.touch(@other.id, earlier)
+
+    assert_nil @user.reload.last_active_at
+    assert_equal 2, @tracker.pending_count
+
+    assert_queries_count(1) { assert_equal 2, @tracker.flush }
+    assert_equal later, @user.reload.last_active_at
+    assert_equal earlier, @other.reload.last_active_at
+    assert_equal 0, @tracker.pending_count
+  end
+
+  test "a flush never moves last_active_at backwards" do
+    recent = 1.minute.ago.change(usec: 0)
+    @user.update!(last_active_at: recent)
+
+    @tracker.touch(@user.id, 1.hour.ago)
+    @tracker.flush
+
+    assert_equal recent, @user.reload.last_active_at
+  end
+
+  test "with no flush interval touches are written through" do
+    at = 1.minute.ago.change(usec: 0)
+    PresenceTracker.new(flush_interval: 0).touch(@user.id, at)
+
+    assert_equal at, @user.reload.last_active_at
+  end
+end
@@ -0,0 +1,53 @@
+require "test_helper"
+
+class RequestCostCollectorTest < ActiveSupport::TestCase
+  def setup
+    @collector = RequestCostCollector.new
+  end
+
+  test "records the SQL, cache and LLM cost of a unit per action" do
+    @collector.start_unit
+    @collector.record_sql(event(duration: 2.0, payload: { name: "User Load" }))
+    @collector.record_sql(event(duration: 3.0, payload: { name: "Message Create" }))
+    @collector.record_sql(event(duration: 1.0, payload: { name: "SCHEMA" }))
+    @collector.record_cache_read(1, 2)
+    @collector.record_bedrock_call(event(duration: 10.0))
+    @collector.finish_unit("MessagesController#create", event(duration: 20.0, allocations: 500))
+
+    costs = @collector.stats[:actions]["MessagesController#create"]
+    assert_equal 1, costs[:requests]
+    assert_equal 2, costs[:sqlQueries][:max]
+    assert_in_delta 5.0, costs[:sqlMs][:sum], 0.001
+    assert_equal 1, costs[:cacheHits][:sum]
+    assert_equal 2, costs[:cacheMisses][:sum]
+    assert_in_delta 10.0, costs[:bedrockMs][:sum], 0.001
+    assert_in_delta 5.0, costs[:rubyMs][:sum], 0.001
+    assert_equal 500, costs[:allocations][:max]
+  end
+
+  test "an inline job is recorded on its own and counts towards its request" do
+    @collector.start_unit
+    @collector.start_unit
+    @collector.record_sql(event(duration: 1.0, payload: { name: "Conversation Load" }))
+    @collector.finish_unit("GenerateSummaryJob", event(duration: 4.0))
+    @collector.record_sql(event(duration: 1.0, payload: { name: "Message Create" }))
+    @collector.finish_unit("MessagesController#create", event(duration: 10.0))
+
+    actions = @collector.stats[:actions]
+    assert_equal 1, actions["GenerateSummaryJob"][:sqlQueries][:max]
+    assert_equal 2, actions["MessagesController#create"][:sqlQueries][:max]
+  end
+
+  test "work outside a unit is not recorded" do
+    @collector.record_sql(event(duration: 1.0, payload: { name: "User Load" }))
+    @collector.finish_unit("MessagesController#create", event(duration: 1.0))
+
+    assert_empty @collector.stats[:actions]
+  end
+
+  private
+
+  def event(duration:, allocations: 0, payload: {})
+    stub(duration: duration, allocations: allocations, payload: payload)
+  end
+end
@@ -25,6 +25,12 @@ module ActiveSupport
     # Setup all fixtures in test/fixtures/*.yml for all tests in alphabetical order.
     fixtures :all
 
+    # Per-process caches outlive the test transaction
+    setup do
+      AuthCache.clear
+      FragmentCache.clear
+    end
+
     # Add more helper methods to be used by all tests here...
   end
 end